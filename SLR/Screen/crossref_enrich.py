@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Batched Crossref enrichment of records with missing metadata.
+
+Many merged records have no abstract, page range or venue. The inclusion
+prompt then sees an empty abstract, exclusion78.py marks the record as
+"Error" without calling the API, and the C4 venue check of exclusion345.py
+runs on a blank Source/Book Title. This stage fills those fields from
+Crossref before screening:
+
+- Only records with a DOI and at least one empty ENRICH_COLUMNS cell are
+  looked up, and only DOIs that are not in the cache yet.
+- DOIs are resolved BATCH_SIZE at a time with one multi-DOI filter query
+  (/works?filter=doi:a,doi:b,...) instead of one request per DOI. The
+  batches run on CONCURRENCY threads over one pooled HTTP session.
+- Every answer is kept in a SQLite cache (CACHE_FILE), including DOIs
+  Crossref does not know, so re-runs only ask for new DOIs.
+- Fields are merged back by normalized DOI. Only empty cells are filled,
+  and the 'enriched_fields' column lists what was filled per record.
+
+In the pipeline this stage turns merged_literature_data.xlsx into the
+final_merged_literature_data.xlsx that inclusionscreen1_2.py reads.
+CROSSREF_API_URL can point to a local stand-in (benchmarks/stub_servers.py).
+"""
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+import requests
+
+from exclusion2 import normalize_doi
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration ---
+INPUT_FILE = 'merged_literature_data.xlsx'
+OUTPUT_FILE = 'final_merged_literature_data.xlsx'
+CACHE_FILE = 'crossref_cache.sqlite'
+DOI_COLUMN = 'doi'
+CROSSREF_API_URL = 'https://api.crossref.org/works'
+# Contact address for Crossref's "polite" pool (or the CROSSREF_MAILTO environment variable)
+MAILTO = ''
+# DOIs per filter query, parallel queries, and retries per query (429/5xx, with backoff)
+BATCH_SIZE = 50
+CONCURRENCY = 3
+RETRIES = 4
+TIMEOUT = 30
+# DOIs Crossref did not know are asked again after this many days
+NOT_FOUND_TTL_DAYS = 30
+# Corpus columns that are filled when empty (see crossref_fields())
+ENRICH_COLUMNS = ['abstract', 'pages', 'source', 'booktitle', 'publisher']
+ENRICHED_COLUMN = 'enriched_fields'
+# Crossref types whose container is a book or proceedings volume (-> booktitle)
+BOOK_TYPES = ('proceedings-article', 'book-chapter', 'book-part', 'book-section')
+# Values that count as an empty cell ('N/A' is written by dblp-bib-to-xlsx.py)
+EMPTY_VALUES = ('', 'n/a', 'nan', 'none')
+
+
+def is_empty(value):
+    return value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip().lower() in EMPTY_VALUES
+
+
+def clean_abstract(text):
+    """Crossref abstracts are JATS XML: drop the tags and a leading 'Abstract' heading."""
+    text = re.sub(r'<[^>]+>', ' ', text or '')
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r'^abstract\s*[:.]?\s*', '', text, flags=re.IGNORECASE)
+
+
+def crossref_fields(item):
+    """The corpus columns a Crossref work can fill (only the ones it has a value for)."""
+    container = (item.get('container-title') or [''])[0]
+    fields = {
+        'abstract': clean_abstract(item.get('abstract')),
+        'pages': item.get('page', ''),
+        'source': container,
+        'booktitle': container if item.get('type') in BOOK_TYPES else '',
+        'publisher': item.get('publisher', ''),
+    }
+    return {column: value for column, value in fields.items() if value}
+
+
+class CrossrefCache:
+    """normalized DOI -> Crossref fields (or 'not found'), stored in SQLite."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS works (
+            doi TEXT PRIMARY KEY, found INTEGER, fields TEXT, fetched_at TEXT)""")
+        self.connection.commit()
+
+    def lookup(self, dois):
+        """{doi: fields or None} for the cached DOIs; expired 'not found' entries are left out."""
+        cached = {}
+        expired = (datetime.now() - timedelta(days=NOT_FOUND_TTL_DAYS)).isoformat(timespec='seconds')
+        dois = list(dois)
+        for start in range(0, len(dois), 500):
+            chunk = dois[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT doi, found, fields, fetched_at FROM works WHERE doi IN ({','.join('?' * len(chunk))})", chunk)
+            for doi, found, fields, fetched_at in rows:
+                if found:
+                    cached[doi] = json.loads(fields)
+                elif fetched_at >= expired:
+                    cached[doi] = None
+        return cached
+
+    def store(self, results):
+        """Stores {doi: fields or None} (None = Crossref does not know the DOI)."""
+        now = datetime.now().isoformat(timespec='seconds')
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO works (doi, found, fields, fetched_at) VALUES (?, ?, ?, ?)",
+            [(doi, int(fields is not None), json.dumps(fields, ensure_ascii=False) if fields is not None else None, now)
+             for doi, fields in results.items()])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def make_session():
+    """One HTTP session whose connection pool covers all worker threads."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=CONCURRENCY)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    mailto = MAILTO or os.environ.get('CROSSREF_MAILTO', '')
+    session.headers['User-Agent'] = 'SLR-crossref-enrich' + (f' (mailto:{mailto})' if mailto else '')
+    return session
+
+
+@telemetry.timed('crossref.fetch_batch', records=lambda result: 0 if result is None else len(result))
+def fetch_batch(session, dois):
+    """
+    Resolves up to BATCH_SIZE DOIs with one filter query. Returns {doi: fields or None}
+    for every requested DOI, or None if the query failed (the DOIs stay uncached).
+    """
+    params = {'filter': ','.join(f'doi:{doi}' for doi in dois), 'rows': len(dois),
+              'select': 'DOI,type,abstract,page,container-title,publisher'}
+    mailto = MAILTO or os.environ.get('CROSSREF_MAILTO', '')
+    if mailto:
+        params['mailto'] = mailto
+    for attempt in range(RETRIES):
+        try:
+            response = session.get(CROSSREF_API_URL, params=params, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            error, response = type(e).__name__, None
+        else:
+            if response.status_code == 200:
+                telemetry.count('bytes_fetched', len(response.content))
+                results = dict.fromkeys(dois)
+                for item in response.json()['message'].get('items', []):
+                    doi = normalize_doi(item.get('DOI', ''))
+                    if doi in results:
+                        results[doi] = crossref_fields(item)
+                return results
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in (429, 500, 502, 503, 504):
+                break
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        telemetry.count('retries', source='crossref', error=error)
+        time.sleep(int(retry_after) if retry_after.isdigit() else 2 ** attempt + random.random())
+    print(f"  Crossref query for {len(dois)} DOIs failed ({error}); they are retried on the next run.")
+    return None
+
+
+def resolve_dois(dois, cache):
+    """{doi: fields or None} for all `dois`, from the cache or Crossref (newly fetched ones are cached)."""
+    results = cache.lookup(dois)
+    telemetry.count('crossref_cache_hits', len(results))
+    missing = [doi for doi in dois if doi not in results]
+    batches = [missing[start:start + BATCH_SIZE] for start in range(0, len(missing), BATCH_SIZE)]
+    print(f"DOIs: {len(dois)} ({len(results)} cached, {len(missing)} to fetch in {len(batches)} queries)")
+    if not batches:
+        return results
+    with make_session() as session, ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        for done, fetched in enumerate(executor.map(lambda batch: fetch_batch(session, batch), batches), 1):
+            telemetry.gauge('queue_depth', len(batches) - done)
+            if fetched is not None:
+                cache.store(fetched)
+                results.update(fetched)
+    return results
+
+
+def enrich(df, cache):
+    """
+    Fills the empty ENRICH_COLUMNS cells of `df` from Crossref, matched by
+    normalized DOI. Returns (enriched copy, {column: cells filled}).
+    """
+    df = df.copy()
+    for column in ENRICH_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+        df[column] = df[column].astype(object)
+    df[ENRICHED_COLUMN] = ''
+
+    dois = df[DOI_COLUMN].apply(normalize_doi)
+    needs = (dois != '') & df[ENRICH_COLUMNS].apply(lambda col: col.map(is_empty)).any(axis=1)
+    results = resolve_dois(sorted(set(dois[needs])), cache)
+
+    filled = dict.fromkeys(ENRICH_COLUMNS, 0)
+    for index in df.index[needs]:
+        fields = results.get(dois[index])
+        if not fields:
+            continue
+        added = [column for column in ENRICH_COLUMNS if column in fields and is_empty(df.at[index, column])]
+        for column in added:
+            df.at[index, column] = fields[column]
+            filled[column] += 1
+        df.at[index, ENRICHED_COLUMN] = ';'.join(added)
+    return df, filled
+
+
+# --- Main Program ---
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, cache_file=CACHE_FILE):
+    """Enriches input_file from Crossref (through cache_file) and writes output_file."""
+    try:
+        print(f"Reading file: {input_file}")
+        df = read_excel(input_file)
+        if DOI_COLUMN not in df.columns:
+            raise KeyError(DOI_COLUMN)
+
+        cache = CrossrefCache(cache_file)
+        try:
+            with telemetry.stage('crossref.enrich', records=len(df)):
+                result, filled = enrich(df, cache)
+        finally:
+            cache.close()
+
+        print("Filled from Crossref:")
+        for column, count in filled.items():
+            print(f"  {column}: {count}")
+        print(f"Saving results to: {output_file}")
+        write_excel(result, output_file)
+        print("\nScript executed successfully!")
+        telemetry.print_summary()
+        return result
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except KeyError as e:
+        print(f"Error: The column {e} was not found in the file. Please check DOI_COLUMN.")
+
+
+if __name__ == "__main__":
+    main()
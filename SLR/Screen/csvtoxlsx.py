@@ -1,12 +1,23 @@
-import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import csv_to_excel
 
 # 修改为你的 CSV 文件路径
 csv_file = "merged_literature_data.csv"  # 例如 "merged_literature_data.csv"
-xlsx_file = os.path.splitext(csv_file)[0] + ".xlsx"
+# 如果乱码，尝试 encoding='gbk' 或 'utf-8'
+encoding = 'utf-8-sig'
+
+
+def convert(csv_file=csv_file, xlsx_file=None, encoding=encoding):
+    """把 CSV 转换为同名的 .xlsx（或 xlsx_file），返回写入的行数。"""
+    xlsx_file = xlsx_file or os.path.splitext(csv_file)[0] + ".xlsx"
+    # 分块读取 CSV 并流式写入 Excel（不会一次性载入整个 CSV）
+    rows = csv_to_excel(csv_file, xlsx_file, encoding=encoding)
+    print(f"✔️ 成功将 {csv_file} 转换为 {xlsx_file}（{rows} 行）")
+    return rows
 
-# 读取 CSV 并写入为 Excel
-df = pd.read_csv(csv_file, encoding='utf-8-sig')  # 如果乱码，尝试 encoding='gbk' 或 'utf-8'
-df.to_excel(xlsx_file, index=False)
 
-print(f"✔️ 成功将 {csv_file} 转换为 {xlsx_file}")
\ No newline at end of file
+if __name__ == "__main__":
+    convert()
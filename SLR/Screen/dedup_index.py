@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental deduplication against a persisted title/DOI index.
+
+exclusion2.py compares every pair of titles in the whole corpus each time it
+runs. This script keeps a dedup index on disk instead:
+
+- a hash map from normalized DOI to record,
+- a hash map from normalized title to record,
+- q-gram -> titles and token -> titles candidate indexes for fuzzy matching,
+  plus the titles bucketed by length,
+- the union-find forest of duplicate clusters.
+
+A new search batch is only checked against the index (and inserted into it).
+Each new title is compared only with the indexed titles that can still reach
+the threshold: those sharing one of its rarest q-grams (see _candidate_grams()),
+or, for titles too short for that, one of its rarest tokens, or else those of
+a similar length. Postings of rare q-grams stay short as the corpus grows, so
+the cost of a batch no longer grows with the whole corpus.
+Like exclusion2.py with TRANSITIVE_CLUSTERS = True, the clusters are the
+transitive closure of the matches (the index cannot know which record the
+pairwise pass would have kept). VERIFY_MODE re-clusters the whole corpus with
+exclusion2.cluster_titles(transitive=True) and confirms that the incremental
+clusters are identical.
+"""
+import json
+import math
+import os
+import sys
+
+import pandas as pd
+from thefuzz import fuzz
+
+from exclusion2 import (normalize_text, normalize_doi, cluster_titles, _find, _union,
+                        SIMILARITY_THRESHOLD, CLUSTER_COLUMN, REPRESENTATIVE_COLUMN)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration Parameters ---
+# The persisted index (created on first run)
+INDEX_FILE = 'dedup_index.json'
+# The new search batch to check against the index
+NEW_BATCH_FILE = 'new_search_batch.xlsx'
+# Output: the new batch with its cluster IDs and a duplicate flag
+OUTPUT_FILE = 'new_search_batch_dedup.xlsx'
+TITLE_COLUMN = 'title'
+DOI_COLUMN = 'doi'
+# Column holding a stable record key (e.g. DOI or source ID). If the column does not
+# exist, keys are generated from the batch file name and row number.
+KEY_COLUMN = 'record_key'
+# If True, re-cluster all indexed records from scratch and compare with the index
+VERIFY_MODE = False
+
+# Length of the q-grams of the candidate filter
+QGRAM = 3
+
+
+def _sorted_tokens(title):
+    # What token_sort_ratio compares for a normalized title
+    return ' '.join(sorted(title.split()))
+
+
+def _qgrams(title):
+    """The q-grams (with repeats) of the token-sorted title."""
+    text = _sorted_tokens(title)
+    return [text[i:i + QGRAM] for i in range(len(text) - QGRAM + 1)]
+
+
+class DedupIndex:
+    """
+    Persistent exact (DOI/title) and fuzzy (title) duplicate index.
+    Records are numbered in insertion order; the earliest record of a
+    cluster is its representative, like in exclusion2.cluster_titles().
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.keys = []           # position -> record key
+        self.titles = []         # position -> normalized title
+        self.dois = []           # position -> normalized DOI
+        self.parent = []         # union-find forest over positions
+        self.doi_map = {}        # normalized DOI -> first position
+        self.title_map = {}      # normalized title -> first position
+        self.postings = {}       # token -> positions of distinct titles containing it
+        self.gram_postings = {}  # q-gram -> positions of distinct titles containing it
+        self.lengths = {}        # title length -> positions of distinct titles
+
+    # --- Persistence ---
+
+    def save(self, path):
+        data = {
+            'threshold': self.threshold,
+            'keys': self.keys,
+            'titles': self.titles,
+            'dois': self.dois,
+            'parent': self.parent,
+            'doi_map': self.doi_map,
+            'title_map': self.title_map,
+            'postings': self.postings,
+            'gram_postings': self.gram_postings,
+            'lengths': self.lengths,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(data['threshold'])
+        index.keys = data['keys']
+        index.titles = data['titles']
+        index.dois = data['dois']
+        index.parent = data['parent']
+        index.doi_map = data['doi_map']
+        index.title_map = data['title_map']
+        index.postings = data['postings']
+        if 'gram_postings' in data:
+            index.gram_postings = data['gram_postings']
+            index.lengths = {int(length): positions for length, positions in data['lengths'].items()}
+        else:
+            # Index written before the q-gram filter existed: rebuild all candidate indexes
+            index.postings = {}
+            for position in sorted(index.title_map.values()):
+                index._index_title(position)
+        return index
+
+    # --- Fuzzy candidate generation ---
+
+    def _max_distance(self, length):
+        """
+        Largest indel distance between a title of `length` characters and any
+        title that can still reach the threshold. token_sort_ratio is
+        100 * (1 - distance / (len_a + len_b)), rounded, and the length filter
+        below bounds len_b, so distance <= (len_a + max len_b) * (100.5 - threshold) / 100.
+        """
+        min_ratio = (self.threshold - 0.5) / 100
+        if min_ratio <= 0:
+            return math.inf
+        longest = length * (2 / min_ratio - 1)
+        return math.floor((length + longest) * (100.5 - self.threshold) / 100)
+
+    def _candidate_tokens(self, title):
+        """
+        Picks the rarest tokens of a title such that any indexed title that is
+        at least `threshold` similar must contain at least one of them, or
+        returns None if no such set exists. A single edit can remove at most
+        two tokens from the other title (deleting the space between them, or
+        splitting/changing tokens next to it), so with `max_distance` edits any
+        `2 * max_distance + 1` distinct tokens include a shared one. Titles with
+        fewer tokens than that (most short titles at a low threshold) can match
+        a title that shares no token at all.
+        """
+        tokens = sorted(set(title.split()), key=lambda t: len(self.postings.get(t, ())))
+        needed = 2 * self._max_distance(len(title)) + 1
+        return tokens[:needed] if needed <= len(tokens) else None
+
+    def _candidate_grams(self, title):
+        """
+        Picks the rarest q-grams of the token-sorted title such that any indexed
+        title that is at least `threshold` similar must contain one of them, or
+        returns None if no such set exists (q-gram count filter). One insertion
+        or deletion destroys at most QGRAM of the title's q-grams, so with
+        `max_distance` edits the other title keeps all but
+        `QGRAM * max_distance` of them, and any `QGRAM * max_distance + 1` of
+        them include a shared one.
+        """
+        grams = sorted(_qgrams(title), key=lambda g: len(self.gram_postings.get(g, ())))
+        needed = QGRAM * self._max_distance(len(title)) + 1
+        return set(grams[:needed]) if needed <= len(grams) else None
+
+    def _length_range(self, length):
+        """Title lengths that pass the length filter of _fuzzy_candidates() for a title of `length`."""
+        min_ratio = (self.threshold - 0.5) / 100
+        if min_ratio <= 0:
+            return range(0, max(self.lengths, default=0) + 1)
+        # One length of slack on each side against rounding; the length filter is exact
+        return range(max(0, math.ceil(length * min_ratio / (2 - min_ratio)) - 1),
+                     math.floor(length * (2 / min_ratio - 1)) + 2)
+
+    def _fuzzy_candidates(self, title):
+        grams = self._candidate_grams(title)
+        tokens = self._candidate_tokens(title) if grams is None else None
+        candidates = set()
+        if grams is not None:
+            for gram in grams:
+                candidates.update(self.gram_postings.get(gram, ()))
+        elif tokens is not None:
+            for token in tokens:
+                candidates.update(self.postings.get(token, ()))
+        else:
+            # Too short for either filter: compare against the distinct titles of a similar length
+            for length in self._length_range(len(title)):
+                candidates.update(self.lengths.get(length, ()))
+        # Length filter: token_sort_ratio cannot reach the threshold if the lengths differ too much
+        # (fuzz rounds the score, so allow half a point of slack)
+        max_ratio = (self.threshold - 0.5) / 100
+        return [c for c in candidates
+                if 2 * min(len(title), len(self.titles[c])) / max(len(title) + len(self.titles[c]), 1) >= max_ratio]
+
+    # --- Insertion ---
+
+    def add(self, key, title, doi=None):
+        """
+        Inserts one record and merges it with any exact or fuzzy duplicate.
+        Returns the record's position in the index.
+        """
+        position = len(self.keys)
+        title = normalize_text(title)
+        doi = normalize_doi(doi)
+        self.keys.append(str(key))
+        self.titles.append(title)
+        self.dois.append(doi)
+        self.parent.append(position)
+
+        if doi:
+            if doi in self.doi_map:
+                _union(self.parent, self.doi_map[doi], position)
+            else:
+                self.doi_map[doi] = position
+
+        if title in self.title_map:
+            _union(self.parent, self.title_map[title], position)
+            return position
+        self.title_map[title] = position
+
+        for candidate in self._fuzzy_candidates(title):
+            if _find(self.parent, candidate) == _find(self.parent, position):
+                continue
+            if fuzz.token_sort_ratio(title, self.titles[candidate]) >= self.threshold:
+                _union(self.parent, candidate, position)
+
+        self._index_title(position)
+        return position
+
+    def _index_title(self, position):
+        """Adds a distinct title to the candidate indexes."""
+        title = self.titles[position]
+        for token in set(title.split()):
+            self.postings.setdefault(token, []).append(position)
+        for gram in set(_qgrams(title)):
+            self.gram_postings.setdefault(gram, []).append(position)
+        self.lengths.setdefault(len(title), []).append(position)
+
+    def add_batch(self, df, title_col=TITLE_COLUMN, doi_col=DOI_COLUMN, key_col=KEY_COLUMN, batch_name='batch'):
+        """
+        Inserts a batch of records. Returns a copy of the batch with the record key,
+        the cluster it belongs to (the key of the cluster's representative) and
+        whether it duplicates a record that was already indexed.
+        """
+        df = df.copy()
+        if key_col not in df.columns:
+            df[key_col] = [f"{batch_name}:{i}" for i in range(len(df))]
+        dois = df[doi_col] if doi_col in df.columns else [None] * len(df)
+
+        first_new_position = len(self.keys)
+        positions = [self.add(key, title, doi) for key, title, doi in zip(df[key_col], df[title_col], dois)]
+        roots = [_find(self.parent, p) for p in positions]
+        df[CLUSTER_COLUMN] = [self.keys[root] for root in roots]
+        df[REPRESENTATIVE_COLUMN] = [root == p for p, root in zip(positions, roots)]
+        df['duplicate_of_indexed'] = [root < first_new_position for root in roots]
+        return df
+
+    # --- Inspection / verification ---
+
+    def clusters(self):
+        """Returns the clusters as a set of frozensets of record keys."""
+        groups = {}
+        for position, key in enumerate(self.keys):
+            groups.setdefault(_find(self.parent, position), set()).add(key)
+        return {frozenset(group) for group in groups.values()}
+
+    def verify_against_full_rebuild(self):
+        """
+        Re-clusters all indexed records with exclusion2.cluster_titles(transitive=True) at the
+        index's threshold and compares the partitions. Returns (is_equal, only_incremental, only_full).
+        """
+        df = pd.DataFrame({'key': self.keys, 'title': self.titles, 'doi': self.dois})
+        full = cluster_titles(df, 'title', doi_col='doi', transitive=True, threshold=self.threshold)
+        full_clusters = {frozenset(group) for group in full.groupby(CLUSTER_COLUMN)['key']
+                         .apply(set).tolist()}
+        incremental_clusters = self.clusters()
+        only_incremental = incremental_clusters - full_clusters
+        only_full = full_clusters - incremental_clusters
+        return not only_incremental and not only_full, only_incremental, only_full
+
+
+# --- Main Program ---
+def main(index_file=INDEX_FILE, new_batch_file=NEW_BATCH_FILE, output_file=OUTPUT_FILE, verify=VERIFY_MODE):
+    """Adds a new search batch to the index (or verifies the index against a full rebuild)."""
+    try:
+        if os.path.exists(index_file):
+            print(f"Loading dedup index: {index_file}")
+            index = DedupIndex.load(index_file)
+        else:
+            print(f"No index found, creating a new one: {index_file}")
+            index = DedupIndex()
+        print(f"Indexed records: {len(index.keys)}")
+
+        if verify:
+            print("\nVerifying the incremental index against a full rebuild...")
+            is_equal, only_incremental, only_full = index.verify_against_full_rebuild()
+            if is_equal:
+                print("Verification passed: incremental clusters equal the full rebuild.")
+            else:
+                print(f"Verification FAILED: {len(only_incremental)} clusters only in the index, "
+                      f"{len(only_full)} clusters only in the full rebuild.")
+                for group in list(only_full)[:10]:
+                    print(f"  full rebuild cluster: {sorted(group)}")
+        else:
+            print(f"Reading new batch: {new_batch_file}")
+            batch = read_excel(new_batch_file)
+            batch_name = os.path.splitext(os.path.basename(new_batch_file))[0]
+            result = index.add_batch(batch, batch_name=batch_name)
+            index.save(index_file)
+
+            duplicates = int(result['duplicate_of_indexed'].sum())
+            within_batch = int((~result['duplicate_of_indexed'] & ~result[REPRESENTATIVE_COLUMN]).sum())
+            print(f"New records: {len(result)}")
+            print(f"  duplicates of already indexed records: {duplicates}")
+            print(f"  duplicates within the batch: {within_batch}")
+            print(f"  unique new records: {int(result[REPRESENTATIVE_COLUMN].sum())}")
+            print(f"Saving results to: {output_file}")
+            write_excel(result, output_file)
+
+        print("\nScript executed successfully!")
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except KeyError as e:
+        print(f"Error: The column {e} was not found in the file. Please check TITLE_COLUMN/DOI_COLUMN/KEY_COLUMN.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 from thefuzz import fuzz
+from concurrent.futures import ProcessPoolExecutor
+import os
 import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
 
 # --- Configuration Parameters ---
 # Input Excel file name
@@ -13,6 +20,22 @@ TITLE_COLUMN = 'title'
 # Similarity threshold (0-100). Titles with a similarity score above this value will be considered duplicates.
 # 95 is a relatively strict and safe value, which you can adjust as needed.
 SIMILARITY_THRESHOLD = 95
+# Audit file listing every record with the ID of the duplicate cluster it was merged into
+CLUSTER_FILE = 'Exclusion345_dup_clusters.xlsx'
+# Number of worker processes for the fuzzy matching step (1 = run in this process).
+# Workers attach to the titles published once as a memory-mapped Arrow file (slrkit/shared_corpus.py).
+WORKERS = 1
+# Titles per side of one worker task (a tile of the pair matrix); each task converts only its two blocks
+PAIR_BLOCK_SIZE = 1000
+# Column names written by cluster_titles()
+CLUSTER_COLUMN = 'dup_cluster_id'
+REPRESENTATIVE_COLUMN = 'is_cluster_representative'
+# Also merge reworded near-duplicates found by title + abstract embeddings (semantic_dedup.py)
+SEMANTIC_DEDUP = False
+# False: a title only joins the cluster of an earlier kept title that it matches itself (the
+# original pairwise behaviour). True: clusters are the transitive closure of all fuzzy matches,
+# i.e. A~B and B~C put A and C in one cluster even if A and C are below the threshold.
+TRANSITIVE_CLUSTERS = False
 
 def normalize_text(text):
     """
@@ -28,88 +51,238 @@ def normalize_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def deduplicate_titles(df, title_col):
+def normalize_doi(doi):
     """
-    Deduplicates titles in a DataFrame based on exact and fuzzy matching.
+    Normalizes a DOI for exact matching: lowercase, without the resolver prefix.
+    Returns "" for missing values.
     """
-    print("Starting the deduplication process...")
-    initial_count = len(df)
-    print(f"Original number of articles: {initial_count}")
+    if not isinstance(doi, str):
+        return ""
+    doi = doi.strip().lower()
+    doi = re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', doi)
+    doi = re.sub(r'^doi:\s*', '', doi)
+    return doi if doi.startswith('10.') else ""
 
-    # --- Step 1: Exact deduplication based on normalized titles ---
-    # Create a new column for the normalized title to use for comparison
-    df['normalized_title'] = df[title_col].apply(normalize_text)
-    
-    # Drop rows where the normalized title is an exact duplicate, keeping the first occurrence
-    df_exact_dedup = df.drop_duplicates(subset=['normalized_title'], keep='first')
-    
-    exact_dedup_count = len(df_exact_dedup)
-    print(f"Remaining after exact deduplication: {exact_dedup_count} (Removed {initial_count - exact_dedup_count} exact duplicates)")
+def _find(parent, i):
+    """Union-find lookup with path compression."""
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
 
-    # Reset the index to facilitate operations based on index
-    df_processed = df_exact_dedup.reset_index(drop=True)
+def _union(parent, i, j):
+    """Merges the clusters of i and j; the earlier record stays the representative."""
+    root_i, root_j = _find(parent, i), _find(parent, j)
+    if root_i != root_j:
+        parent[max(root_i, root_j)] = min(root_i, root_j)
 
-    # --- Step 2: Fuzzy matching for near-duplicate titles ---
-    # Use a set to store the indices of rows to be dropped
-    indices_to_drop = set()
-    
-    titles = df_processed['normalized_title'].tolist()
+def _fuzzy_pairs_block(args):
+    """
+    Worker task: all pairs (a, b) with a in [a_start, a_end), b in [b_start, b_end)
+    and a < b whose similarity reaches `threshold`. Only the two blocks of titles
+    are converted from the shared Arrow column, not the whole column.
+    """
+    a_start, a_end, b_start, b_end, threshold = args
+    from slrkit.shared_corpus import worker_column
+    column = worker_column('title')
+    left = column.slice(a_start, a_end - a_start).to_pylist()
+    same_block = a_start == b_start
+    right = left if same_block else column.slice(b_start, b_end - b_start).to_pylist()
+    pairs = []
+    for i, title in enumerate(left):
+        for j in range(i + 1 if same_block else 0, len(right)):
+            if fuzz.token_sort_ratio(title, right[j]) >= threshold:
+                pairs.append((a_start + i, b_start + j))
+    return pairs
+
+def fuzzy_pairs_parallel(distinct_titles, workers, threshold=None):
+    """
+    Scores all pairs of `distinct_titles` in `workers` processes. The titles are
+    published once as a shared Arrow file instead of being pickled to every task.
+    The pair matrix is cut into PAIR_BLOCK_SIZE x PAIR_BLOCK_SIZE tiles, one task
+    each. The threshold (default: SIMILARITY_THRESHOLD) travels with every task,
+    so an override also reaches spawned workers, which re-import this module.
+    """
+    from slrkit.shared_corpus import SharedCorpus, init_worker
+    threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+    count = len(distinct_titles)
+    bounds = [(start, min(start + PAIR_BLOCK_SIZE, count)) for start in range(0, count, PAIR_BLOCK_SIZE)]
+    tasks = [(a_start, a_end, b_start, b_end, threshold)
+             for number, (a_start, a_end) in enumerate(bounds) for b_start, b_end in bounds[number:]]
+    with SharedCorpus(pd.DataFrame({'title': distinct_titles})) as corpus:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(corpus.path,)) as pool:
+            return [pair for pairs in pool.map(_fuzzy_pairs_block, tasks) for pair in pairs]
+
+@telemetry.timed('dedup.cluster_titles', records=len)
+def cluster_titles(df, title_col, doi_col=None, transitive=None, threshold=None):
+    """
+    Groups duplicate records into clusters (union-find over exact and fuzzy title matches,
+    plus exact DOI matches if `doi_col` is given). Fuzzy matches are merged transitively
+    only if `transitive` (default: TRANSITIVE_CLUSTERS) is True; titles match from
+    `threshold` (default: SIMILARITY_THRESHOLD) on.
+    Returns a copy of the DataFrame with two extra columns:
+    - CLUSTER_COLUMN: the cluster ID (numbered in order of first occurrence)
+    - REPRESENTATIVE_COLUMN: True for the first record of each cluster
+    """
+    if transitive is None:
+        transitive = TRANSITIVE_CLUSTERS
+    if threshold is None:
+        threshold = SIMILARITY_THRESHOLD
+    df = df.copy()
+    titles = df[title_col].apply(normalize_text).tolist()
     num_titles = len(titles)
+    parent = list(range(num_titles))
 
+    # --- Step 1: Exact matches on the normalized title ---
+    first_position = {}
+    for position, title in enumerate(titles):
+        if title in first_position:
+            _union(parent, first_position[title], position)
+        else:
+            first_position[title] = position
+    if doi_col is not None and doi_col in df.columns:
+        first_doi_position = {}
+        for position, doi in enumerate(df[doi_col].apply(normalize_doi)):
+            if not doi:
+                continue
+            if doi in first_doi_position:
+                _union(parent, first_doi_position[doi], position)
+            else:
+                first_doi_position[doi] = position
+    unique_positions = sorted(first_position.values())
+    print(f"Remaining after exact deduplication: {len(unique_positions)} (Removed {num_titles - len(unique_positions)} exact duplicates)")
+
+    # --- Step 2: Fuzzy matching between the distinct titles ---
     print("\nStarting fuzzy matching deduplication (this may take a few minutes, please be patient)...")
-    
-    # This is an O(n^2) loop, which is feasible for a few thousand records
-    for i in range(num_titles):
-        # If the current row is already marked for deletion, skip to the next one
-        if i in indices_to_drop:
-            continue
-            
-        for j in range(i + 1, num_titles):
-            if j in indices_to_drop:
+    if WORKERS > 1:
+        pairs = fuzzy_pairs_parallel([titles[i] for i in unique_positions], WORKERS, threshold)
+        if transitive:
+            # All matching pairs are merged, so the clusters are the same as in the serial loop
+            for a, b in pairs:
+                _union(parent, unique_positions[a], unique_positions[b])
+        else:
+            # Replays the serial loop: earlier kept titles absorb the later titles they match
+            partners = {}
+            for a, b in pairs:
+                partners.setdefault(a, []).append(b)
+            for a in sorted(partners):
+                i = unique_positions[a]
+                if _find(parent, i) != i:
+                    continue
+                for b in sorted(partners[a]):
+                    j = unique_positions[b]
+                    if _find(parent, j) == j:
+                        _union(parent, i, j)
+    else:
+        # This is an O(n^2) loop, which is feasible for a few thousand records
+        for a, i in enumerate(unique_positions):
+            # A title already merged into an earlier one does not absorb others (unless transitive)
+            if not transitive and _find(parent, i) != i:
                 continue
-            
-            # Use token_sort_ratio to ignore word order, making the comparison more robust
-            similarity_score = fuzz.token_sort_ratio(titles[i], titles[j])
-            
-            if similarity_score >= SIMILARITY_THRESHOLD:
-                # If the similarity is high enough, mark the second article for deletion
-                indices_to_drop.add(j)
-
-    # Drop the marked rows from the DataFrame
-    df_fuzzy_dedup = df_processed.drop(index=list(indices_to_drop))
-    
-    final_count = len(df_fuzzy_dedup)
-    print(f"Remaining after fuzzy matching: {final_count} (Removed {len(indices_to_drop)} near duplicates)")
+            for j in unique_positions[a + 1:]:
+                if _find(parent, i) == _find(parent, j):
+                    continue
+                if not transitive and _find(parent, j) != j:
+                    continue
+                # Use token_sort_ratio to ignore word order, making the comparison more robust
+                if fuzz.token_sort_ratio(titles[i], titles[j]) >= threshold:
+                    _union(parent, i, j)
 
-    # Remove the helper column to restore the original structure
-    df_final = df_fuzzy_dedup.drop(columns=['normalized_title'])
-    
+    # --- Step 3 (optional): Confirmed semantic near-duplicates, e.g. a preprint and its reworded published version ---
+    # (confirmed pairs are always merged, also when TRANSITIVE_CLUSTERS is False)
+    if SEMANTIC_DEDUP:
+        import semantic_dedup
+        for i, j in semantic_dedup.semantic_pairs(df, title_col, doi_col=doi_col or semantic_dedup.DOI_COLUMN):
+            _union(parent, i, j)
+
+    roots = [_find(parent, position) for position in range(num_titles)]
+    cluster_ids = {}
+    for root in roots:
+        cluster_ids.setdefault(root, len(cluster_ids))
+    df[CLUSTER_COLUMN] = [cluster_ids[root] for root in roots]
+    df[REPRESENTATIVE_COLUMN] = [root == position for position, root in enumerate(roots)]
+    return df
+
+def deduplicate_titles(df, title_col, cluster_file=None):
+    """
+    Deduplicates titles in a DataFrame based on exact and fuzzy matching.
+    Keeps the first record (the representative) of every duplicate cluster.
+    If `cluster_file` is given, all records with their cluster IDs are saved there as an audit trail.
+    """
+    print("Starting the deduplication process...")
+    initial_count = len(df)
+    print(f"Original number of articles: {initial_count}")
+
+    with telemetry.stage('dedup.deduplicate_titles', records=initial_count):
+        df_clustered = cluster_titles(df, title_col)
+        if cluster_file:
+            print(f"Saving duplicate clusters to: {cluster_file}")
+            write_excel(df_clustered, cluster_file)
+        df_final = df_clustered[df_clustered[REPRESENTATIVE_COLUMN]].drop(columns=[CLUSTER_COLUMN, REPRESENTATIVE_COLUMN])
+
+    final_count = len(df_final)
+    telemetry.count('duplicates_removed', initial_count - final_count)
+    print(f"Remaining after fuzzy matching: {final_count}")
     print(f"\nDeduplication complete! A total of {initial_count - final_count} articles were removed.")
     
     return df_final
 
+def is_duplicate_member(row):
+    """
+    True if the row belongs to a duplicate cluster but is not its representative.
+    Screening scripts skip these rows and receive the decision via propagate_cluster_decisions().
+    """
+    if REPRESENTATIVE_COLUMN not in row.index:
+        return False
+    value = row[REPRESENTATIVE_COLUMN]
+    return pd.notna(value) and not bool(value)
+
+def propagate_cluster_decisions(df, columns):
+    """
+    Copies the values of `columns` from each cluster's representative to all other members.
+    Does nothing if the DataFrame has no cluster columns.
+    """
+    if CLUSTER_COLUMN not in df.columns or REPRESENTATIVE_COLUMN not in df.columns:
+        return df
+    representatives = df[df[REPRESENTATIVE_COLUMN].astype(bool)].set_index(CLUSTER_COLUMN)
+    members = ~df[REPRESENTATIVE_COLUMN].astype(bool)
+    for column in columns:
+        if column in df.columns:
+            df.loc[members, column] = df.loc[members, CLUSTER_COLUMN].map(representatives[column]).values
+    return df
+
 
 # --- Main Program ---
-if __name__ == "__main__":
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, cluster_file=CLUSTER_FILE, title_column=TITLE_COLUMN):
+    """
+    Deduplicates `input_file` and writes the result and the duplicate cluster audit file.
+    """
     try:
         # Read the Excel file
         # The openpyxl engine needs to be installed: pip install openpyxl
-        print(f"Reading file: {INPUT_FILE}")
-        df = pd.read_excel(INPUT_FILE)
+        print(f"Reading file: {input_file}")
+        df = read_excel(input_file, compact=True)
         
         # Execute the deduplication function
-        deduplicated_df = deduplicate_titles(df, TITLE_COLUMN)
+        # (the cluster file keeps an audit trail of which records were merged)
+        deduplicated_df = deduplicate_titles(df, title_column, cluster_file=cluster_file)
         
         # Save the results to a new Excel file
-        print(f"Saving results to: {OUTPUT_FILE}")
-        deduplicated_df.to_excel(OUTPUT_FILE, index=False)
+        print(f"Saving results to: {output_file}")
+        write_excel(deduplicated_df, output_file)
         
         print("\nScript executed successfully!")
+        telemetry.print_summary()
 
     except FileNotFoundError:
-        print(f"Error: The file '{INPUT_FILE}' was not found. Please ensure the filename is correct and the script is in the same directory as the file.")
+        print(f"Error: The file '{input_file}' was not found. Please ensure the filename is correct and the script is in the same directory as the file.")
     except KeyError:
-        print(f"Error: The column '{TITLE_COLUMN}' was not found in the file. Please check your Excel file and update the TITLE_COLUMN variable in the script.")
+        print(f"Error: The column '{title_column}' was not found in the file. Please check your Excel file and update the TITLE_COLUMN variable in the script.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
+
+if __name__ == "__main__":
+    main()
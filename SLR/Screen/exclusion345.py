@@ -1,8 +1,17 @@
 import pandas as pd
 import os
+import sys
 import time
 from openai import OpenAI
 from tqdm import tqdm
+from logprob_classifier import classify_single_token
+from token_metrics import TokenMetrics
+from exclusion2 import is_duplicate_member, propagate_cluster_decisions
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.compact import MemoryReport, set_cell
+from slrkit.excel_io import read_excel, write_excel
 
 # --- 配置 ---
 # ▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼
@@ -10,24 +19,43 @@ from tqdm import tqdm
 YOUR_OPENAI_API_KEY = ""
 # ▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲
 
+# 单 token logprob 模式：每个问题只生成 1 个 token，并根据 logprobs 计算 P(Yes)，
+# 概率会保存在判断结果旁边（例如 'AI_C3_PrimarySource_prob' 列）
+USE_LOGPROB_MODE = False
+LOGPROB_THRESHOLD = 0.5
+
+# 每次 API 调用的输入/输出/缓存 token 数和延迟会追加写入这个表
+METRICS_FILE = 'token_metrics.csv'
+
 # ------------------- 下面的代码请不要修改 -------------------
 
-# 检查密钥是否已填写
-# 使用你填写的密钥初始化 OpenAI 客户端
-try:
-    client = OpenAI(api_key=YOUR_OPENAI_API_KEY)
-except Exception as e:
-    print(f"初始化 OpenAI 客户端时出错: {e}")
-    exit()
+# 没有拿到可用回复时写入的判断结果（两种模式相同）
+API_ERROR = 'API_Error'
+
+# OpenAI 客户端在第一次使用时才创建，导入本模块时不做任何工作
+client = None
+
+METRICS = TokenMetrics(METRICS_FILE)
 
 # --- 函数定义 ---
-def classify_with_gpt(prompt, max_retries=3):
+def get_client():
+    """
+    返回 OpenAI 客户端；第一次调用时用上面填写的密钥（为空时使用 OPENAI_API_KEY 环境变量）创建。
+    """
+    global client
+    if client is None:
+        client = OpenAI(api_key=YOUR_OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY"))
+    return client
+
+@telemetry.timed('gpt.c345', failed=lambda decision: decision == API_ERROR)
+def classify_with_gpt(prompt, max_retries=3, record_id=None):
     """
     使用 OpenAI GPT 模型进行分类，并包含重试机制。
     """
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
+            response = METRICS.create(
+                get_client(), 'c345', record_id,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful research assistant. Your task is to answer classification questions with only 'Yes' or 'No'."},
@@ -36,7 +64,7 @@ def classify_with_gpt(prompt, max_retries=3):
                 temperature=0,
                 max_tokens=5
             )
-            text_response = response.choices[0].message.content.strip().capitalize()
+            text_response = (response.choices[0].message.content or '').strip().capitalize()
             if 'Yes' in text_response:
                 return 'Yes'
             elif 'No' in text_response:
@@ -44,87 +72,163 @@ def classify_with_gpt(prompt, max_retries=3):
             else:
                 return 'Uncertain'
         except Exception as e:
+            telemetry.count('retries', phase='c345', error=type(e).__name__)
+            print(f"API 调用出错: {e}。将在 {5 * (attempt + 1)} 秒后重试...")
+            time.sleep(5 * (attempt + 1))
+    return API_ERROR
+
+@telemetry.timed('gpt.c345_logprob', failed=lambda result: result[0] == API_ERROR)
+def classify_with_gpt_logprob(prompt, max_retries=3, record_id=None):
+    """
+    单 token + logprobs 版本的分类，返回 (判断结果, P(Yes))。
+    """
+    for attempt in range(max_retries):
+        try:
+            decision, probability, _ = classify_single_token(
+                get_client(), "gpt-3.5-turbo",
+                [
+                    {"role": "system", "content": "You are a helpful research assistant. Your task is to answer classification questions with only 'Yes' or 'No'."},
+                    {"role": "user", "content": prompt}
+                ],
+                threshold=LOGPROB_THRESHOLD,
+                create=lambda **kwargs: METRICS.create(get_client(), 'c345', record_id, **kwargs)
+            )
+            # 回复中没有 logprobs 时 classify_single_token 返回 'Error'，与文本模式统一为 API_ERROR
+            return (API_ERROR if decision == 'Error' else decision), probability
+        except Exception as e:
+            telemetry.count('retries', phase='c345', error=type(e).__name__)
             print(f"API 调用出错: {e}。将在 {5 * (attempt + 1)} 秒后重试...")
             time.sleep(5 * (attempt + 1))
-    return "API_Error"
+    return API_ERROR, None
 
-def intelligent_screening(input_filename='phase2_screened_gpt_output.xlsx'):
+def classify(prompt, record_id=None):
+    """
+    根据当前模式调用 GPT，返回 (判断结果, P(Yes))；非 logprob 模式下概率为 None。
+    """
+    if USE_LOGPROB_MODE:
+        return classify_with_gpt_logprob(prompt, record_id=record_id)
+    return classify_with_gpt(prompt, record_id=record_id), None
+
+def screen_record(row, record_id=None, stop_on_exclusion=False):
+    """
+    对单条记录执行 C3/C4/C5 三个判断，返回 {列名: 结果} 字典
+    （logprob 模式下还包含对应的 '_prob' 列）。
+    stop_on_exclusion=True 时，第一个不是 'Yes' 的判断之后不再调用 API。
+    """
+    data = {key: str(row.get(key, '')) for key in 
+            ['ENTRYTYPE', 'title', 'isbn', 'publisher', 'source', 'booktitle', 'series', 'note', 'url']}
+
+    prompts = {}
+    prompts['AI_C3_PrimarySource'] = f"""Is the following a primary research source (like a peer-reviewed journal article or conference paper)? Exclude books, theses (PhD/Master's), and editorials.
+    - Entry Type: "{data['ENTRYTYPE']}"
+    - Title: "{data['title']}"
+    - ISBN: "{data['isbn']}"
+    - Publisher: "{data['publisher']}"
+    Answer with only 'Yes' or 'No'."""
+
+    prompts['AI_C4_VenueType'] = f"""Is the publication venue a main conference or journal? Exclude venues that are clearly a workshop, symposium, doctoral consortium, or companion proceeding.
+    - Source/Journal: "{data['source']}"
+    - Book Title: "{data['booktitle']}"
+    - Series: "{data['series']}"
+    Answer with only 'Yes' or 'No'."""
+
+    prompts['AI_C5_GreyLiterature'] = f"""Is this a formal, peer-reviewed publication? Exclude non-refereed grey literature like technical reports or preprints from servers like arXiv.
+    - Entry Type: "{data['ENTRYTYPE']}"
+    - Note: "{data['note']}"
+    - Publisher: "{data['publisher']}"
+    Answer with only 'Yes' or 'No'."""
+
+    result = {}
+    for column, prompt in prompts.items():
+        decision, probability = classify(prompt, record_id=record_id)
+        result[column] = decision
+        if USE_LOGPROB_MODE:
+            result[f'{column}_prob'] = probability
+        if stop_on_exclusion and decision != 'Yes':
+            break
+    return result
+
+def is_included(result):
+    """C3/C4/C5 全部为 'Yes' 时才纳入。"""
+    return all(result.get(col) == 'Yes' for col in ['AI_C3_PrimarySource', 'AI_C4_VenueType', 'AI_C5_GreyLiterature'])
+
+def intelligent_screening(input_filename='phase2_screened_gpt_output.xlsx',
+                          output_all_filename='slr_gpt_results_all.xlsx',
+                          output_included_filename='slr_gpt_results_included.xlsx'):
     """
     使用 GPT API 对 SLR 数据进行智能筛选，并每100条保存一次进度。
+    数据以紧凑格式保存在内存中（见 slrkit/compact.py）。
     """
+    memory = MemoryReport()
+    try:
+        get_client()
+    except Exception as e:
+        print(f"初始化 OpenAI 客户端时出错: {e}")
+        return
+
     try:
-        df = pd.read_excel(input_filename)
+        df = read_excel(input_filename, compact=True)
         print(f"成功加载 '{input_filename}'。发现 {len(df)} 条记录。")
     except FileNotFoundError:
         print(f"错误: 文件 '{input_filename}' 未找到。")
         return
 
-    # 定义输出文件名
-    output_all_filename = 'slr_gpt_results_all.xlsx'
-
     # 为AI的判断结果创建新的列 (如果它们不存在)
     for col in ['AI_C3_PrimarySource', 'AI_C4_VenueType', 'AI_C5_GreyLiterature']:
         if col not in df.columns:
             df[col] = ''
+        if USE_LOGPROB_MODE and f'{col}_prob' not in df.columns:
+            df[f'{col}_prob'] = None
+    memory.add('Loaded', df)
+
+    with telemetry.stage('screen.c345', records=0) as stage_info:
+        for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="正在使用GPT筛选文章"):
+            # 如果这一行已经被处理过了 (AI_C3列有值)，就跳过
+            if pd.notna(row['AI_C3_PrimarySource']) and row['AI_C3_PrimarySource'] != '':
+                continue
+            # 重复文献簇（见 exclusion2.py）只筛选代表记录，结果最后再复制给其他成员
+            if is_duplicate_member(row):
+                continue
 
-    for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="正在使用GPT筛选文章"):
-        # 如果这一行已经被处理过了 (AI_C3列有值)，就跳过
-        if pd.notna(row['AI_C3_PrimarySource']) and row['AI_C3_PrimarySource'] != '':
-            continue
-
-        data = {key: str(row.get(key, '')) for key in 
-                ['ENTRYTYPE', 'title', 'isbn', 'publisher', 'source', 'booktitle', 'series', 'note', 'url']}
-
-        prompt_c3 = f"""Is the following a primary research source (like a peer-reviewed journal article or conference paper)? Exclude books, theses (PhD/Master's), and editorials.
-        - Entry Type: "{data['ENTRYTYPE']}"
-        - Title: "{data['title']}"
-        - ISBN: "{data['isbn']}"
-        - Publisher: "{data['publisher']}"
-        Answer with only 'Yes' or 'No'."""
-        df.loc[index, 'AI_C3_PrimarySource'] = classify_with_gpt(prompt_c3)
-
-        prompt_c4 = f"""Is the publication venue a main conference or journal? Exclude venues that are clearly a workshop, symposium, doctoral consortium, or companion proceeding.
-        - Source/Journal: "{data['source']}"
-        - Book Title: "{data['booktitle']}"
-        - Series: "{data['series']}"
-        Answer with only 'Yes' or 'No'."""
-        df.loc[index, 'AI_C4_VenueType'] = classify_with_gpt(prompt_c4)
-        
-        prompt_c5 = f"""Is this a formal, peer-reviewed publication? Exclude non-refereed grey literature like technical reports or preprints from servers like arXiv.
-        - Entry Type: "{data['ENTRYTYPE']}"
-        - Note: "{data['note']}"
-        - Publisher: "{data['publisher']}"
-        Answer with only 'Yes' or 'No'."""
-        df.loc[index, 'AI_C5_GreyLiterature'] = classify_with_gpt(prompt_c5)
-
-        # --- 新增的自动保存逻辑 ---
-        # 每处理100条记录就保存一次
-        if (index + 1) % 100 == 0:
-            try:
-                df.to_excel(output_all_filename, index=False)
-                # 使用 tqdm.write 打印信息，避免弄乱进度条
-                tqdm.write(f"--- 进度已保存！已处理 {index + 1}/{len(df)} 篇文章 ---")
-            except Exception as e:
-                tqdm.write(f"--- 保存进度时出错: {e} ---")
+            telemetry.gauge('queue_depth', len(df) - index)
+            stage_info['records'] += 1
+            for column, value in screen_record(row, record_id=index).items():
+                set_cell(df, index, column, value)
+
+            # --- 新增的自动保存逻辑 ---
+            # 每处理100条记录就保存一次
+            if (index + 1) % 100 == 0:
+                try:
+                    write_excel(df, output_all_filename)
+                    # 使用 tqdm.write 打印信息，避免弄乱进度条
+                    tqdm.write(f"--- 进度已保存！已处理 {index + 1}/{len(df)} 篇文章 ---")
+                except Exception as e:
+                    tqdm.write(f"--- 保存进度时出错: {e} ---")
 
     # --- 最终处理和保存 ---
+    criteria_columns = ['AI_C3_PrimarySource', 'AI_C4_VenueType', 'AI_C5_GreyLiterature']
+    propagate_cluster_decisions(df, criteria_columns + [f'{col}_prob' for col in criteria_columns])
+
     all_criteria_passed = (df['AI_C3_PrimarySource'] == 'Yes') & \
                           (df['AI_C4_VenueType'] == 'Yes') & \
                           (df['AI_C5_GreyLiterature'] == 'Yes')
     df['Included_AI_Final'] = pd.Series(all_criteria_passed).map({True: 'Yes', False: 'No'})
+    memory.add('Screened', df)
     
     # 最后再完整保存一次，确保所有数据都已写入
-    df.to_excel(output_all_filename, index=False)
+    write_excel(df, output_all_filename)
     print(f"\n筛选完成！所有AI辅助判断的结果已保存至 '{output_all_filename}'。")
 
     df_included = df[all_criteria_passed]
-    output_included_filename = 'slr_gpt_results_included.xlsx'
-    df_included.to_excel(output_included_filename, index=False)
+    write_excel(df_included, output_included_filename)
     
     total_included = len(df_included)
     total_excluded = len(df) - total_included
     print(f"最终统计: {total_included} 篇文章被纳入, {total_excluded} 篇文章被排除。")
     print(f"已筛选出的文章数据保存至 '{output_included_filename}'。")
+    memory.print_report()
+    METRICS.print_summary()
+    telemetry.print_summary()
 
 # --- 运行脚本 ---
 if __name__ == '__main__':
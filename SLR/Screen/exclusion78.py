@@ -1,8 +1,19 @@
 import pandas as pd
-import json
+import multiprocessing
 import time
 import os
+import re
 import sys
+from token_metrics import TokenMetrics, truncate_to_token_budget
+from exclusion2 import is_duplicate_member, propagate_cluster_decisions
+from snapshot_store import record_key
+from structured_output import INCLUDE_EXCLUDE, ParseError, count_failure, count_recall, parse_reply
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.compact import MemoryReport, set_cell
+from slrkit.excel_io import read_excel, write_excel
+from slrkit.work_queue import MAX_ATTEMPTS, WorkQueue, worker_name
 
 # --- Configuration ---
 # IMPORTANT: Set your OpenAI API Key here.
@@ -19,51 +30,91 @@ OUTPUT_FILE = 'Exclusion_Screening_Results_OpenAI.xlsx'
 TITLE_COLUMN = 'title'
 ABSTRACT_COLUMN = 'abstract'
 
+# Abstracts longer than this many tokens are truncated (None = no truncation)
+ABSTRACT_TOKEN_BUDGET = None
+# Per-call input/output/cached token counts and latency are appended here
+# (in queue mode every worker appends to its own token_metrics.<worker>.csv instead)
+METRICS_FILE = 'token_metrics.csv'
+
+# Queue mode (main_queue()): any number of workers, on this machine or on others that
+# see the same QUEUE_FILE, screen the records from one shared lease-based queue.
+# Each machine can use its own OPENAI_API_KEY.
+QUEUE_FILE = 'ec78_queue.sqlite'
+# Records claimed per batch, and seconds a claimed record stays with a worker without progress
+QUEUE_BATCH_SIZE = 10
+QUEUE_LEASE_SECONDS = 300
+# Worker processes started by main_queue() on this machine
+QUEUE_WORKERS = 1
+# Seconds an idle worker waits before looking for leases of crashed workers again
+QUEUE_POLL_SECONDS = 30
+
+# Fields of the JSON reply: free-text comments (None) and the Include/Exclude decisions
+EC78_SCHEMA = {'EC7_Comment': None, 'EC7_Decision': INCLUDE_EXCLUDE,
+               'EC8_Comment': None, 'EC8_Decision': INCLUDE_EXCLUDE}
+RESULT_COLUMNS = ['EC7_Comment', 'EC7_Decision', 'EC8_Comment', 'EC8_Decision', 'Overall_Decision']
+API_FAILED_COMMENT = "API call failed after multiple retries."
+
 # --- OpenAI API Setup ---
 # Make sure to install the OpenAI library: pip install openai
-try:
-    from openai import OpenAI
-    client = OpenAI(api_key=API_KEY)
-except ImportError:
-    print("OpenAI Python library not found. Please install it using: pip install openai")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error configuring OpenAI API: {e}")
-    sys.exit(1)
+# The client is created on first use (see get_client()), so importing this module does no work.
+client = None
 
+METRICS = TokenMetrics(METRICS_FILE)
 
-def get_screening_prompt(title, abstract):
+
+def get_client():
     """
-    Creates a detailed, structured prompt for the LLM to analyze a paper.
+    Returns the OpenAI client, creating it on the first call.
     """
-    # This prompt is identical to the Gemini version as its logic is model-agnostic.
-    prompt_content = f"""
-    You are a meticulous senior researcher conducting a Systematic Literature Review (SLR) in Software Engineering. Your task is to analyze a research paper based on its title and abstract and decide if it should be excluded according to two specific criteria.
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=API_KEY or os.environ.get("OPENAI_API_KEY"))
+    return client
+
 
-    **Research Paper Details:**
-    - **Title:** "{title}"
-    - **Abstract:** "{abstract}"
+# Static instructions shared by every paper, as an identical leading block with
+# the paper details appended at the end. OpenAI only caches prompt prefixes of
+# 1024 tokens or more, which this block does not reach, so no caching is expected;
+# cached_tokens in token_metrics.csv shows whether any happens.
+SCREENING_INSTRUCTIONS = """
+You are a meticulous senior researcher conducting a Systematic Literature Review (SLR) in Software Engineering. Your task is to analyze the research paper given at the end of this message based on its title and abstract and decide if it should be excluded according to two specific criteria.
 
-    **Exclusion Criteria:**
-    1.  **EC7:** The article mentions the use of FM-based agents without describing the employed techniques or architecture. (Does the paper seem to focus on *how* the agent works internally, or does it just mention it as a tool?)
-    2.  **EC8:** The study's primary contribution is the empirical evaluation of an agent’s performance on an SE task, rather than a novel contribution to the agent’s architectural design, patterns, or principles. (Is the main point "we created a new agent/method" or "we tested an existing agent/method"?)
+**Exclusion Criteria:**
+1.  **EC7:** The article mentions the use of FM-based agents without describing the employed techniques or architecture. (Does the paper seem to focus on *how* the agent works internally, or does it just mention it as a tool?)
+2.  **EC8:** The study's primary contribution is the empirical evaluation of an agent’s performance on an SE task, rather than a novel contribution to the agent’s architectural design, patterns, or principles. (Is the main point "we created a new agent/method" or "we tested an existing agent/method"?)
 
-    **Your Task:**
-    Analyze the paper and provide a structured JSON output. For each criterion, you must provide:
-    1.  A detailed "comment" explaining your reasoning, as if you were leaving a note for a colleague.
-    2.  A final "decision" which must be either "Include" (the paper does NOT meet this exclusion criterion) or "Exclude" (the paper DOES meet this exclusion criterion).
+**Your Task:**
+Analyze the paper and provide a structured JSON output. For each criterion, you must provide:
+1.  A detailed "comment" explaining your reasoning, as if you were leaving a note for a colleague.
+2.  A final "decision" which must be either "Include" (the paper does NOT meet this exclusion criterion) or "Exclude" (the paper DOES meet this exclusion criterion).
 
-    **JSON Output Format (MUST follow this structure exactly):**
-    {{
-      "EC7_Comment": "Your detailed analysis for EC7 here. Explain why you think the paper does or does not describe techniques/architecture based on the abstract.",
-      "EC7_Decision": "Include or Exclude",
-      "EC8_Comment": "Your detailed analysis for EC8 here. Explain if the primary contribution seems to be novel design or just performance evaluation.",
-      "EC8_Decision": "Include or Exclude"
-    }}
+**JSON Output Format (MUST follow this structure exactly):**
+{
+  "EC7_Comment": "Your detailed analysis for EC7 here. Explain why you think the paper does or does not describe techniques/architecture based on the abstract.",
+  "EC7_Decision": "Include or Exclude",
+  "EC8_Comment": "Your detailed analysis for EC8 here. Explain if the primary contribution seems to be novel design or just performance evaluation.",
+  "EC8_Decision": "Include or Exclude"
+}
+""".strip()
+
+
+def get_screening_prompt(title, abstract):
+    """
+    Creates a detailed, structured prompt for the LLM to analyze a paper.
+    The static instructions come first, the per-paper details last.
     """
-    return prompt_content
+    # This prompt is identical to the Gemini version as its logic is model-agnostic.
+    abstract = truncate_to_token_budget(abstract, ABSTRACT_TOKEN_BUDGET, MODEL_NAME)
+    paper_details = f"""
+**Research Paper Details:**
+- **Title:** "{title}"
+- **Abstract:** "{abstract}"
+""".strip()
+    return SCREENING_INSTRUCTIONS + "\n\n" + paper_details
 
-def analyze_paper_with_openai(title, abstract):
+@telemetry.timed('gpt.ec78', failed=lambda result: result.get('EC7_Decision') == 'Error')
+def analyze_paper_with_openai(title, abstract, record_id=None):
     """
     Calls the OpenAI API to analyze a single paper and returns the structured JSON response.
     Includes retry logic for API calls.
@@ -82,7 +133,8 @@ def analyze_paper_with_openai(title, abstract):
     for attempt in range(retries):
         try:
             # For GPT-4 and newer, you must enable JSON mode for reliable JSON output
-            response = client.chat.completions.create(
+            response = METRICS.create(
+                get_client(), 'ec78', record_id,
                 model=MODEL_NAME,
                 response_format={"type": "json_object"},
                 messages=[
@@ -90,32 +142,62 @@ def analyze_paper_with_openai(title, abstract):
                     {"role": "user", "content": prompt}
                 ]
             )
-            # The response content is a JSON string
-            return json.loads(response.choices[0].message.content)
         except Exception as e:
+            telemetry.count('retries', phase='ec78', error=type(e).__name__)
             print(f"API Error: {e}. Retrying in {delay} seconds... (Attempt {attempt + 1}/{retries})")
             time.sleep(delay)
-    
+            continue
+        # Malformed JSON is repaired locally; only an unrepairable reply is requested again (without waiting)
+        try:
+            return parse_reply(response.choices[0].message.content, EC78_SCHEMA, phase='ec78')
+        except ParseError as e:
+            print(f"Unusable response: {e}. (Attempt {attempt + 1}/{retries})")
+            if attempt + 1 < retries:
+                count_recall('ec78', e)
+
     # If all retries fail
+    count_failure('ec78')
     print("API call failed after multiple retries.")
     return {
-        "EC7_Comment": "API call failed after multiple retries.", "EC7_Decision": "Error",
-        "EC8_Comment": "API call failed after multiple retries.", "EC8_Decision": "Error"
+        "EC7_Comment": API_FAILED_COMMENT, "EC7_Decision": "Error",
+        "EC8_Comment": API_FAILED_COMMENT, "EC8_Decision": "Error"
     }
 
 
-def main():
+def overall_decision(ec7_decision, ec8_decision):
+    """
+    Combines the EC7 and EC8 decisions into the overall screening decision.
+    """
+    if ec7_decision == 'Exclude' or ec8_decision == 'Exclude':
+        return 'Exclude'
+    if ec7_decision == 'Include' and ec8_decision == 'Include':
+        return 'Include'
+    return 'Review Manually'
+
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
     """
     Main function to read the Excel, process each row, and save the results.
-    Includes logic to resume from a checkpoint.
+    Includes logic to resume from a checkpoint. The corpus is held in the
+    compact representation (see slrkit/compact.py).
     """
+    memory = MemoryReport()
+    try:
+        get_client()
+    except ImportError:
+        print("OpenAI Python library not found. Please install it using: pip install openai")
+        return
+    except Exception as e:
+        print(f"Error configuring OpenAI API: {e}")
+        return
+
     try:
-        if os.path.exists(OUTPUT_FILE):
-            print(f"--- Resuming from previously saved file: {OUTPUT_FILE} ---")
-            df = pd.read_excel(OUTPUT_FILE)
+        if os.path.exists(output_file):
+            print(f"--- Resuming from previously saved file: {output_file} ---")
+            df = read_excel(output_file, compact=True)
         else:
             print(f"--- Starting a new screening process ---")
-            df = pd.read_excel(INPUT_FILE)
+            df = read_excel(input_file, compact=True)
             df['EC7_Comment'] = ''
             df['EC7_Decision'] = ''
             df['EC8_Comment'] = ''
@@ -123,44 +205,54 @@ def main():
             df['Overall_Decision'] = ''
             
     except FileNotFoundError:
-        print(f"Error: Input file '{INPUT_FILE}' not found.")
+        print(f"Error: Input file '{input_file}' not found.")
         return
+    memory.add('Loaded', df)
 
-    start_index = df[df['Overall_Decision'].isin(['', pd.NA, None])].index.min()
-    
-    if pd.isna(start_index):
+    # Rows that already carry a decision (from a checkpoint) are skipped one by one: duplicate
+    # members stay '' until the end, so the first empty row is not where the work resumes.
+    pending = df['Overall_Decision'].isna() | (df['Overall_Decision'].astype(str).str.strip() == '')
+    pending &= pd.Series([not is_duplicate_member(row) for _, row in df.iterrows()], index=df.index, dtype=bool)
+
+    if not pending.any():
         print("All articles have already been processed. Nothing to do.")
     else:
-        print(f"Starting screening process for {len(df)} articles, resuming from article {start_index + 1}...")
-        for index, row in df.iloc[start_index:].iterrows():
-            print(f"Processing article {index + 1}/{len(df)}: {row[TITLE_COLUMN][:70]}...")
+        print(f"Starting screening process for {len(df)} articles, {int(pending.sum())} still to screen...")
+        with telemetry.stage('screen.ec78', records=0) as stage_info:
+            for remaining, (index, row) in zip(range(int(pending.sum()), 0, -1), df[pending].iterrows()):
+                print(f"Processing article {index + 1}/{len(df)}: {row[TITLE_COLUMN][:70]}...")
+                telemetry.gauge('queue_depth', remaining)
+                stage_info['records'] += 1
             
-            title = row[TITLE_COLUMN]
-            abstract = row[ABSTRACT_COLUMN]
+                title = row[TITLE_COLUMN]
+                abstract = row[ABSTRACT_COLUMN]
             
-            analysis_result = analyze_paper_with_openai(title, abstract)
+                analysis_result = analyze_paper_with_openai(title, abstract, record_id=index)
             
-            df.at[index, 'EC7_Comment'] = analysis_result.get('EC7_Comment', 'Error parsing response.')
-            df.at[index, 'EC7_Decision'] = analysis_result.get('EC7_Decision', 'Error')
-            df.at[index, 'EC8_Comment'] = analysis_result.get('EC8_Comment', 'Error parsing response.')
-            df.at[index, 'EC8_Decision'] = analysis_result.get('EC8_Decision', 'Error')
-
-            ec7_decision = df.at[index, 'EC7_Decision']
-            ec8_decision = df.at[index, 'EC8_Decision']
-
-            if ec7_decision == 'Exclude' or ec8_decision == 'Exclude':
-                df.at[index, 'Overall_Decision'] = 'Exclude'
-            elif ec7_decision == 'Include' and ec8_decision == 'Include':
-                df.at[index, 'Overall_Decision'] = 'Include'
-            else:
-                df.at[index, 'Overall_Decision'] = 'Review Manually'
-
-            if (index + 1) % 100 == 0:
-                df.to_excel(OUTPUT_FILE, index=False)
-                print(f"--- Progress saved at article {index + 1} ---")
-
-    df.to_excel(OUTPUT_FILE, index=False)
-    
+                set_cell(df, index, 'EC7_Comment', analysis_result.get('EC7_Comment', 'Error parsing response.'))
+                set_cell(df, index, 'EC7_Decision', analysis_result.get('EC7_Decision', 'Error'))
+                set_cell(df, index, 'EC8_Comment', analysis_result.get('EC8_Comment', 'Error parsing response.'))
+                set_cell(df, index, 'EC8_Decision', analysis_result.get('EC8_Decision', 'Error'))
+
+                set_cell(df, index, 'Overall_Decision',
+                         overall_decision(df.at[index, 'EC7_Decision'], df.at[index, 'EC8_Decision']))
+
+                if (index + 1) % 100 == 0:
+                    write_excel(df, output_file)
+                    print(f"--- Progress saved at article {index + 1} ---")
+
+    # Duplicate cluster members take over the decision of their representative
+    propagate_cluster_decisions(df, RESULT_COLUMNS)
+    memory.add('Screened', df)
+    write_excel(df, output_file)
+    print_decision_summary(df, output_file)
+    memory.print_report()
+
+
+def print_decision_summary(df, output_file):
+    """
+    Prints the decision counts and the token/telemetry summaries.
+    """
     decision_counts = df['Overall_Decision'].value_counts()
     print("\n--- Screening Complete ---")
     print("Summary of decisions:")
@@ -170,11 +262,157 @@ def main():
         included_count = decision_counts['Include']
         print(f"\nYou have approximately {included_count} articles to include in the next phase.")
     
-    print(f"\nResults have been saved to '{OUTPUT_FILE}'.")
+    print(f"\nResults have been saved to '{output_file}'.")
+    METRICS.print_summary()
+    telemetry.print_summary()
+
+
+def queue_tasks(df):
+    """
+    Record keys of `df` (see snapshot_store.record_key()) and the queue tasks
+    {record key: {'title', 'abstract'}}. Duplicate cluster members are not queued.
+    """
+    keys = [record_key(row) for _, row in df.iterrows()]
+    tasks = {}
+    for key, (_, row) in zip(keys, df.iterrows()):
+        if not is_duplicate_member(row):
+            tasks.setdefault(key, {'title': row[TITLE_COLUMN], 'abstract': row[ABSTRACT_COLUMN]})
+    return keys, tasks
+
+
+def worker_metrics_file(worker, metrics_file=METRICS_FILE):
+    """Metrics table of one queue worker, so concurrent workers never append to the same file."""
+    root, ext = os.path.splitext(metrics_file)
+    return f"{root}.{re.sub(r'[^A-Za-z0-9_.-]', '_', worker)}{ext}"
+
+
+def work_queue(queue_file=QUEUE_FILE, worker=None):
+    """
+    Screens records from the shared queue until it is empty. Every record's lease
+    is renewed right before its API call, so a record another worker took over
+    (after this worker stalled) is not paid for twice.
+    """
+    worker = worker or worker_name()
+    if METRICS.path:
+        METRICS.path = worker_metrics_file(worker)
+    queue = WorkQueue(queue_file, lease_seconds=QUEUE_LEASE_SECONDS)
+    screened = 0
+    remaining = []
+    try:
+        with telemetry.stage('screen.ec78_queue', records=0) as stage_info:
+            while True:
+                batch = queue.claim(worker, QUEUE_BATCH_SIZE)
+                if not batch:
+                    # Leased records of crashed workers come back once their lease expires
+                    if not queue.open_tasks():
+                        break
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    continue
+                remaining = [key for key, _ in batch]
+                for key, task in batch:
+                    held = queue.renew(worker, remaining)
+                    remaining.remove(key)
+                    if key not in held:
+                        print(f"[{worker}] Lease on {key} expired, skipping it.")
+                        continue
+                    print(f"[{worker}] Processing {key}: {str(task['title'])[:70]}...")
+                    result = analyze_paper_with_openai(task['title'], task['abstract'], record_id=key)
+                    result = {column: result.get(column, 'Error parsing response.' if column.endswith('Comment') else 'Error')
+                              for column in RESULT_COLUMNS[:4]}
+                    result['Overall_Decision'] = overall_decision(result['EC7_Decision'], result['EC8_Decision'])
+                    if not queue.complete(worker, key, result, failed=result['EC7_Comment'] == API_FAILED_COMMENT):
+                        print(f"[{worker}] Lease on {key} was lost during the request, result discarded.")
+                    screened += 1
+                    stage_info['records'] += 1
+                telemetry.gauge('queue_depth', queue.open_tasks())
+    except KeyboardInterrupt:
+        queue.release(worker, remaining)
+        print(f"[{worker}] Stopped, unfinished records were returned to the queue.")
+        raise
+    finally:
+        queue.close()
+    print(f"[{worker}] Queue empty, {screened} records screened by this worker.")
+    return screened
+
+
+def _queue_worker(settings, queue_file, worker):
+    # Worker processes do not inherit settings changed after import (e.g. by slr.py)
+    globals().update(settings)
+    work_queue(queue_file, worker)
+
+
+def main_queue(input_file=INPUT_FILE, output_file=OUTPUT_FILE, queue_file=QUEUE_FILE, workers=QUEUE_WORKERS):
+    """
+    Queue mode: adds the records of input_file to queue_file (records already in
+    the queue keep their results), screens them with `workers` processes, and
+    writes output_file once no record is left. Run the same command on other
+    machines with access to queue_file to add more workers; the last worker to
+    finish writes the output.
+    """
+    try:
+        get_client()
+    except ImportError:
+        print("OpenAI Python library not found. Please install it using: pip install openai")
+        return
+    except Exception as e:
+        print(f"Error configuring OpenAI API: {e}")
+        return
+
+    try:
+        df = read_excel(input_file, compact=True)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+
+    keys, tasks = queue_tasks(df)
+    queue = WorkQueue(queue_file, lease_seconds=QUEUE_LEASE_SECONDS)
+    added = queue.enqueue(tasks)
+    print(f"--- Queue '{queue_file}': {added} records added, status {queue.counts()} ---")
+    queue.close()
+
+    settings = {name: globals()[name] for name in ('API_KEY', 'MODEL_NAME', 'ABSTRACT_TOKEN_BUDGET',
+                                                   'QUEUE_BATCH_SIZE', 'QUEUE_LEASE_SECONDS', 'QUEUE_POLL_SECONDS')}
+    processes = [multiprocessing.Process(target=_queue_worker, args=(settings, queue_file, f"{worker_name()}-{n}"))
+                 for n in range(1, workers)]
+    for process in processes:
+        process.start()
+    try:
+        work_queue(queue_file, f"{worker_name()}-0")
+    finally:
+        for process in processes:
+            process.join()
+
+    queue = WorkQueue(queue_file)
+    try:
+        if queue.open_tasks():
+            print(f"{queue.open_tasks()} records are still being screened by other workers; "
+                  f"the last worker to finish writes '{output_file}'.")
+            return
+        results = queue.results()
+    finally:
+        queue.close()
+
+    for column in RESULT_COLUMNS:
+        df[column] = ''
+    for index, key in zip(df.index, keys):
+        if key in results and not is_duplicate_member(df.loc[index]):
+            for column in RESULT_COLUMNS:
+                set_cell(df, index, column, results[key][column])
+    unscreened = sum(1 for key in tasks if key not in results)
+    if unscreened:
+        print(f"{unscreened} records were given up after {MAX_ATTEMPTS} expired leases and are left blank for manual review.")
+    propagate_cluster_decisions(df, RESULT_COLUMNS)
+    # Workers finishing at the same time each write their own file and swap it in atomically
+    root, ext = os.path.splitext(output_file)
+    tmp_file = f"{root}.{os.getpid()}{ext}"
+    write_excel(df, tmp_file)
+    os.replace(tmp_file, output_file)
+    print_decision_summary(df, output_file)
+    return df
 
 
 if __name__ == "__main__":
-    if API_KEY == "YOUR_OPENAI_API_KEY" or not API_KEY:
+    if API_KEY == "YOUR_OPENAI_API_KEY" or not (API_KEY or os.environ.get("OPENAI_API_KEY")):
         print("ERROR: Please replace 'YOUR_OPENAI_API_KEY' with your actual OpenAI API key in the script.")
     else:
         main()
@@ -1,13 +1,23 @@
 import pandas as pd
 import time
 import os
+import sys
 from openai import OpenAI, OpenAIError
+from logprob_classifier import classify_single_token
+from token_metrics import DeadlineExceeded, TokenMetrics, truncate_to_token_budget
+from exclusion2 import is_duplicate_member, propagate_cluster_decisions
+from structured_output import YES_NO, ParseError, count_failure, count_recall, parse_reply
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.compact import MemoryReport, set_cell
+from slrkit.excel_io import read_excel, write_excel
 
 # ========== CONFIG ==========
 # IMPORTANT: Replace with your OpenAI API key below.
 # For security, it's recommended to use environment variables for your API key.
+# If left empty, the OPENAI_API_KEY environment variable is used.
 api_key = ""
-client = OpenAI(api_key=api_key)
 
 INPUT_FILE = "final_merged_literature_data.xlsx"
 OUTPUT_FILE = "phase2_screened_gpt_output.xlsx"
@@ -15,19 +25,57 @@ CHECKPOINT_INTERVAL = 100  # Save progress every 100 articles
 
 MODEL = "gpt-3.5-turbo"  # or "gpt-4"
 RATE_LIMIT_DELAY = 1  # Delay in seconds between each API call
+
+# Single-token logprob mode: each criterion is asked separately with max_tokens=1
+# and the Yes/No decision is derived from the token probabilities. The probability
+# is stored next to the decision (e.g. "fm_llm_prob") for thresholds and escalation.
+USE_LOGPROB_MODE = False
+LOGPROB_THRESHOLD = 0.5  # P(Yes) at or above this value counts as "Yes"
+
+# Token budget: abstracts longer than this are truncated (None = no truncation).
+ABSTRACT_TOKEN_BUDGET = None
+# Optional cap on the reply of the three-line free-text mode (None = no cap). The
+# reply is about 15 tokens; a cap cuts off replies that drift into explanations.
+MAX_OUTPUT_TOKENS = None
+# Per-call input/output/cached token counts and latency are appended here
+METRICS_FILE = "token_metrics.csv"
+# Replies that cannot be repaired locally are requested again this many times;
+# after that the criteria are set to "Error" (manual review) instead of "No"
+PARSE_RETRIES = 1
 # =============================
 
+METRICS = TokenMetrics(METRICS_FILE)
+
+# The OpenAI client is created on first use (see get_client()), not at import
+client = None
+
+# Column name -> (label used in gpt_screening_result, single-criterion question)
+CRITERIA = {
+    "fm_llm": ("FM/LLM", "Does the article explicitly claim that its core subject is the use of a Foundation Model (FM) or Large Language Model (LLM) based agent? A brief mention is not enough. The agent must be central to the paper's contribution."),
+    "se_related": ("SE", "Does the study involve a Software Engineering (SE) task or discuss software/system architecture? SE tasks include requirements, design, coding, testing, maintenance, etc."),
+    "english": ("English", "Is the article written in English?"),
+}
+
+def get_client():
+    """
+    Returns the OpenAI client, creating it on the first call.
+    """
+    global client
+    if client is None:
+        client = OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+    return client
+
 def safe_str(text):
     """Safely converts input to a clean string, handling potential NaN values."""
     return str(text).strip() if pd.notna(text) else ""
 
-def build_prompt(title, abstract, keywords):
-    """
-    Builds the prompt for the GPT model based on the refined requirements.
-    """
-    return f"""
+# Static instructions; the per-paper fields always come last (see
+# format_paper_details), so every prompt starts with the same block. OpenAI only
+# caches prompt prefixes of 1024 tokens or more and these instructions are far
+# shorter, so no caching is expected; cached_tokens in token_metrics.csv shows it.
+SCREENING_INSTRUCTIONS = """
 You are a research assistant conducting a systematic literature review (SLR).
-Your task is to strictly evaluate the following paper based on its Title, Abstract, and Keywords.
+Your task is to strictly evaluate the paper given at the end of this message based on its Title, Abstract, and Keywords.
 
 Evaluate the paper against these three criteria:
 
@@ -37,11 +85,6 @@ Evaluate the paper against these three criteria:
 
 Your evaluation must be strict. If you are uncertain about any criterion based on the provided text, answer 'No'.
 
-**Paper Details:**
-- **Title**: {safe_str(title)}
-- **Abstract**: {safe_str(abstract)}
-- **Keywords**: {safe_str(keywords)}
-
 **Your Response:**
 Respond ONLY in the following format, without any explanations or introductory text:
 FM/LLM: <Yes/No>
@@ -49,21 +92,98 @@ SE: <Yes/No>
 English: <Yes/No>
 """.strip()
 
-def call_gpt(prompt, retries=3):
+CRITERION_INSTRUCTIONS = """
+You are a research assistant conducting a systematic literature review (SLR).
+Your task is to strictly evaluate the paper given at the end of this message based on its Title, Abstract, and Keywords.
+
+**Question**: {question}
+
+Your evaluation must be strict. If you are uncertain based on the provided text, answer 'No'.
+Answer with a single word: Yes or No.
+""".strip()
+
+def format_paper_details(title, abstract, keywords):
+    """
+    Formats the per-paper part of the prompt, truncating the abstract to ABSTRACT_TOKEN_BUDGET.
+    """
+    abstract = truncate_to_token_budget(safe_str(abstract), ABSTRACT_TOKEN_BUDGET, MODEL)
+    return f"""
+**Paper Details:**
+- **Title**: {safe_str(title)}
+- **Abstract**: {abstract}
+- **Keywords**: {safe_str(keywords)}
+""".strip()
+
+def build_prompt(title, abstract, keywords):
+    """
+    Builds the prompt for the GPT model based on the refined requirements.
+    """
+    return SCREENING_INSTRUCTIONS + "\n\n" + format_paper_details(title, abstract, keywords)
+
+def build_criterion_prompt(question, title, abstract, keywords):
+    """
+    Builds a prompt for a single criterion, answered with exactly one token (Yes or No).
+    """
+    return CRITERION_INSTRUCTIONS.format(question=question) + "\n\n" + format_paper_details(title, abstract, keywords)
+
+@telemetry.timed("gpt.inclusion_logprob", failed=lambda result: result[0] == "Error")
+def call_gpt_logprob(prompt, retries=3, record_id=None):
+    """
+    Asks a single Yes/No question with one output token and logprobs enabled.
+    Returns (decision, probability_of_yes); ("Error", None) if all retries fail.
+    """
+    for attempt in range(retries):
+        try:
+            decision, probability, _ = classify_single_token(
+                get_client(), MODEL, [{"role": "user", "content": prompt}], threshold=LOGPROB_THRESHOLD,
+                create=lambda **kwargs: METRICS.create(get_client(), "inclusion", record_id, **kwargs)
+            )
+            return decision, probability
+        except (OpenAIError, DeadlineExceeded) as e:
+            telemetry.count("retries", phase="inclusion", error=type(e).__name__)
+            wait_time = 2 ** attempt  # Exponential backoff
+            print(f"⚠️ GPT API Error (Attempt {attempt + 1}/{retries}): {e}. Retrying in {wait_time}s...")
+            time.sleep(wait_time)
+    print("❌ Failed to get a response from GPT after multiple retries.")
+    return "Error", None
+
+def screen_with_logprobs(title, abstract, keywords, record_id=None):
+    """
+    Evaluates every criterion in single-token logprob mode.
+    Returns ({column: decision}, {column: probability}, summary_text).
+    """
+    decisions, probabilities, lines = {}, {}, []
+    for column, (label, question) in CRITERIA.items():
+        prompt = build_criterion_prompt(question, title, abstract, keywords)
+        decision, probability = call_gpt_logprob(prompt, record_id=record_id)
+        decisions[column] = decision
+        probabilities[column] = probability
+        prob_text = f"{probability:.3f}" if probability is not None else "n/a"
+        lines.append(f"{label}: {decision} (p={prob_text})")
+    return decisions, probabilities, "\n".join(lines)
+
+@telemetry.timed("gpt.inclusion", failed=lambda reply: reply.startswith("Error"))
+def call_gpt(prompt, retries=3, record_id=None):
     """
     Calls the OpenAI API. Includes a retry mechanism with exponential backoff for robustness.
     """
     for attempt in range(retries):
         try:
-            response = client.chat.completions.create(
+            # The reply length is only capped when MAX_OUTPUT_TOKENS is set
+            limits = {"max_tokens": MAX_OUTPUT_TOKENS} if MAX_OUTPUT_TOKENS else {}
+            response = METRICS.create(
+                get_client(), "inclusion", record_id,
                 model=MODEL,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0  # Set to 0 for more deterministic and reproducible outputs
+                temperature=0,  # Set to 0 for more deterministic and reproducible outputs
+                **limits
             )
-            return response.choices[0].message.content
-        except OpenAIError as e:
+            # content is None for a refused or filtered reply; parse_reply() treats '' as unusable
+            return response.choices[0].message.content or ""
+        except (OpenAIError, DeadlineExceeded) as e:
+            telemetry.count("retries", phase="inclusion", error=type(e).__name__)
             wait_time = 2 ** attempt  # Exponential backoff
             print(f"⚠️ GPT API Error (Attempt {attempt + 1}/{retries}): {e}. Retrying in {wait_time}s...")
             time.sleep(wait_time)
@@ -73,65 +193,123 @@ def call_gpt(prompt, retries=3):
 def parse_criteria(reply):
     """
     Parses the raw text response from GPT into structured Yes/No values.
+    Drifted replies ("fm/llm: yes.", JSON, markdown) are repaired; raises
+    ParseError if a criterion is missing or not Yes/No.
     """
-    reply_lower = reply.lower() if isinstance(reply, str) else ""
-    fm = "Yes" if "fm/llm: yes" in reply_lower else "No"
-    se = "Yes" if "se: yes" in reply_lower else "No"
-    en = "Yes" if "english: yes" in reply_lower else "No"
+    values = parse_reply(reply, {label: YES_NO for label, _ in CRITERIA.values()}, phase="inclusion", expected="lines")
+    fm, se, en = (values[label] for label, _ in CRITERIA.values())
     # Determine inclusion based on whether all criteria are met with "Yes"
     include = fm == "Yes" and se == "Yes" and en == "Yes"
     return fm, se, en, include
 
-def main():
+def screen_with_reply(title, abstract, keywords, record_id=None):
+    """
+    Evaluates all criteria with one free-text reply, requesting it again only if
+    it cannot be repaired. Returns (fm, se, en, include, reply); the criteria are
+    "Error" if no usable reply was obtained.
+    """
+    prompt = build_prompt(title, abstract, keywords)
+    for attempt in range(PARSE_RETRIES + 1):
+        reply = call_gpt(prompt, record_id=record_id)
+        if reply.startswith("Error"):
+            break
+        try:
+            return parse_criteria(reply) + (reply,)
+        except ParseError as e:
+            print(f"⚠️ Unusable reply ({e}).")
+            if attempt < PARSE_RETRIES:
+                count_recall("inclusion", e)
+    count_failure("inclusion")
+    return "Error", "Error", "Error", False, reply
+
+def screen_record(title, abstract, keywords, record_id=None):
+    """
+    Screens a single article and returns the result columns as a dict.
+    """
+    result = {}
+    if USE_LOGPROB_MODE:
+        decisions, probabilities, reply = screen_with_logprobs(title, abstract, keywords, record_id=record_id)
+        fm, se, en = decisions["fm_llm"], decisions["se_related"], decisions["english"]
+        include = fm == "Yes" and se == "Yes" and en == "Yes"
+        for column, probability in probabilities.items():
+            result[f"{column}_prob"] = probability
+    else:
+        fm, se, en, include, reply = screen_with_reply(title, abstract, keywords, record_id=record_id)
+
+    result.update({
+        "fm_llm": fm,
+        "se_related": se,
+        "english": en,
+        "included_by_gpt": include,
+        "gpt_screening_result": reply,
+    })
+    return result
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
     """
     Main function to run the literature screening process.
+    The corpus is held in the compact representation (see slrkit/compact.py).
     """
-    if os.path.exists(OUTPUT_FILE):
-        print(f"📄 Found existing output file '{OUTPUT_FILE}'. Resuming screening from checkpoint.")
+    memory = MemoryReport()
+    if os.path.exists(output_file):
+        print(f"📄 Found existing output file '{output_file}'. Resuming screening from checkpoint.")
+        df = read_excel(output_file, compact=True)
     else:
-        print(f"🚀 Starting a new screening task from '{INPUT_FILE}'.")
-        df = pd.read_excel(INPUT_FILE)
+        print(f"🚀 Starting a new screening task from '{input_file}'.")
+        df = read_excel(input_file, compact=True)
         # Prepare result columns for a new task
         df["fm_llm"] = ""
         df["se_related"] = ""
         df["english"] = ""
         df["included_by_gpt"] = False
         df["gpt_screening_result"] = ""
+        if USE_LOGPROB_MODE:
+            for column in CRITERIA:
+                df[f"{column}_prob"] = None
+    memory.add("Loaded", df)
 
     total_articles = len(df)
-    for idx in df.index:
-        # Check if the current row has already been processed
-        if pd.notna(df.at[idx, "gpt_screening_result"]) and df.at[idx, "gpt_screening_result"] != "":
-            print(f"⏩ Skipping article {idx + 1}/{total_articles} (already processed).")
-            continue
-
-        row = df.iloc[idx]
-        prompt = build_prompt(row.get("title"), row.get("abstract"), row.get("keywords"))
-        
-        print(f"🧠 Screening article {idx + 1}/{total_articles}...")
-        result = call_gpt(prompt)
-        fm, se, en, include = parse_criteria(result)
-
-        # Update the DataFrame with the new results
-        df.at[idx, "fm_llm"] = fm
-        df.at[idx, "se_related"] = se
-        df.at[idx, "english"] = en
-        df.at[idx, "included_by_gpt"] = include
-        df.at[idx, "gpt_screening_result"] = result
-
-        # Checkpoint: Save progress at the specified interval
-        if (idx + 1) % CHECKPOINT_INTERVAL == 0:
-            print(f"💾 Checkpoint reached. Saving progress for the first {idx + 1} articles...")
-            df.to_excel(OUTPUT_FILE, index=False)
-
-        time.sleep(RATE_LIMIT_DELAY)
+    with telemetry.stage("screen.inclusion", records=0) as stage_info:
+        for idx in df.index:
+            # Check if the current row has already been processed
+            if pd.notna(df.at[idx, "gpt_screening_result"]) and df.at[idx, "gpt_screening_result"] != "":
+                print(f"⏩ Skipping article {idx + 1}/{total_articles} (already processed).")
+                continue
+
+            row = df.iloc[idx]
+            # Only the representative of a duplicate cluster (see exclusion2.py) is screened
+            if is_duplicate_member(row):
+                continue
+
+            print(f"🧠 Screening article {idx + 1}/{total_articles}...")
+            telemetry.gauge("queue_depth", total_articles - idx)
+            stage_info["records"] += 1
+
+            # Update the DataFrame with the new results
+            for column, value in screen_record(row.get("title"), row.get("abstract"), row.get("keywords"), record_id=idx).items():
+                set_cell(df, idx, column, value)
+
+            # Checkpoint: Save progress at the specified interval
+            if (idx + 1) % CHECKPOINT_INTERVAL == 0:
+                print(f"💾 Checkpoint reached. Saving progress for the first {idx + 1} articles...")
+                write_excel(df, output_file)
+
+            time.sleep(RATE_LIMIT_DELAY)
+
+    # Duplicate cluster members take over the decision of their representative
+    result_columns = ["fm_llm", "se_related", "english", "included_by_gpt", "gpt_screening_result"]
+    propagate_cluster_decisions(df, result_columns + [f"{column}_prob" for column in CRITERIA])
 
     # Final save to ensure the last batch of data is written to the file
+    memory.add("Screened", df)
     print("💾 Performing final save of all results...")
-    df.to_excel(OUTPUT_FILE, index=False)
+    write_excel(df, output_file)
     
     included_count = df['included_by_gpt'].sum()
     print(f"✅ Screening complete! Total articles included: {included_count}/{total_articles}")
+    memory.print_report()
+    METRICS.print_summary()
+    telemetry.print_summary()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Single-token Yes/No classification using token log-probabilities.
+
+Instead of letting the model write free text ("FM/LLM: Yes ...") and
+substring-matching the reply, each criterion is asked as its own question,
+the model is limited to ONE output token and the top log-probabilities of
+that token are requested. The probability mass on "Yes"-like and "No"-like
+tokens is renormalised into P(Yes), which is used both for the decision and
+as a confidence score for thresholds / manual escalation.
+
+The raw P(Yes) of a model is usually over-confident. It is calibrated by
+temperature scaling of the Yes/No log-odds, with a temperature fitted on a
+manually labelled sample: label some screened records in a '<criterion>_label'
+column next to their '<criterion>_prob' column (e.g. 'fm_llm_label' next to
+'fm_llm_prob') and run
+
+    python slr.py calibrate-logprob --input labelled.xlsx
+
+which stores the fitted temperature in CALIBRATION_FILE. Every later call
+reads it from there.
+"""
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel
+
+# Tokens (after stripping whitespace/punctuation and lowercasing) that count
+# as a positive or negative answer. The tokenizer may return " Yes", "yes",
+# "YES" or "Yes." depending on context, so all variants are folded together.
+YES_TOKENS = {'yes', 'y', 'true'}
+NO_TOKENS = {'no', 'n', 'false'}
+
+# How many alternatives to request for the single output token.
+TOP_LOGPROBS = 5
+
+# Temperature used to calibrate the raw P(Yes). None uses the temperature stored in
+# CALIBRATION_FILE by calibrate(), or 1.0 (the model's probabilities as they are) if
+# nothing has been fitted yet; a number overrides both.
+CALIBRATION_TEMPERATURE = None
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logprob_calibration.json')
+# Sample labelled by hand: '<criterion>_label' columns ('Yes'/'No') next to the '<criterion>_prob' columns
+LABELLED_FILE = 'logprob_labelled_sample.xlsx'
+PROBABILITY_SUFFIX = '_prob'
+LABEL_SUFFIX = '_label'
+
+
+def _normalize_token(token):
+    return token.strip().strip('.,:;!"\'').lower()
+
+
+def calibration_temperature():
+    """The calibration temperature in effect: CALIBRATION_TEMPERATURE, the fitted one, or 1.0."""
+    if CALIBRATION_TEMPERATURE is not None:
+        return CALIBRATION_TEMPERATURE
+    if os.path.exists(CALIBRATION_FILE):
+        with open(CALIBRATION_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)['temperature']
+    return 1.0
+
+
+def yes_probability(top_logprobs, temperature=None):
+    """
+    Converts the top log-probabilities of a single output token into a
+    calibrated P(Yes) (temperature: default calibration_temperature()).
+
+    `top_logprobs` is a list of (token, logprob) pairs. Returns None if
+    neither a Yes-like nor a No-like token is among the alternatives.
+    """
+    if temperature is None:
+        temperature = calibration_temperature()
+    p_yes = 0.0
+    p_no = 0.0
+    for token, logprob in top_logprobs:
+        normalized = _normalize_token(token)
+        if normalized in YES_TOKENS:
+            p_yes += math.exp(logprob)
+        elif normalized in NO_TOKENS:
+            p_no += math.exp(logprob)
+
+    if p_yes == 0.0 and p_no == 0.0:
+        return None
+    if p_no == 0.0:
+        return 1.0
+    if p_yes == 0.0:
+        return 0.0
+
+    # Temperature scaling on the Yes/No log-odds
+    log_odds = (math.log(p_yes) - math.log(p_no)) / temperature
+    return 1.0 / (1.0 + math.exp(-log_odds))
+
+
+def decision_from_probability(probability, threshold=0.5):
+    """Maps P(Yes) to the 'Yes'/'No'/'Uncertain' labels used in the spreadsheets."""
+    if probability is None:
+        return 'Uncertain'
+    return 'Yes' if probability >= threshold else 'No'
+
+
+def extract_top_logprobs(response):
+    """
+    Reads the (token, logprob) alternatives of the first output token from an
+    OpenAI chat completion response created with logprobs=True.
+    Returns None if the response carries no logprobs at all (e.g. a model or
+    endpoint that ignores logprobs=True, or a filtered reply).
+    """
+    logprobs = response.choices[0].logprobs
+    if logprobs is None:
+        return None
+    content = logprobs.content
+    if not content:
+        return []
+    first = content[0]
+    alternatives = [(alt.token, alt.logprob) for alt in (first.top_logprobs or [])]
+    if not alternatives:
+        alternatives = [(first.token, first.logprob)]
+    return alternatives
+
+
+def classify_single_token(client, model, messages, threshold=0.5,
+                          temperature=None, create=None):
+    """
+    Sends a Yes/No question restricted to a single output token and returns
+    (decision, probability_of_yes, raw_token). The decision is 'Error' if the
+    response has no logprobs.
+
+    `create` can replace client.chat.completions.create, e.g. with a
+    TokenMetrics.create wrapper that records usage.
+    """
+    create = create or client.chat.completions.create
+    response = create(
+        model=model,
+        messages=messages,
+        temperature=0,
+        max_tokens=1,
+        logprobs=True,
+        top_logprobs=TOP_LOGPROBS
+    )
+    raw_token = response.choices[0].message.content or ''
+    top_logprobs = extract_top_logprobs(response)
+    if top_logprobs is None:
+        return 'Error', None, raw_token
+    probability = yes_probability(top_logprobs, temperature)
+    return decision_from_probability(probability, threshold), probability, raw_token
+
+
+def fit_temperature(probabilities, labels, candidates=None):
+    """
+    Fits the calibration temperature on a manually labelled sample by
+    minimising the log-loss. `labels` are 'Yes'/'No' (or booleans).
+    Returns the best temperature from `candidates`.
+    """
+    if candidates is None:
+        candidates = [0.25 * i for i in range(1, 41)]
+
+    pairs = []
+    for p, label in zip(probabilities, labels):
+        if p is None:
+            continue
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        y = 1.0 if label in (True, 'Yes', 'yes', 'Include') else 0.0
+        pairs.append((math.log(p / (1 - p)), y))
+    if not pairs:
+        return 1.0
+
+    best_temperature, best_loss = 1.0, float('inf')
+    for t in candidates:
+        loss = 0.0
+        for log_odds, y in pairs:
+            q = 1.0 / (1.0 + math.exp(-log_odds / t))
+            q = min(max(q, 1e-12), 1 - 1e-12)
+            loss -= y * math.log(q) + (1 - y) * math.log(1 - q)
+        if loss < best_loss:
+            best_temperature, best_loss = t, loss
+    return best_temperature
+
+
+def calibrate(input_file=LABELLED_FILE, output_file=CALIBRATION_FILE):
+    """
+    Fits the calibration temperature on the hand-labelled records of
+    input_file (every '<criterion>_prob' column with a '<criterion>_label'
+    column) and stores it in output_file. The probabilities are assumed to
+    have been computed with the temperature currently in effect, so the new
+    temperature is that one times the fitted factor.
+    """
+    try:
+        df = read_excel(input_file)
+    except FileNotFoundError:
+        print(f"Error: Labelled sample '{input_file}' not found.")
+        return None
+    probabilities, labels, criteria = [], [], []
+    for column in df.columns:
+        label_column = str(column)[:-len(PROBABILITY_SUFFIX)] + LABEL_SUFFIX
+        if not str(column).endswith(PROBABILITY_SUFFIX) or label_column not in df.columns:
+            continue
+        labelled = df[df[column].notna() & df[label_column].notna()]
+        probabilities += labelled[column].astype(float).tolist()
+        labels += labelled[label_column].astype(str).str.strip().tolist()
+        criteria.append(f"{label_column} ({len(labelled)})")
+    if not probabilities:
+        print(f"Error: '{input_file}' has no labelled records (a '<criterion>{LABEL_SUFFIX}' column next to "
+              f"a '<criterion>{PROBABILITY_SUFFIX}' column).")
+        return None
+
+    used = calibration_temperature()
+    temperature = used * fit_temperature(probabilities, labels)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({'temperature': temperature, 'samples': len(probabilities), 'source': os.path.basename(input_file),
+                   'fitted': datetime.now().isoformat(timespec='seconds')}, f, indent=2)
+    print(f"Labelled records: {', '.join(criteria)}")
+    print(f"Calibration temperature: {used} -> {temperature} (saved to '{output_file}')")
+    return temperature
+
+
+if __name__ == "__main__":
+    calibrate()
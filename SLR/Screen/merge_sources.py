@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Assembles the per-source search results into merged_literature_data.csv.
+
+Every database export has its own column names (IEEE 'Document Title',
+ScienceDirect 'primary_title', Springer 'Item Title', ...). This stage maps
+them onto the bib-like corpus columns the screening scripts read (title,
+abstract, keywords, doi, ENTRYTYPE, source, booktitle, series, publisher,
+isbn, note, url, pages, page_count) and appends the sources one after the
+other. Every record also gets
+
+- 'database':   the source it came from, and
+- 'record_key': its stable source ID (snapshot_store.record_key()), computed
+  on the raw export row so decisions stored by snapshot_store.py can be
+  matched against a later refresh of the same source.
+
+Duplicates across sources are kept; the dedup stage clusters them. In the
+pipeline csvtoxlsx.py turns the CSV into merged_literature_data.xlsx.
+"""
+import ast
+import os
+import re
+import sys
+
+import pandas as pd
+
+from snapshot_store import KEY_COLUMN, record_key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel
+
+# --- Configuration ---
+SEARCH_DIR = os.path.join('..', 'manual search & database auto search')
+# (database, export file) in the order the records are appended; missing files are skipped
+SOURCES = [
+    ('ieee', os.path.join(SEARCH_DIR, 'ieee', 'ieee_merged_results.xlsx')),
+    ('acm', os.path.join(SEARCH_DIR, 'acm', 'acm-database-search.xlsx')),
+    ('sciencedirect', os.path.join(SEARCH_DIR, 'sciencedirect', 'sciencedirect_with_page_count.xlsx')),
+    ('springer', os.path.join(SEARCH_DIR, 'springer', 'springerlink_with_page_count.xlsx')),
+    ('wos', os.path.join(SEARCH_DIR, 'webofsceince', 'merged_results.xlsx')),
+    ('dblp', os.path.join(SEARCH_DIR, 'dblp', 'my_literature_summary.xlsx')),
+    ('arxiv', os.path.join(SEARCH_DIR, 'arxiv', 'arXiv_Final_Results_v3.xlsx')),
+]
+OUTPUT_FILE = 'merged_literature_data.csv'
+ENCODING = 'utf-8-sig'
+DATABASE_COLUMN = 'database'
+
+# Corpus column -> export columns it is taken from (the first non-empty one wins)
+CORPUS_COLUMNS = {
+    'title': ['title', 'Title', 'Document Title', 'primary_title', 'Item Title', 'Article Title'],
+    'author': ['author', 'Authors', 'authors'],
+    'abstract': ['abstract', 'Abstract'],
+    'keywords': ['keywords', 'Author Keywords', 'Keywords'],
+    'year': ['year', 'Year', 'Publication Year', 'Published Date'],
+    'doi': ['doi', 'DOI', 'Item DOI'],
+    'ENTRYTYPE': ['ENTRYTYPE', 'Type', 'type_of_reference', 'Content Type', 'Document Identifier', 'Document Type'],
+    'source': ['journal', 'journal_name', 'Publication Title', 'Journal/Conference', 'Source Title'],
+    'booktitle': ['booktitle', 'Conference Title', 'secondary_title'],
+    'series': ['series', 'Book Series Title'],
+    'publisher': ['publisher', 'Publisher'],
+    'isbn': ['isbn', 'ISBNs', 'ISBN'],
+    'note': ['note'],
+    'url': ['url', 'urls', 'URL', 'PDF Link'],
+    'pages': ['pages', 'Pages'],
+    'page_count': ['page_count', 'numpages', 'Number of Pages'],
+}
+# Start/end page columns joined into 'pages' when the export has no page range
+PAGE_RANGE_COLUMNS = [('Start Page', 'End Page'), ('start_page', 'end_page')]
+# Export record types -> bib entry types (C3 of exclusion345.py reads ENTRYTYPE)
+ENTRY_TYPES = {
+    'jour': 'article', 'article': 'article', 'ieee journals': 'article', 'ieee magazines': 'article',
+    'conf': 'inproceedings', 'cpaper': 'inproceedings', 'conference paper': 'inproceedings',
+    'proceedings paper': 'inproceedings', 'ieee conferences': 'inproceedings',
+    'chap': 'incollection', 'chapter': 'incollection', 'book chapter': 'incollection',
+    'book': 'book', 'ieee books': 'book', 'conference proceedings': 'proceedings',
+    'ieee early access articles': 'article',
+}
+# Values a source does not export but the screening prompts need (arXiv records are preprints)
+DEFAULTS = {
+    'arxiv': {'ENTRYTYPE': 'misc', 'publisher': 'arXiv', 'source': 'arXiv', 'note': 'arXiv preprint'},
+}
+
+
+def _text(value):
+    """Cell -> stripped string; "['a', 'b']" lists (rispy exports) are joined, 'N/A' counts as empty."""
+    if value is None or (not isinstance(value, (str, list)) and pd.isna(value)):
+        return ''
+    if isinstance(value, str) and value.startswith('[') and value.endswith(']'):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass
+    if isinstance(value, list):
+        value = '; '.join(str(item) for item in value)
+    if isinstance(value, float) and value.is_integer():
+        # Excel reads numeric columns with gaps as float (ISBN 9798400704956.0, numpages 6.0)
+        value = int(value)
+    value = ' '.join(str(value).split())
+    return '' if value in ('N/A', 'nan') else value
+
+
+def corpus_row(row, database):
+    """One raw export row (dict) -> one corpus row."""
+    out = {KEY_COLUMN: record_key(row), DATABASE_COLUMN: database}
+    for column, candidates in CORPUS_COLUMNS.items():
+        out[column] = next((_text(row.get(c)) for c in candidates if _text(row.get(c))), '')
+    if not out['pages']:
+        for start, end in PAGE_RANGE_COLUMNS:
+            first, last = _text(row.get(start)), _text(row.get(end))
+            if first:
+                out['pages'] = f"{first}--{last}" if last else first
+                break
+    for column, value in DEFAULTS.get(database, {}).items():
+        out[column] = out[column] or value
+    out['ENTRYTYPE'] = ENTRY_TYPES.get(out['ENTRYTYPE'].lower(), out['ENTRYTYPE'].lower())
+    # 'Published Date' (arXiv) is a full date; the corpus keeps the year
+    out['year'] = re.sub(r'^(\d{4})\D.*$', r'\1', out['year'])
+    out['url'] = out['url'].split('; ')[0]
+    out['doi'] = re.sub(r'^https?://(dx\.)?doi\.org/', '', out['doi'])
+    return out
+
+
+def to_corpus(df, database, keep=()):
+    """
+    Maps a source export onto the corpus columns. Columns listed in `keep`
+    (e.g. snapshot_store's status and decision columns) are carried over as they are.
+    """
+    keep = [c for c in keep if c in df.columns]
+    rows = []
+    for raw in df.to_dict('records'):
+        row = corpus_row(raw, database)
+        row.update({c: raw[c] for c in keep})
+        rows.append(row)
+    return pd.DataFrame(rows, columns=[KEY_COLUMN, DATABASE_COLUMN] + list(CORPUS_COLUMNS) +
+                                      [c for c in keep if c not in (KEY_COLUMN, DATABASE_COLUMN)])
+
+
+# --- Main Program ---
+def main(sources=SOURCES, output_file=OUTPUT_FILE, encoding=ENCODING):
+    """Assembles all available source exports into one corpus CSV; returns the corpus."""
+    frames = []
+    with telemetry.stage('corpus.assemble', records=0) as stage_info:
+        for database, path in sources:
+            if not os.path.exists(path):
+                print(f"  - {database}: '{path}' not found, skipped")
+                continue
+            frame = to_corpus(read_excel(path), database)
+            print(f"  - {database}: {len(frame)} records from '{path}'")
+            frames.append(frame)
+        if not frames:
+            print("No source exports found.")
+            return None
+        corpus = pd.concat(frames, ignore_index=True)
+        stage_info['records'] = len(corpus)
+
+    # Written to a temporary file first so a failed run never leaves half a corpus behind
+    tmp_path = output_file + '.tmp'
+    corpus.to_csv(tmp_path, index=False, encoding=encoding)
+    os.replace(tmp_path, output_file)
+    print(f"\nSaved {len(corpus)} records from {len(frames)} sources to '{output_file}'.")
+    telemetry.print_summary()
+    return corpus
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Page-count filter ("Exclude Less Than 8 Pages") after EC7/EC8.
+
+Short papers (fewer than MIN_PAGES pages) are excluded. The page count is
+taken from 'page_count' (scraped for ScienceDirect/Springer, 'numpages' for
+ACM) or, failing that, from the 'pages' range ("642--654"). Records whose
+count cannot be determined (no range, article numbers such as "e12345") are
+marked 'Review Manually' instead of being dropped silently.
+
+Exclusion-8pages.xlsx holds the manually checked titles of the original run
+and is not written by this stage.
+"""
+import os
+import re
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration ---
+INPUT_FILE = 'Exclusion_Screening_Results_OpenAI.xlsx'
+OUTPUT_ALL_FILE = 'Page_Filter_Results.xlsx'
+OUTPUT_INCLUDED_FILE = 'Page_Filter_Included.xlsx'
+MIN_PAGES = 8
+# Only records with this decision of the previous phase are checked
+DECISION_COLUMN = 'Overall_Decision'
+PAGE_COUNT_COLUMNS = ['page_count', 'numpages']
+PAGES_COLUMN = 'pages'
+RESULT_COLUMNS = ['Page_Count', 'Page_Decision']
+
+PAGE_RANGE_PATTERN = re.compile(r'^\s*(\d+)\s*(?:-+|–|—)\s*(\d+)\s*$')
+
+
+def page_count(row):
+    """Number of pages of a record, or None if it cannot be determined."""
+    for column in PAGE_COUNT_COLUMNS:
+        value = pd.to_numeric(row.get(column), errors='coerce')
+        if pd.notna(value) and value > 0:
+            return int(value)
+    match = PAGE_RANGE_PATTERN.match(str(row.get(PAGES_COLUMN, '') or ''))
+    if match:
+        first, last = int(match.group(1)), int(match.group(2))
+        if last >= first:
+            return last - first + 1
+    return None
+
+
+def page_decision(count, min_pages=None):
+    min_pages = MIN_PAGES if min_pages is None else min_pages
+    if count is None:
+        return 'Review Manually'
+    return 'Include' if count >= min_pages else 'Exclude'
+
+
+# --- Main Program ---
+def main(input_file=INPUT_FILE, output_all_file=OUTPUT_ALL_FILE, output_included_file=OUTPUT_INCLUDED_FILE):
+    """Adds the page count and decision to the EC7/EC8 results and writes the included records."""
+    try:
+        df = read_excel(input_file)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+
+    included = df[DECISION_COLUMN] == 'Include' if DECISION_COLUMN in df.columns else pd.Series(True, index=df.index)
+    counts = [page_count(row) for _, row in df.iterrows()]
+    df['Page_Count'] = pd.array(counts, dtype='Int64')
+    df['Page_Decision'] = [page_decision(count) if keep else '' for count, keep in zip(counts, included)]
+
+    write_excel(df, output_all_file)
+    df_included = df[df['Page_Decision'] == 'Include']
+    write_excel(df_included, output_included_file)
+
+    print(f"Checked {int(included.sum())} included records against the {MIN_PAGES}-page minimum:")
+    print(df.loc[included, 'Page_Decision'].value_counts())
+    print(f"\nAll results saved to '{output_all_file}', {len(df_included)} included records to '{output_included_file}'.")
+    return df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Fused screening pipeline with early exit per record.
+
+Instead of running inclusionscreen1_2.py -> exclusion345.py -> exclusion2.py ->
+exclusion78.py as separate whole-file passes, every record flows through the
+phases in order and stops at the first exclusion, so excluded records never
+incur later (paid) LLM calls. The cheap deterministic phases run first:
+
+    Dedup -> Rules -> Inclusion (C1/C2/language) -> C3-C5 -> EC7/EC8
+
+Each phase writes a 'Phase_<name>' column ('Pass', 'Exclude', 'Review' or
+empty when the record never reached it) next to the result columns of the
+original scripts, so the PRISMA counts can be reconstructed per phase.
+"""
+import os
+import re
+import sys
+
+import pandas as pd
+from thefuzz import fuzz
+
+from exclusion2 import normalize_text, SIMILARITY_THRESHOLD
+import inclusionscreen1_2
+import exclusion345
+import exclusion78
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel
+from slrkit.compact import MemoryReport, compact_frame, set_cell
+
+# --- Configuration ---
+INPUT_FILE = 'final_merged_literature_data.xlsx'
+OUTPUT_FILE = 'screening_pipeline_results.xlsx'
+TITLE_COLUMN = 'title'
+ABSTRACT_COLUMN = 'abstract'
+KEYWORDS_COLUMN = 'keywords'
+CHECKPOINT_INTERVAL = 100  # Save progress every 100 records
+
+PHASES = ['Dedup', 'Rules', 'Inclusion', 'C345', 'EC78']
+
+# Deterministic rule filters, checked before any LLM call.
+# Entry types that can never be primary research (C3) or are grey literature (C5)
+EXCLUDED_ENTRY_TYPES = {'book', 'phdthesis', 'mastersthesis', 'techreport'}
+# Venues that are clearly not a main conference or journal (C4)
+EXCLUDED_VENUE_PATTERN = re.compile(r'\bworkshops?\b|doctoral (?:symposium|consortium)|\bcompanion\b', re.IGNORECASE)
+# Preprint servers (C5)
+PREPRINT_PATTERN = re.compile(r'\barxiv\b|\bcorr\b', re.IGNORECASE)
+
+
+def _field(row, key):
+    value = row.get(key, '')
+    return str(value) if pd.notna(value) else ''
+
+
+class StreamingDeduplicator:
+    """
+    Exact + fuzzy title deduplication for one record at a time, using the
+    same normalisation and threshold as exclusion2.py.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}
+        self.kept = []
+
+    def find_duplicate(self, title):
+        """Returns the record id of an earlier duplicate, or None."""
+        normalized = normalize_text(title)
+        if normalized in self.exact:
+            return self.exact[normalized]
+        for other_title, record_id in self.kept:
+            if fuzz.token_sort_ratio(normalized, other_title) >= self.threshold:
+                return record_id
+        return None
+
+    def add(self, title, record_id):
+        normalized = normalize_text(title)
+        self.exact.setdefault(normalized, record_id)
+        self.kept.append((normalized, record_id))
+
+
+def apply_rule_filters(row):
+    """
+    Returns the reason for a deterministic exclusion, or None if the record passes.
+    """
+    if not _field(row, TITLE_COLUMN).strip():
+        return 'Missing title'
+    entry_type = _field(row, 'ENTRYTYPE').strip().lower()
+    if entry_type in EXCLUDED_ENTRY_TYPES:
+        return f'Entry type: {entry_type}'
+    venue = ' '.join(_field(row, key) for key in ['source', 'booktitle', 'series'])
+    if EXCLUDED_VENUE_PATTERN.search(venue):
+        return 'Venue is a workshop/companion/doctoral track'
+    preprint_fields = ' '.join(_field(row, key) for key in ['note', 'publisher', 'journal', 'source'])
+    if PREPRINT_PATTERN.search(preprint_fields):
+        return 'Preprint'
+    return None
+
+
+def screen_record(row, index, dedup):
+    """
+    Runs one record through the phases in order, stopping at the first
+    exclusion. Returns a dict of the columns to write for this record.
+    """
+    result = {f'Phase_{phase}': '' for phase in PHASES}
+
+    # --- Dedup ---
+    duplicate_of = dedup.find_duplicate(row.get(TITLE_COLUMN))
+    if duplicate_of is not None:
+        result.update({'Phase_Dedup': 'Exclude', 'Duplicate_Of': duplicate_of})
+        return _finish(result, 'Dedup', 'Exclude')
+    dedup.add(row.get(TITLE_COLUMN), index)
+    result['Phase_Dedup'] = 'Pass'
+
+    # --- Rules ---
+    reason = apply_rule_filters(row)
+    if reason:
+        result.update({'Phase_Rules': 'Exclude', 'Rule_Reason': reason})
+        return _finish(result, 'Rules', 'Exclude')
+    result['Phase_Rules'] = 'Pass'
+
+    # --- Inclusion (FM/LLM agent, SE context, English) ---
+    inclusion = inclusionscreen1_2.screen_record(
+        row.get(TITLE_COLUMN), row.get(ABSTRACT_COLUMN), row.get(KEYWORDS_COLUMN), record_id=index)
+    result.update(inclusion)
+    if 'Error' in (inclusion['fm_llm'], inclusion['se_related'], inclusion['english']) \
+            and 'No' not in (inclusion['fm_llm'], inclusion['se_related'], inclusion['english']):
+        # No usable reply: a failed call must not count as an exclusion
+        result['Phase_Inclusion'] = 'Review'
+        return _finish(result, 'Inclusion', 'Review Manually')
+    if not inclusion['included_by_gpt']:
+        result['Phase_Inclusion'] = 'Exclude'
+        return _finish(result, 'Inclusion', 'Exclude')
+    result['Phase_Inclusion'] = 'Pass'
+
+    # --- C3-C5 (primary source, venue type, grey literature) ---
+    c345 = exclusion345.screen_record(row, record_id=index, stop_on_exclusion=True)
+    result.update(c345)
+    if not exclusion345.is_included(c345):
+        decisions = [c345.get(column) for column in ['AI_C3_PrimarySource', 'AI_C4_VenueType', 'AI_C5_GreyLiterature']]
+        if 'No' not in decisions:
+            # A failed call or an 'Uncertain' answer must not count as an exclusion
+            result['Phase_C345'] = 'Review'
+            return _finish(result, 'C345', 'Review Manually')
+        result['Phase_C345'] = 'Exclude'
+        return _finish(result, 'C345', 'Exclude')
+    result['Phase_C345'] = 'Pass'
+
+    # --- EC7/EC8 ---
+    analysis = exclusion78.analyze_paper_with_openai(
+        row.get(TITLE_COLUMN), row.get(ABSTRACT_COLUMN), record_id=index)
+    for key in ['EC7_Comment', 'EC7_Decision', 'EC8_Comment', 'EC8_Decision']:
+        result[key] = analysis.get(key, 'Error')
+    decision = exclusion78.overall_decision(result['EC7_Decision'], result['EC8_Decision'])
+    result['Overall_Decision'] = decision
+    if decision == 'Exclude':
+        result['Phase_EC78'] = 'Exclude'
+        return _finish(result, 'EC78', 'Exclude')
+    if decision == 'Review Manually':
+        result['Phase_EC78'] = 'Review'
+        return _finish(result, 'EC78', 'Review Manually')
+    result['Phase_EC78'] = 'Pass'
+    return _finish(result, None, 'Include')
+
+
+def _finish(result, stopped_at, final_decision):
+    result['Stopped_At'] = stopped_at or ''
+    result['Final_Decision'] = final_decision
+    return result
+
+
+def prisma_counts(df):
+    """
+    Reconstructs the PRISMA flow from the per-phase columns:
+    how many records entered, were excluded at, and passed each phase.
+    """
+    rows = []
+    for phase in PHASES:
+        column = df[f'Phase_{phase}'].fillna('')
+        rows.append({
+            'Phase': phase,
+            'Entered': int((column != '').sum()),
+            'Excluded': int((column == 'Exclude').sum()),
+            'Review': int((column == 'Review').sum()),
+            'Passed': int((column == 'Pass').sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
+    """
+    Streams every record through all phases, with checkpoint/resume like the
+    individual screening scripts. The corpus is held in the compact
+    representation (categoricals, Arrow strings, interned authors).
+    """
+    memory = MemoryReport()
+    try:
+        if os.path.exists(output_file):
+            print(f"--- Resuming from previously saved file: {output_file} ---")
+            df = read_excel(output_file)
+        else:
+            print(f"--- Starting a new screening pipeline run from: {input_file} ---")
+            df = read_excel(input_file)
+            # Keep decisions already present in the input (e.g. carried forward by snapshot_store.py)
+            for column in [f'Phase_{phase}' for phase in PHASES] + ['Stopped_At', 'Final_Decision']:
+                if column not in df.columns:
+                    df[column] = ''
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+
+    memory.add('Loaded', df)
+    df = memory.add('Compacted', compact_frame(df))
+
+    # Rebuild the dedup state from the records kept in a previous run
+    dedup = StreamingDeduplicator()
+    done = df['Final_Decision'].notna() & (df['Final_Decision'] != '')
+    for index in df.index[done & (df['Phase_Dedup'] == 'Pass')]:
+        dedup.add(df.at[index, TITLE_COLUMN], index)
+
+    pending = df.index[~done]
+    print(f"{len(pending)} of {len(df)} records still to screen.")
+    for count, index in enumerate(pending, start=1):
+        row = df.loc[index]
+        title = _field(row, TITLE_COLUMN)
+        print(f"Processing record {index + 1}/{len(df)}: {title[:70]}...")
+
+        for column, value in screen_record(row, index, dedup).items():
+            set_cell(df, index, column, value)
+
+        if count % CHECKPOINT_INTERVAL == 0:
+            write_excel(df, output_file)
+            print(f"--- Progress saved after {count} records ---")
+
+    memory.add('Screened', df)
+    write_excel(df, output_file)
+
+    print("\n--- Screening Pipeline Complete ---")
+    print(prisma_counts(df).to_string(index=False))
+    print("\nFinal decisions:")
+    print(df['Final_Decision'].value_counts())
+    memory.print_report()
+    print(f"\nResults have been saved to '{output_file}'.")
+
+
+if __name__ == "__main__":
+    main()
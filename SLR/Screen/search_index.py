@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+Local full-text index to replay boolean search strings offline.
+
+The search strings in "manual search & database auto search/<source>/query.rtf"
+and the arXiv part1 x part2 design are currently tuned by re-running the
+remote searches. This script loads the merged corpus (title / abstract /
+keywords) into an SQLite FTS5 index and translates our boolean search syntax
+into FTS5 MATCH expressions, so a query variant is evaluated in milliseconds
+and the records it adds or loses compared to the original string can be
+listed directly.
+
+Supported syntax (the union of what the source databases accept):
+    "quoted phrase", bare words, trailing wildcards ("LLM*", "GPT-*"),
+    AND / OR / NOT, parentheses, and field prefixes such as
+    acmdlTitle:(...), abstract:(...), authkeywords:(...), TITLE-ABSTR-KEY(...),
+    TS = (...), ti:, abs:, cat:.
+Adjacent terms without an operator are combined with AND, as in the databases.
+"""
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel_sheets
+
+# --- Configuration ---
+CORPUS_FILE = 'final_merged_literature_data.xlsx'
+INDEX_FILE = 'search_index.sqlite'
+REPORT_FILE = 'search_query_variants.xlsx'
+TITLE_COLUMN = 'title'
+ABSTRACT_COLUMN = 'abstract'
+KEYWORDS_COLUMN = 'keywords'
+CATEGORIES_COLUMN = 'categories'
+# Column used to identify a record in the report (falls back to the DOI, then the row number)
+KEY_COLUMN = 'record_key'
+DOI_COLUMN = 'doi'
+# unicode61 splits on punctuation like the databases do ("GPT-4" -> "gpt" "4");
+# add ' porter' (e.g. 'porter unicode61 remove_diacritics 2') to match word stems
+TOKENIZER = 'unicode61 remove_diacritics 2'
+
+SEARCH_DIR = os.path.join('..', 'manual search & database auto search')
+QUERY_FILES = {
+    source: os.path.join(SEARCH_DIR, source, 'query.rtf')
+    for source in ['acm', 'arxiv', 'dblp', 'ieee', 'sciencedirect', 'springer', 'webofsceince']
+}
+ARXIV_SCRIPT = os.path.join(SEARCH_DIR, 'arxiv', 'arxiv-python.py')
+
+INDEXED_COLUMNS = ['title', 'abstract', 'keywords', 'categories']
+ALL_TEXT = ['title', 'abstract', 'keywords']
+# Field prefixes of the different databases -> indexed columns
+FIELD_COLUMNS = {
+    'ti': ['title'], 'title': ['title'], 'acmdltitle': ['title'],
+    'abs': ['abstract'], 'abstract': ['abstract'],
+    'authkeywords': ['keywords'], 'keywords': ['keywords'], 'kw': ['keywords'],
+    'ts': ALL_TEXT, 'title-abstr-key': ALL_TEXT, 'all': ALL_TEXT,
+    'cat': ['categories'],
+}
+
+
+# --- Reading the query.rtf files ---
+
+def rtf_to_text(rtf):
+    """Strips the RTF markup of a (TextEdit-style) .rtf file and returns its plain text."""
+    text = re.sub(r'\{\\(?:fonttbl|colortbl|\*)[^{}]*\}', '', rtf)
+    # Escaped literal characters, kept out of the way of the markup removal below
+    text = text.replace('\\\\', '\x00').replace('\\{', '\x01').replace('\\}', '\x02')
+    text = re.sub(r"\\'([0-9a-fA-F]{2})",
+                  lambda m: bytes([int(m.group(1), 16)]).decode('cp1252', errors='replace'), text)
+    text = re.sub(r'\\u(-?\d+) ?', lambda m: chr(int(m.group(1)) % 65536), text)
+    text = re.sub(r'\\\r?\n', '\n', text)
+    text = re.sub(r'\\[a-zA-Z]+-?\d* ?', '', text)
+    text = text.replace('{', '').replace('}', '')
+    return text.replace('\x00', '\\').replace('\x01', '{').replace('\x02', '}')
+
+
+def extract_search_string(text):
+    """
+    Returns the search string of a query.rtf text: everything except the
+    '#' comment header, 'Search String ...:' labels and the notes after it.
+    """
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#') or stripped.startswith('- '):
+            if lines:
+                break
+            continue
+        if not stripped or (stripped.lower().startswith('search string') and stripped.endswith(':')):
+            continue
+        lines.append(stripped)
+    return ' '.join(lines)
+
+
+def load_search_string(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return extract_search_string(rtf_to_text(f.read()))
+
+
+def load_arxiv_design(path=ARXIV_SCRIPT):
+    """Loads PART1_QUERY_STR, PART2_TERMS and build_sub_query() from arxiv-python.py."""
+    spec = importlib.util.spec_from_file_location('arxiv_python', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Boolean query -> FTS5 translation ---
+
+_TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<phrase>"[^"]*"\*?)
+      | (?!(?:AND|OR|NOT)\b)(?P<func>[A-Z][A-Z-]+)(?=\s*\()
+      | (?P<field>[A-Za-z][\w-]*)\s*[:=]\s*
+      | (?P<paren>[()])
+      | (?P<word>[^\s()"]+)
+    )''', re.VERBOSE)
+
+
+def tokenize_query(query):
+    """Splits a search string into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN_PATTERN.match(query, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Cannot parse search string at: {query[position:position + 30]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'paren' or (kind == 'word' and text in ('AND', 'OR', 'NOT')):
+            kind = text
+        elif kind in ('func', 'field'):
+            if text.lower() not in FIELD_COLUMNS:
+                raise ValueError(f"Unknown field prefix '{text}'")
+            kind = 'field'
+        tokens.append((kind, text))
+    return tokens
+
+
+def parse_query(query):
+    """
+    Parses a search string into a tree of tuples:
+    ('or', [...]), ('and', [...]), ('not', node), ('field', columns, node), ('term', text).
+    Precedence: NOT > AND (explicit or implicit) > OR.
+    """
+    tokens = tokenize_query(query)
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        items = [parse_and()]
+        while peek() == 'OR':
+            take()
+            items.append(parse_and())
+        return items[0] if len(items) == 1 else ('or', items)
+
+    def parse_and():
+        items = [parse_not()]
+        while peek() in ('AND', 'NOT', 'phrase', 'word', 'field', '('):
+            if peek() == 'AND':
+                take()
+            items.append(parse_not())
+        return items[0] if len(items) == 1 else ('and', items)
+
+    def parse_not():
+        kind = peek()
+        if kind == 'NOT':
+            take()
+            return ('not', parse_not())
+        if kind == 'field':
+            columns = FIELD_COLUMNS[take()[1].lower()]
+            return ('field', columns, parse_not())
+        if kind == '(':
+            take()
+            node = parse_or()
+            if position >= len(tokens) or take()[0] != ')':
+                raise ValueError(f"Missing ')' in search string: {query}")
+            return node
+        if kind in ('phrase', 'word'):
+            return ('term', take()[1])
+        raise ValueError(f"Unexpected token {tokens[position][1] if kind else 'end of string'!r} in: {query}")
+
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected token '{tokens[position][1]}' in search string: {query}")
+    return node
+
+
+def _emit(node):
+    """
+    Emits the FTS5 expression for a parse tree node. Terms become FTS5 phrases;
+    a trailing '*' becomes a prefix query, punctuation before it is dropped
+    ("GPT-*" -> "gpt" *). Returns None for a node without indexable characters.
+    """
+    kind = node[0]
+    if kind == 'term':
+        raw = node[1]
+        prefix = raw.rstrip('"').endswith('*')
+        words = re.findall(r'[^\W_]+', raw.lower())
+        if not words:
+            return None
+        phrase = '"' + ' '.join(words) + '"'
+        return phrase + ' *' if prefix else phrase
+    if kind == 'field':
+        inner = _emit(node[2])
+        if inner is None:
+            return None
+        return '{' + ' '.join(node[1]) + '} : (' + inner + ')'
+    if kind == 'or':
+        items = [item for item in (_emit(child) for child in node[1]) if item is not None]
+        if not items:
+            return None
+        return items[0] if len(items) == 1 else '(' + ' OR '.join(items) + ')'
+    if kind == 'and':
+        positives = [_emit(child) for child in node[1] if child[0] != 'not']
+        negatives = [_emit(child[1]) for child in node[1] if child[0] == 'not']
+        positives = [item for item in positives if item is not None]
+        negatives = [item for item in negatives if item is not None]
+        if not positives:
+            if negatives:
+                raise ValueError("FTS5 cannot evaluate NOT without a positive term to subtract from")
+            return None
+        expression = positives[0] if len(positives) == 1 else '(' + ' AND '.join(positives) + ')'
+        for negative in negatives:
+            expression = f'({expression} NOT {negative})'
+        return expression
+    if kind == 'not':
+        raise ValueError("FTS5 cannot evaluate NOT without a positive term to subtract from")
+    raise ValueError(f"Unknown query node: {kind}")
+
+
+def to_fts5(query):
+    """Translates a search string in our boolean syntax into an FTS5 MATCH expression."""
+    expression = _emit(parse_query(query))
+    if expression is None:
+        raise ValueError(f"Search string has no searchable terms: {query}")
+    return expression
+
+
+# --- The index ---
+
+def _text(value):
+    return str(value) if pd.notna(value) else ''
+
+
+def _record_keys(df):
+    if KEY_COLUMN in df.columns:
+        return [_text(k) for k in df[KEY_COLUMN]]
+    if DOI_COLUMN in df.columns:
+        return [_text(d) or f"row:{i}" for i, d in enumerate(df[DOI_COLUMN])]
+    return [f"row:{i}" for i in range(len(df))]
+
+
+class SearchIndex:
+    """
+    FTS5 index over title/abstract/keywords(/categories) of the corpus.
+    The FTS rowid is the record's row position in the corpus file.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+
+    @classmethod
+    def build(cls, df, path=INDEX_FILE, source=''):
+        """(Re)creates the index from a corpus DataFrame."""
+        index = cls(path)
+        c = index.connection
+        c.execute("DROP TABLE IF EXISTS corpus")
+        c.execute("DROP TABLE IF EXISTS meta")
+        c.execute(f"CREATE VIRTUAL TABLE corpus USING fts5(record_key UNINDEXED, "
+                  f"{', '.join(INDEXED_COLUMNS)}, tokenize='{TOKENIZER}')")
+        c.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        columns = {'title': TITLE_COLUMN, 'abstract': ABSTRACT_COLUMN,
+                   'keywords': KEYWORDS_COLUMN, 'categories': CATEGORIES_COLUMN}
+        values = {name: ([_text(v) for v in df[column]] if column in df.columns else [''] * len(df))
+                  for name, column in columns.items()}
+        rows = zip(range(len(df)), _record_keys(df), *(values[name] for name in INDEXED_COLUMNS))
+        c.executemany(f"INSERT INTO corpus (rowid, record_key, {', '.join(INDEXED_COLUMNS)}) "
+                      f"VALUES (?, ?, ?, ?, ?, ?)", rows)
+        c.executemany("INSERT INTO meta VALUES (?, ?)",
+                      [('source', source), ('records', str(len(df))), ('tokenizer', TOKENIZER)])
+        c.commit()
+        return index
+
+    @classmethod
+    def from_excel(cls, corpus_file=CORPUS_FILE, path=INDEX_FILE):
+        """Opens the index, rebuilding it if the corpus file changed since it was built."""
+        source = f"{os.path.abspath(corpus_file)}|{os.path.getmtime(corpus_file)}"
+        if os.path.exists(path):
+            index = cls(path)
+            try:
+                meta = dict(index.connection.execute("SELECT key, value FROM meta"))
+                if meta.get('source') == source and meta.get('tokenizer') == TOKENIZER:
+                    return index
+            except sqlite3.DatabaseError:
+                pass
+            index.connection.close()
+        print(f"Building search index '{path}' from '{corpus_file}'...")
+        return cls.build(read_excel(corpus_file, compact=True), path, source)
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM corpus").fetchone()[0]
+
+    def search(self, query):
+        """
+        Runs a search string against the index.
+        Returns (set of row positions, elapsed milliseconds).
+        """
+        expression = to_fts5(query)
+        start = time.perf_counter()
+        rows = self.connection.execute("SELECT rowid FROM corpus WHERE corpus MATCH ?", (expression,))
+        hits = {row[0] for row in rows}
+        return hits, (time.perf_counter() - start) * 1000
+
+    def records(self, rowids):
+        """Record key and title of the given row positions, as a DataFrame."""
+        rowids = sorted(rowids)
+        if not rowids:
+            return pd.DataFrame(columns=['row', 'record_key', 'title'])
+        rows = []
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            rows += self.connection.execute(
+                f"SELECT rowid, record_key, title FROM corpus WHERE rowid IN ({','.join('?' * len(chunk))})",
+                chunk).fetchall()
+        return pd.DataFrame(rows, columns=['row', 'record_key', 'title'])
+
+    def compare(self, base_query, variants):
+        """
+        Evaluates query variants against a base search string.
+        `variants` is {name: search string}. Returns (summary, differences) DataFrames:
+        hits / added / lost / time per variant, and the added or lost records themselves.
+        """
+        base_hits, base_ms = self.search(base_query)
+        summary = [{'Variant': '(base)', 'Hits': len(base_hits), 'Added': 0, 'Lost': 0,
+                    'Time (ms)': round(base_ms, 2), 'Query': base_query}]
+        differences = []
+        for name, query in variants.items():
+            hits, ms = self.search(query)
+            added, lost = hits - base_hits, base_hits - hits
+            summary.append({'Variant': name, 'Hits': len(hits), 'Added': len(added), 'Lost': len(lost),
+                            'Time (ms)': round(ms, 2), 'Query': query})
+            for change, rowids in [('Added', added), ('Lost', lost)]:
+                records = self.records(rowids)
+                records.insert(0, 'Change', change)
+                records.insert(0, 'Variant', name)
+                differences.append(records)
+        differences = pd.concat(differences, ignore_index=True) if differences else pd.DataFrame()
+        return pd.DataFrame(summary), differences
+
+
+def arxiv_variants(design):
+    """
+    The arXiv harvest as one search string (the OR of all part1 AND part2 sub-queries)
+    and one leave-one-out variant per part2 term, showing what each term contributes.
+    """
+    def combined(terms):
+        return ' OR '.join(f'({design.build_sub_query(term)})' for term in terms)
+
+    base = combined(design.PART2_TERMS)
+    variants = {f'without "{term}"': combined([t for t in design.PART2_TERMS if t != term])
+                for term in design.PART2_TERMS}
+    return base, variants
+
+
+# --- Main Program ---
+def main(corpus_file=CORPUS_FILE, index_file=INDEX_FILE, report_file=REPORT_FILE):
+    """Indexes the corpus and replays the search strings of the source databases."""
+    try:
+        index = SearchIndex.from_excel(corpus_file, index_file)
+        print(f"Indexed records: {len(index)}")
+
+        print("\n--- Search strings of the source databases ---")
+        summaries = []
+        for source, path in QUERY_FILES.items():
+            if not os.path.exists(path):
+                continue
+            query = load_search_string(path)
+            hits, ms = index.search(query)
+            print(f"{source:>15}: {len(hits):6d} hits in {ms:7.2f} ms")
+            summaries.append({'Source': source, 'Hits': len(hits), 'Time (ms)': round(ms, 2),
+                              'Query': query, 'FTS5': to_fts5(query)})
+
+        print("\n--- arXiv part1 x part2 design: leave-one-out per part2 term ---")
+        base, variants = arxiv_variants(load_arxiv_design(ARXIV_SCRIPT))
+        summary, differences = index.compare(base, variants)
+        print(summary[['Variant', 'Hits', 'Added', 'Lost', 'Time (ms)']].to_string(index=False))
+
+        write_excel_sheets(report_file, {
+            'Sources': pd.DataFrame(summaries),
+            'arXiv variants': summary,
+            'Added or lost': differences,
+        })
+        print(f"\nReport saved to '{report_file}'.")
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except ValueError as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Semantic near-duplicate detection with hashed n-gram embeddings and an ANN index.
+
+exclusion2.py only merges titles whose token_sort_ratio reaches 95, which
+misses a preprint and its published version when the title was reworded
+(e.g. the arXiv and the later IEEE version of a paper). This stage finds
+such pairs by the content of title + abstract:
+
+1. Every record is embedded as a hashed n-gram projection: the words, word
+   bigrams and character 4-grams of the title, and the words and bigrams of
+   the abstract, are hashed (signed) into DIM buckets. The title and
+   abstract vectors are normalized and added, so two versions with the same
+   abstract end up close even if their titles differ. No model is needed
+   and the vectors are the same on every machine.
+2. The vectors go into an IVF index (the approximate nearest-neighbour
+   scheme of FAISS' IndexIVFFlat): spherical k-means splits them into
+   about LISTS_PER_SQRT * sqrt(n) lists, and every record is only compared
+   with the members of its NPROBE nearest lists. This costs about
+   n^1.5 * NPROBE / LISTS_PER_SQRT dot products instead of n^2.
+3. Pairs with a cosine similarity >= COSINE_THRESHOLD are candidates. A
+   candidate is confirmed with the usual DOI/fuzzy checks (confirm_pair()):
+   two different non-preprint DOIs reject it, and a fuzzy title or
+   abstract match confirms it.
+
+The index (vectors keyed by a hash of the normalized title and abstract,
+plus the k-means centroids) is saved to INDEX_FILE, so records seen in an
+earlier run are neither embedded nor clustered again.
+
+Run this file on its own to review the candidates, or set SEMANTIC_DEDUP =
+True in exclusion2.py to merge the confirmed pairs into its clusters.
+"""
+import hashlib
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from thefuzz import fuzz
+
+from exclusion2 import normalize_text, normalize_doi
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration Parameters ---
+INPUT_FILE = 'Exclusion345.xlsx'
+# Output: every candidate pair with its cosine similarity and the confirmation result
+OUTPUT_FILE = 'semantic_duplicate_candidates.xlsx'
+# The persisted index (created on first run, extended on later runs)
+INDEX_FILE = 'semantic_index.npz'
+TITLE_COLUMN = 'title'
+ABSTRACT_COLUMN = 'abstract'
+DOI_COLUMN = 'doi'
+# Embedding size and the weight of the title vector relative to the abstract vector
+DIM = 256
+TITLE_WEIGHT = 1.0
+# Pairs at or above this cosine similarity are duplicate candidates
+COSINE_THRESHOLD = 0.75
+# IVF index: number of lists = LISTS_PER_SQRT * sqrt(n); lists searched per record
+LISTS_PER_SQRT = 2
+NPROBE = 8
+KMEANS_ITERATIONS = 10
+# The centroids are re-trained once the index has grown by this factor since training
+RETRAIN_GROWTH = 2.0
+SEED = 42
+# Confirmation of a candidate (thefuzz token_set_ratio, 0-100)
+CONFIRM_TITLE_RATIO = 80
+CONFIRM_ABSTRACT_RATIO = 90
+# DOI prefixes of preprint servers: a preprint DOI does not contradict a publisher DOI
+PREPRINT_DOI_PREFIXES = ('10.48550/', '10.2139/ssrn', '10.1101/', '10.20944/preprints', '10.36227/techrxiv')
+STOP_WORDS = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'its', 'of',
+              'on', 'or', 'that', 'the', 'this', 'to', 'we', 'with', 'our', 'via', 'using', 'towards'}
+
+# n-gram -> (bucket, sign); hashing is the slow part and the vocabulary repeats
+_BUCKETS = {}
+
+
+def _bucket(feature):
+    bucket = _BUCKETS.get(feature)
+    if bucket is None:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        bucket = _BUCKETS[feature] = (digest % DIM, 1.0 if (digest >> 32) & 1 else -1.0)
+    return bucket
+
+
+def _features(text, char_ngrams=False):
+    """Words (without stop words), word bigrams and optionally character 4-grams of a normalized text."""
+    words = text.split()
+    features = [w for w in words if w not in STOP_WORDS]
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if char_ngrams:
+        for word in words:
+            padded = f"#{word}#"
+            features += [padded[i:i + 4] for i in range(len(padded) - 3)]
+    return features
+
+
+def _hashed_vector(features):
+    vector = np.zeros(DIM, dtype=np.float32)
+    counts = {}
+    for feature in features:
+        counts[feature] = counts.get(feature, 0) + 1
+    for feature, count in counts.items():
+        bucket, sign = _bucket(feature)
+        vector[bucket] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed(title, abstract):
+    """Unit vector for a record (all zeros if it has neither title nor abstract)."""
+    vector = TITLE_WEIGHT * _hashed_vector(_features(normalize_text(title), char_ngrams=True))
+    vector = vector + _hashed_vector(_features(normalize_text(abstract)))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def content_key(title, abstract):
+    """Index key of a record: hash of its normalized title and abstract."""
+    text = normalize_text(title) + '\n' + normalize_text(abstract)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _spherical_kmeans(vectors, k, rng, iterations=KMEANS_ITERATIONS):
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class SemanticIndex:
+    """
+    Persistent IVF index over record embeddings: content key -> vector,
+    k-means centroids and the list each vector belongs to.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.positions = {}     # key -> row of self.vectors
+        self.vectors = np.zeros((0, DIM), dtype=np.float32)
+        self.centroids = np.zeros((0, DIM), dtype=np.float32)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                if data['vectors'].shape[1] == DIM:
+                    index.keys = data['keys'].tolist()
+                    index.vectors = data['vectors']
+                    index.centroids = data['centroids']
+                    index.lists = data['lists']
+                    index.trained_size = int(data['trained_size'])
+                    index.positions = {key: row for row, key in enumerate(index.keys)}
+                else:
+                    print(f"Index '{path}' was built with another DIM; rebuilding it.")
+        return index
+
+    def save(self, path):
+        # np.savez appends .npz unless the name already ends with it
+        np.savez(path, keys=np.array(self.keys, dtype=str), vectors=self.vectors, centroids=self.centroids,
+                 lists=self.lists, trained_size=self.trained_size)
+
+    def add(self, df, title_col, abstract_col):
+        """Embeds the records of `df` that are not indexed yet. Returns the index row of every record."""
+        titles = df[title_col].tolist()
+        abstracts = df[abstract_col].tolist() if abstract_col in df.columns else [''] * len(df)
+        keys = [content_key(t, a) for t, a in zip(titles, abstracts)]
+        new = {}
+        for position, key in enumerate(keys):
+            if key not in self.positions and key not in new:
+                new[key] = position
+        if new:
+            vectors = np.array([embed(titles[p], abstracts[p]) for p in new.values()], dtype=np.float32)
+            self.vectors = np.vstack([self.vectors, vectors])
+            for key in new:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+        telemetry.count('semantic_embedded', len(new))
+        telemetry.count('semantic_reused', len(set(keys)) - len(new))
+        self._update_lists()
+        return np.array([self.positions[key] for key in keys])
+
+    def _update_lists(self):
+        n = len(self.keys)
+        if n == 0:
+            return
+        if len(self.centroids) == 0 or n > RETRAIN_GROWTH * self.trained_size:
+            k = max(1, min(n, int(LISTS_PER_SQRT * math.sqrt(n))))
+            self.centroids = _spherical_kmeans(self.vectors, k, np.random.default_rng(SEED))
+            self.trained_size = n
+            self.lists = np.zeros(0, dtype=np.int32)
+        # Vectors added since the last run go to their nearest list
+        start = len(self.lists)
+        if start < n:
+            added = [np.argmax(self.vectors[i:i + 10000] @ self.centroids.T, axis=1)
+                     for i in range(start, n, 10000)]
+            self.lists = np.concatenate([self.lists] + added).astype(np.int32)
+
+    def similar_pairs(self, rows, threshold=None, nprobe=None):
+        """
+        {(row_a, row_b): cosine} for the pairs among the index rows `rows` that
+        reach `threshold`, searching the `nprobe` nearest lists of every row
+        (default: COSINE_THRESHOLD and NPROBE at call time, so overrides apply).
+        """
+        threshold = COSINE_THRESHOLD if threshold is None else threshold
+        nprobe = NPROBE if nprobe is None else nprobe
+        rows = np.unique(rows)
+        rows = rows[np.linalg.norm(self.vectors[rows], axis=1) > 0]
+        if len(rows) < 2:
+            return {}
+        vectors = self.vectors[rows]
+        nprobe = min(nprobe, len(self.centroids))
+        # Inverted lists over `rows`, and which rows probe each list
+        members = [[] for _ in range(len(self.centroids))]
+        for local, row in enumerate(rows):
+            members[self.lists[row]].append(local)
+        probers = [[] for _ in range(len(self.centroids))]
+        for start in range(0, len(rows), 10000):
+            scores = vectors[start:start + 10000] @ self.centroids.T
+            nearest = np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+            for offset, lists in enumerate(nearest):
+                for list_id in lists:
+                    probers[list_id].append(start + offset)
+
+        pairs = {}
+        for list_id, list_members in enumerate(members):
+            if not list_members or not probers[list_id]:
+                continue
+            queries = np.array(probers[list_id])
+            list_members = np.array(list_members)
+            similarity = vectors[queries] @ vectors[list_members].T
+            for q, m in zip(*np.nonzero(similarity >= threshold)):
+                a, b = queries[q], list_members[m]
+                if a != b:
+                    pairs[(rows[min(a, b)], rows[max(a, b)])] = float(similarity[q, m])
+        return pairs
+
+
+def _is_preprint_doi(doi):
+    return doi.startswith(PREPRINT_DOI_PREFIXES) or 'arxiv' in doi
+
+
+def confirm_pair(a, b):
+    """
+    DOI/fuzzy confirmation of a candidate pair of records (dicts with title,
+    abstract, doi). Returns (confirmed, reason).
+    """
+    doi_a, doi_b = normalize_doi(a.get('doi')), normalize_doi(b.get('doi'))
+    if doi_a and doi_a == doi_b:
+        return True, 'same DOI'
+    if doi_a and doi_b and not (_is_preprint_doi(doi_a) or _is_preprint_doi(doi_b)):
+        return False, 'different DOIs'
+    title_a, title_b = normalize_text(a.get('title')), normalize_text(b.get('title'))
+    if title_a and title_b and fuzz.token_set_ratio(title_a, title_b) >= CONFIRM_TITLE_RATIO:
+        return True, 'similar title'
+    abstract_a, abstract_b = normalize_text(a.get('abstract')), normalize_text(b.get('abstract'))
+    if abstract_a and abstract_b and fuzz.token_set_ratio(abstract_a, abstract_b) >= CONFIRM_ABSTRACT_RATIO:
+        return True, 'similar abstract'
+    return False, 'low fuzzy score'
+
+
+@telemetry.timed('dedup.semantic_candidates', records=len)
+def semantic_candidates(df, title_col=TITLE_COLUMN, abstract_col=ABSTRACT_COLUMN, doi_col=DOI_COLUMN,
+                        index_file=INDEX_FILE):
+    """
+    Candidate duplicate pairs of `df` (positions a < b), with their cosine similarity
+    and the confirmation result, as a DataFrame. The index is loaded from and saved
+    to `index_file` (None = do not persist).
+    """
+    index = SemanticIndex.load(index_file) if index_file else SemanticIndex()
+    rows = index.add(df, title_col, abstract_col)
+    if index_file:
+        index.save(index_file)
+
+    # Records with identical content share an index row; the first of them stands for all
+    first_position = {}
+    for position, row in enumerate(rows):
+        first_position.setdefault(row, position)
+
+    def record(position):
+        return {'title': df[title_col].iat[position],
+                'abstract': df[abstract_col].iat[position] if abstract_col in df.columns else '',
+                'doi': df[doi_col].iat[position] if doi_col and doi_col in df.columns else ''}
+
+    candidates = []
+    for (row_a, row_b), cosine in sorted(index.similar_pairs(rows).items()):
+        a, b = sorted((first_position[row_a], first_position[row_b]))
+        confirmed, reason = confirm_pair(record(a), record(b))
+        candidates.append({'position_a': a, 'position_b': b, 'title_a': record(a)['title'],
+                           'title_b': record(b)['title'], 'cosine': round(cosine, 4),
+                           'confirmed': confirmed, 'reason': reason})
+    telemetry.count('semantic_candidates', len(candidates))
+    return pd.DataFrame(candidates, columns=['position_a', 'position_b', 'title_a', 'title_b',
+                                             'cosine', 'confirmed', 'reason'])
+
+
+def semantic_pairs(df, title_col=TITLE_COLUMN, abstract_col=ABSTRACT_COLUMN, doi_col=DOI_COLUMN,
+                   index_file=INDEX_FILE):
+    """The confirmed pairs (position_a, position_b) of `df`, for exclusion2.cluster_titles()."""
+    candidates = semantic_candidates(df, title_col, abstract_col, doi_col, index_file)
+    confirmed = candidates[candidates['confirmed']]
+    print(f"Semantic candidates: {len(candidates)} (confirmed: {len(confirmed)})")
+    return list(zip(confirmed['position_a'], confirmed['position_b']))
+
+
+# --- Main Program ---
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, index_file=INDEX_FILE):
+    """Writes the semantic duplicate candidates of input_file to output_file for review."""
+    try:
+        print(f"Reading file: {input_file}")
+        df = read_excel(input_file)
+        if TITLE_COLUMN not in df.columns:
+            raise KeyError(TITLE_COLUMN)
+        if ABSTRACT_COLUMN not in df.columns:
+            print(f"Note: no '{ABSTRACT_COLUMN}' column, embedding titles only.")
+
+        with telemetry.stage('dedup.semantic', records=len(df)):
+            candidates = semantic_candidates(df, index_file=index_file)
+
+        print(f"Candidate pairs (cosine >= {COSINE_THRESHOLD}): {len(candidates)}")
+        print(f"  confirmed by DOI/fuzzy checks: {int(candidates['confirmed'].sum())}")
+        print(f"Saving candidates to: {output_file}")
+        write_excel(candidates, output_file)
+        print("\nScript executed successfully!")
+        telemetry.print_summary()
+        return candidates
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+    except KeyError as e:
+        print(f"Error: The column {e} was not found in the file. Please check TITLE_COLUMN.")
+
+
+if __name__ == "__main__":
+    main()
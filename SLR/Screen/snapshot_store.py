@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot store for incremental search refreshes.
+
+When a database search is re-run months later, the fresh export is diffed
+against the snapshots stored for that source, keyed by a stable source ID
+(arXiv ID, WoS UT, IEEE article number, dblp citation key, DOI - in that
+order of preference, with a normalized-title hash as last resort).
+Every record is classified as
+
+    new        not seen in any earlier snapshot of the source
+    changed    seen before, but title/abstract/keywords/authors/year/venue differ
+    unchanged  seen before with identical content
+
+Only new and changed records are written to the delta file that goes into
+dedup (dedup_index.py) and screening. Screening decisions recorded earlier
+(MODE = 'record_decisions') are carried forward onto the unchanged records of
+the full export, and screening_pipeline.py skips records that already have a
+Final_Decision, so a refresh costs work proportional to the delta.
+
+The same key is the 'record_key' column that merge_sources.py adds to the
+corpus; the screening scripts keep it, so their result files can be stored
+with 'record_decisions'. The delta and carried files are written in the
+corpus columns (merge_sources.to_corpus()), ready for dedup and screening.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from exclusion2 import normalize_text, normalize_doi
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration ---
+STORE_FILE = 'search_snapshots.sqlite'
+# 'diff'             : diff EXPORT_FILE against the stored snapshots, write the delta and store a new snapshot
+# 'record_decisions' : store the decisions of DECISIONS_FILE so later refreshes can carry them forward
+MODE = 'diff'
+SOURCE = 'ieee'
+EXPORT_FILE = 'ieee_merged_results.xlsx'
+# Output: only the new/changed records, in the corpus columns (with record_key and delta_status)
+DELTA_FILE = 'search_delta.xlsx'
+# Output: the full export in the corpus columns, with prior decisions carried forward onto unchanged records
+CARRIED_FILE = 'search_refresh_with_decisions.xlsx'
+# Screening results (with a record_key column) whose decisions are stored in 'record_decisions' mode
+DECISIONS_FILE = 'screening_pipeline_results.xlsx'
+DECISION_COLUMNS = ['Phase_Dedup', 'Phase_Rules', 'Phase_Inclusion', 'Phase_C345', 'Phase_EC78',
+                    'Stopped_At', 'Final_Decision', 'Overall_Decision', 'EC7_Decision', 'EC8_Decision']
+KEY_COLUMN = 'record_key'
+STATUS_COLUMN = 'delta_status'
+
+# Stable ID columns of the source exports, in order of preference: (column, key prefix)
+ID_COLUMNS = [
+    ('arXiv ID', 'arxiv'),
+    ('UT (Unique WOS ID)', 'wos'), ('UT', 'wos'),
+    ('Article Number', 'ieee'), ('PDF Link', 'ieee'),
+    ('Citation Key', 'dblp'),
+    ('doi', 'doi'), ('DOI', 'doi'), ('Item DOI', 'doi'), ('ID', 'doi'),
+]
+TITLE_COLUMNS = ['title', 'Title', 'Document Title', 'primary_title', 'Item Title', 'Article Title']
+# Fields whose change makes a record 'changed' (whichever of them the export has)
+CONTENT_COLUMNS = [
+    TITLE_COLUMNS,
+    ['abstract', 'Abstract'],
+    ['keywords', 'Author Keywords', 'Keywords'],
+    ['author', 'Authors', 'authors'],
+    ['year', 'Year', 'Publication Year', 'Published Date'],
+    ['booktitle', 'journal', 'Journal/Conference', 'Publication Title', 'journal_name', 'Source Title'],
+]
+
+
+def _value(row, column):
+    value = row.get(column)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return str(value).strip()
+
+
+def _normalize_id(prefix, value):
+    if prefix == 'arxiv':
+        # "http://arxiv.org/abs/2401.12345v2" -> "2401.12345"
+        value = re.sub(r'v\d+$', '', value.split('/abs/')[-1])
+    elif prefix == 'ieee':
+        # "https://ieeexplore.ieee.org/stamp/stamp.jsp?arnumber=11029741" -> "11029741"
+        match = re.search(r'arnumber=(\d+)', value)
+        value = match.group(1) if match else (value if value.isdigit() else '')
+    elif prefix == 'doi':
+        value = normalize_doi(value)
+    elif prefix == 'wos':
+        value = value.upper()
+    return value
+
+
+def record_key(row):
+    """Stable key of an exported record, e.g. 'arxiv:2401.12345' or 'doi:10.1145/...'."""
+    for column, prefix in ID_COLUMNS:
+        value = _normalize_id(prefix, _value(row, column))
+        if value:
+            return f"{prefix}:{value}"
+    title = next((_value(row, c) for c in TITLE_COLUMNS if _value(row, c)), '')
+    return 'title:' + hashlib.sha1(normalize_text(title).encode('utf-8')).hexdigest()[:16]
+
+
+def fingerprint(row):
+    """Hash of the normalized content fields; changes when the database updates a record."""
+    parts = []
+    for candidates in CONTENT_COLUMNS:
+        parts.append(next((normalize_text(_value(row, c)) for c in candidates if _value(row, c)), ''))
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class SnapshotStore:
+    """
+    SQLite store of the records seen per source (key, content fingerprint,
+    first/last snapshot) and of the screening decisions per record key.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT, file TEXT, created TEXT, records INTEGER);
+            CREATE TABLE IF NOT EXISTS records (
+                source TEXT, record_key TEXT, fingerprint TEXT,
+                first_snapshot INTEGER, last_snapshot INTEGER,
+                PRIMARY KEY (source, record_key));
+            CREATE TABLE IF NOT EXISTS decisions (
+                record_key TEXT PRIMARY KEY, data TEXT, updated TEXT);
+        """)
+
+    def diff(self, source, df):
+        """
+        Classifies the records of a fresh export. Returns (annotated copy of df,
+        keys of records stored for the source that are missing from the export).
+        """
+        df = df.copy()
+        rows = [row for _, row in df.iterrows()]
+        df[KEY_COLUMN] = [record_key(row) for row in rows]
+        fingerprints = [fingerprint(row) for row in rows]
+        known = dict(self.connection.execute(
+            "SELECT record_key, fingerprint FROM records WHERE source = ?", (source,)))
+        df[STATUS_COLUMN] = ['new' if key not in known else 'unchanged' if known[key] == fp else 'changed'
+                             for key, fp in zip(df[KEY_COLUMN], fingerprints)]
+        df['_fingerprint'] = fingerprints
+        removed = sorted(set(known) - set(df[KEY_COLUMN]))
+        return df, removed
+
+    def commit_snapshot(self, source, annotated, file=''):
+        """Stores the export diffed with diff() as the newest snapshot of the source."""
+        c = self.connection
+        cursor = c.execute("INSERT INTO snapshots (source, file, created, records) VALUES (?, ?, ?, ?)",
+                           (source, file, datetime.now().isoformat(timespec='seconds'), len(annotated)))
+        snapshot_id = cursor.lastrowid
+        c.executemany("""
+            INSERT INTO records (source, record_key, fingerprint, first_snapshot, last_snapshot)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (source, record_key) DO UPDATE
+            SET fingerprint = excluded.fingerprint, last_snapshot = excluded.last_snapshot""",
+            [(source, key, fp, snapshot_id, snapshot_id)
+             for key, fp in zip(annotated[KEY_COLUMN], annotated['_fingerprint'])])
+        c.commit()
+        return snapshot_id
+
+    def record_decisions(self, df, columns=DECISION_COLUMNS):
+        """Stores the decision columns of screened records (rows with a record key)."""
+        if KEY_COLUMN not in df.columns:
+            raise ValueError(f"The screening results have no '{KEY_COLUMN}' column; screen a corpus "
+                             f"assembled by merge_sources.py so decisions can be matched to records.")
+        columns = [c for c in columns if c in df.columns]
+        if not columns:
+            raise ValueError(f"The screening results have none of the decision columns {DECISION_COLUMNS}.")
+        rows = []
+        for _, row in df.iterrows():
+            key = _value(row, KEY_COLUMN)
+            if not key:
+                continue
+            data = {c: row[c] for c in columns if pd.notna(row[c]) and row[c] != ''}
+            if data:
+                rows.append((key, json.dumps(data, ensure_ascii=False, default=str),
+                             datetime.now().isoformat(timespec='seconds')))
+        self.connection.executemany("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?)", rows)
+        self.connection.commit()
+        return len(rows)
+
+    def carry_forward(self, annotated):
+        """
+        Copies stored decisions onto the unchanged records of a diffed export
+        (new and changed records have to be screened again).
+        Returns (copy of the export, number of records that received decisions).
+        """
+        df = annotated.copy()
+        decisions = {key: json.loads(data) for key, data in
+                     self.connection.execute("SELECT record_key, data FROM decisions")}
+        carried = 0
+        for index, key, status in zip(df.index, df[KEY_COLUMN], df[STATUS_COLUMN]):
+            if status != 'unchanged' or key not in decisions:
+                continue
+            for column, value in decisions[key].items():
+                if column not in df.columns:
+                    df[column] = None
+                    df[column] = df[column].astype(object)
+                df.at[index, column] = value
+            carried += 1
+        return df, carried
+
+    def history(self, source=None):
+        query = "SELECT * FROM snapshots" + (" WHERE source = ?" if source else "") + " ORDER BY snapshot_id"
+        return pd.read_sql_query(query, self.connection, params=(source,) if source else None)
+
+
+# --- Main Program ---
+def main(mode=MODE, source=SOURCE, export_file=EXPORT_FILE, store_file=STORE_FILE,
+         delta_file=DELTA_FILE, carried_file=CARRIED_FILE, decisions_file=DECISIONS_FILE):
+    """Diffs a fresh export against the stored snapshot, or stores the screening decisions (mode='record_decisions')."""
+    # merge_sources imports this module, so it is imported here instead of at the top
+    from merge_sources import to_corpus
+
+    try:
+        store = SnapshotStore(store_file)
+
+        if mode == 'record_decisions':
+            print(f"Reading screening results: {decisions_file}")
+            count = store.record_decisions(read_excel(decisions_file))
+            print(f"Stored decisions for {count} records in '{store_file}'.")
+        else:
+            print(f"Reading fresh export of '{source}': {export_file}")
+            export = read_excel(export_file)
+            annotated, removed = store.diff(source, export)
+            counts = annotated[STATUS_COLUMN].value_counts()
+            print(f"  new:       {counts.get('new', 0)}")
+            print(f"  changed:   {counts.get('changed', 0)}")
+            print(f"  unchanged: {counts.get('unchanged', 0)}")
+            print(f"  no longer returned by the search: {len(removed)}")
+
+            # Both outputs are in the corpus columns (title, abstract, doi, ... plus record_key)
+            delta = to_corpus(annotated[annotated[STATUS_COLUMN] != 'unchanged'], source, keep=[STATUS_COLUMN])
+            write_excel(delta, delta_file)
+            print(f"Saved {len(delta)} new/changed records to '{delta_file}'.")
+
+            carried_df, carried = store.carry_forward(annotated)
+            write_excel(to_corpus(carried_df, source, keep=[STATUS_COLUMN] + DECISION_COLUMNS), carried_file)
+            print(f"Carried forward prior decisions for {carried} unchanged records -> '{carried_file}'.")
+
+            snapshot_id = store.commit_snapshot(source, annotated, os.path.basename(export_file))
+            print(f"Stored snapshot #{snapshot_id} of '{source}'.")
+
+        print("\nScript executed successfully!")
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Schema-validated parsing of structured LLM replies, with local repair.
+
+A reply that does not parse used to be handled in one of two expensive or
+wrong ways: exclusion78.py re-sent the whole gpt-4o request after a 5 s
+sleep, and inclusionscreen1_2.py read every unparseable reply as "No". Most
+malformed replies are easy to fix locally, though:
+
+- a ```json code fence, or prose before/after the object
+- a reply cut off by the token limit (open string, missing braces)
+- trailing commas
+- key-case drift ("ec7_decision", "EC7 Decision")
+- decision drift ("Include.", "include", "**Excluded**")
+- "Key: value" lines instead of JSON (or the other way round)
+
+parse_reply() tries the reply as it is, then these repairs, and validates
+the result against a schema {field: allowed decisions, or None for free
+text}. Only if no decision can be recovered does it raise ParseError, and
+only then does the caller send the request again.
+
+Every parse is counted in the telemetry: llm_output_clean,
+llm_output_repaired, llm_output_recalled (the caller re-sent the request)
+and llm_output_failed (no usable reply at all), with the phase as a field.
+"""
+import json
+import os
+import re
+import sys
+
+from logprob_classifier import YES_TOKENS, NO_TOKENS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+
+YES_NO = ('Yes', 'No')
+INCLUDE_EXCLUDE = ('Include', 'Exclude')
+
+# Spellings of a decision (lowercase, punctuation removed) -> canonical value
+DECISION_SYNONYMS = {
+    'include': 'Include', 'included': 'Include', 'inclusion': 'Include',
+    'exclude': 'Exclude', 'excluded': 'Exclude', 'exclusion': 'Exclude',
+}
+DECISION_SYNONYMS.update({token: 'Yes' for token in YES_TOKENS})
+DECISION_SYNONYMS.update({token: 'No' for token in NO_TOKENS})
+
+CODE_FENCE = re.compile(r'```(?:json|JSON)?\s*(.*?)(?:```|$)', re.DOTALL)
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+KEY_VALUE_LINE = re.compile(r'^[\s*#>-]*([A-Za-z][\w /()-]*?)[\s*]*[:=]\s*(.*?)\s*$')
+
+
+class ParseError(ValueError):
+    """The reply could not be repaired into a valid answer."""
+
+
+def _key(name):
+    # "EC7 Decision", "ec7_decision" and "**EC7_Decision**" all become "ec7decision"
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def normalize_decision(value, choices):
+    """
+    Canonical decision out of `choices` for a drifted spelling ("Include.",
+    "**Excluded**"), or None. The whole value has to be one decision once
+    punctuation and markdown are removed, so "N/A" or "Exclude (unclear)" are
+    not read as a decision; a value naming more than one choice
+    ("Include or Exclude") raises ParseError.
+    """
+    if isinstance(value, bool):
+        value = 'yes' if value else 'no'
+    words = re.sub(r'[^a-z\s]', ' ', str(value).lower()).split()
+    named = {DECISION_SYNONYMS.get(word) for word in words} & set(choices)
+    if len(named) > 1:
+        raise ParseError(f"ambiguous decision {value!r} (names {' and '.join(sorted(named))})")
+    decision = DECISION_SYNONYMS.get(' '.join(words))
+    return decision if decision in choices else None
+
+
+def _close_truncated(text):
+    """
+    Completes JSON cut off by the token limit: closes an open string and the
+    open brackets. Also returns the cut-off points (after each complete
+    member) to fall back to when the last member itself is incomplete.
+    """
+    stack, cuts = [], []
+    in_string = escaped = False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+        elif char == ',':
+            cuts.append((position, list(stack)))
+    candidates = [text + ('"' if in_string else '') + ''.join(reversed(stack))]
+    candidates += [text[:position] + ''.join(reversed(open_brackets)) for position, open_brackets in reversed(cuts)]
+    return candidates
+
+
+def _load_json(text):
+    """(object, repaired) for the JSON object in `text`, or (None, True) if there is none."""
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, False
+    except (TypeError, ValueError):
+        pass
+    fenced = CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find('{')
+    if start < 0:
+        return None, True
+    end = text.rfind('}')
+    body = TRAILING_COMMA.sub(r'\1', text[start:])
+    candidates = [TRAILING_COMMA.sub(r'\1', text[start:end + 1])] if end > start else []
+    for candidate in candidates + _close_truncated(body):
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data, True
+    return None, True
+
+
+def _key_value_lines(text):
+    """{key: value} of "Key: value" lines."""
+    values = {}
+    for line in text.splitlines():
+        match = KEY_VALUE_LINE.match(line)
+        if match:
+            values.setdefault(match.group(1), match.group(2).strip().strip('",'))
+    return values
+
+
+def _apply_schema(data, schema):
+    """(values, drifted) with the schema fields of `data`; decisions are normalized and required."""
+    by_key = {_key(name): value for name, value in data.items()}
+    values, drifted = {}, False
+    for field, choices in schema.items():
+        drifted = drifted or field not in data
+        value = by_key.get(_key(field))
+        if choices is None:
+            values[field] = '' if value is None else str(value)
+            continue
+        decision = normalize_decision(value, choices) if value is not None else None
+        if decision is None:
+            raise ParseError(f"no valid {field} (expected {'/'.join(choices)}, got {value!r})")
+        drifted = drifted or decision != value
+        values[field] = decision
+    return values, drifted
+
+
+def parse_reply(text, schema, phase, expected='json'):
+    """
+    Parses an LLM reply (JSON or "Key: value" lines) into {field: value} for
+    `schema` ({field: allowed decisions, or None for free text}). Decision
+    fields are required; free-text fields default to ''. `expected` is the
+    format the prompt asks for ('json' or 'lines'); a reply in it that needs
+    no repair counts as clean. Raises ParseError.
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ParseError("empty reply")
+    data, repaired = _load_json(text)
+    attempts = [data] if data is not None else []
+    attempts.append(_key_value_lines(text))
+    error = None
+    for number, attempt in enumerate(attempts):
+        try:
+            values, drifted = _apply_schema(attempt, schema)
+        except ParseError as e:
+            error = error or e
+            continue
+        if expected == 'json':
+            clean = number == 0 and data is not None and not repaired and not drifted
+        else:
+            clean = attempt is attempts[-1] and not drifted
+        telemetry.count('llm_output_clean' if clean else 'llm_output_repaired', phase=phase)
+        return values
+    raise error
+
+
+def count_recall(phase, error):
+    """Records that an unrepairable reply is requested again."""
+    telemetry.count('llm_output_recalled', phase=phase, error=str(error)[:200])
+
+
+def count_failure(phase):
+    """Records that no usable reply was obtained (the record is marked for review)."""
+    telemetry.count('llm_output_failed', phase=phase)
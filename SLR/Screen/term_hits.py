@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Record x search-term hit matrix built with a single Aho-Corasick pass.
+
+For the arXiv part1 x part2 design (and the term lists extracted from the
+35 manual-search papers) we want to know, for every record, which search
+terms occur in its title/abstract. Looping one regex per term costs
+O(records x terms); here all terms are compiled into one Aho-Corasick
+automaton over exclusion2.normalize_text() output, so every record is
+scanned once, character by character, whatever the number of terms.
+
+The hits are kept as a sparse CSR matrix (indptr/indices, like
+scipy.sparse) and summarised per term:
+- Records: records containing the term,
+- Retrieved: records the term contributes to, i.e. that also match at least
+  one term of every other group (part1 AND part2),
+- Unique: retrieved records for which it is the only matching term of its
+  group, i.e. the records that would be lost without it.
+"""
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from exclusion2 import normalize_text
+from search_index import rtf_to_text, load_arxiv_design, ARXIV_SCRIPT, SEARCH_DIR
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit.excel_io import read_excel, write_excel_sheets
+
+# --- Configuration ---
+CORPUS_FILE = 'final_merged_literature_data.xlsx'
+OUTPUT_FILE = 'search_term_hits.xlsx'
+TEXT_COLUMNS = ['title', 'abstract']
+KEY_COLUMN = 'record_key'
+# 'arxiv' = part1/part2 terms of arxiv-python.py, 'manual' = the Pillar A/B terms
+# extracted from the 35 manual-search papers
+TERM_SET = 'arxiv'
+MANUAL_SEARCH_LOG = os.path.join(SEARCH_DIR, '35-search-term-manual-search', 'manual-search-analysis-log.rtf')
+# Only count matches of whole words ("mas" does not match inside "christmas")
+WHOLE_WORDS = True
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over characters. Each pattern carries a term id;
+    several patterns (e.g. synonyms) may share one term id.
+    """
+
+    def __init__(self, patterns):
+        # patterns: iterable of (pattern text, term id)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for text, term_id in patterns:
+            if not text:
+                continue
+            state = 0
+            for char in text:
+                if char not in self.goto[state]:
+                    self.goto[state][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = self.goto[state][char]
+            self.output[state].append(term_id)
+
+        # Breadth-first failure links; outputs of the failure state are merged in,
+        # so matching never has to follow the output chain
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Returns the set of term ids whose patterns occur in `text`."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class TermHitMatrix:
+    """
+    Sparse record x term hit matrix.
+
+    Attributes:
+        terms:   term labels (matrix columns)
+        groups:  group of each term (e.g. 'part1' / 'part2')
+        indptr:  CSR row pointers (len = records + 1)
+        indices: CSR column indices (term ids hit by each record)
+    """
+
+    def __init__(self, terms, groups, indptr, indices):
+        self.terms = terms
+        self.groups = groups
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def build(cls, texts, term_patterns, whole_words=WHOLE_WORDS):
+        """
+        texts:         list of per-record lists of field texts
+        term_patterns: list of (term label, group, [patterns]) - the label itself
+                       is always one of the patterns
+        """
+        terms = [label for label, _, _ in term_patterns]
+        groups = [group for _, group, _ in term_patterns]
+        pad = ' ' if whole_words else ''
+        patterns = []
+        for term_id, (label, _, synonyms) in enumerate(term_patterns):
+            for pattern in {normalize_text(p) for p in [label, *synonyms]}:
+                if pattern:
+                    patterns.append((pad + pattern + pad, term_id))
+        automaton = AhoCorasick(patterns)
+
+        indptr = [0]
+        indices = []
+        for fields in texts:
+            # Fields are separated by a character no pattern contains, so no match spans two fields
+            text = '\n'.join(pad + normalize_text(field) + pad for field in fields)
+            indices.extend(sorted(automaton.find(text)))
+            indptr.append(len(indices))
+        return cls(terms, groups, np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32))
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, len(self.terms)
+
+    def to_dense(self):
+        """Boolean array (records x terms)."""
+        dense = np.zeros(self.shape, dtype=bool)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        dense[rows, self.indices] = True
+        return dense
+
+    def to_long(self):
+        """One row per (record, term) hit."""
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        return pd.DataFrame({'row': rows, 'term': [self.terms[i] for i in self.indices]})
+
+    def term_summary(self):
+        """Records, retrieved records and unique contribution per term (see module docstring)."""
+        dense = self.to_dense()
+        groups = np.array(self.groups)
+        group_names = list(dict.fromkeys(self.groups))
+        hits_per_group = {g: dense[:, groups == g].sum(axis=1) for g in group_names}
+        rows = []
+        for term_id, (term, group) in enumerate(zip(self.terms, self.groups)):
+            column = dense[:, term_id]
+            others_match = np.ones(len(column), dtype=bool)
+            for other in group_names:
+                if other != group:
+                    others_match &= hits_per_group[other] > 0
+            retrieved = column & others_match
+            rows.append({
+                'Term': term,
+                'Group': group,
+                'Records': int(column.sum()),
+                'Retrieved': int(retrieved.sum()),
+                'Unique': int((retrieved & (hits_per_group[group] == 1)).sum()),
+            })
+        return pd.DataFrame(rows)
+
+    def retrieved_records(self):
+        """Rows that match at least one term of every group."""
+        dense = self.to_dense()
+        groups = np.array(self.groups)
+        retrieved = np.ones(self.shape[0], dtype=bool)
+        for group in dict.fromkeys(self.groups):
+            retrieved &= dense[:, groups == group].any(axis=1)
+        return np.flatnonzero(retrieved)
+
+
+# --- Term sets ---
+
+def arxiv_terms(path=ARXIV_SCRIPT):
+    """The part1 / part2 terms of the arXiv query design."""
+    design = load_arxiv_design(path)
+    part1 = re.findall(r'"([^"]+)"', design.PART1_QUERY_STR)
+    return [(t, 'part1', []) for t in part1] + [(t, 'part2', []) for t in design.PART2_TERMS]
+
+
+def manual_search_terms(path=MANUAL_SEARCH_LOG):
+    """
+    The Pillar A / Pillar B terms (with their synonyms) extracted from the
+    35 manual-search papers. The log holds several JSON arrays/objects.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = rtf_to_text(f.read())
+    decoder = json.JSONDecoder()
+    papers = []
+    position = 0
+    while True:
+        starts = [p for p in (text.find('[', position), text.find('{', position)) if p >= 0]
+        if not starts:
+            break
+        try:
+            value, position = decoder.raw_decode(text, min(starts))
+        except json.JSONDecodeError:
+            position = min(starts) + 1
+            continue
+        papers.extend(value if isinstance(value, list) else [value])
+
+    concepts = {}
+    for paper in papers:
+        if not isinstance(paper, dict):
+            continue
+        for pillar, group in [('Pillar_A_Technology', 'pillar_A'), ('Pillar_B_Domain_Discipline', 'pillar_B')]:
+            for entry in paper.get(pillar, []):
+                key = (normalize_text(entry.get('term', '')), group)
+                if not key[0]:
+                    continue
+                label, _, synonyms = concepts.setdefault(key, (entry['term'], group, set()))
+                synonyms.update(s for s in entry.get('synonyms', []) if isinstance(s, str))
+    return [(label, group, sorted(synonyms)) for label, group, synonyms in concepts.values()]
+
+
+# --- Main Program ---
+def main(corpus_file=CORPUS_FILE, output_file=OUTPUT_FILE, term_set=TERM_SET):
+    """Builds the record x search-term hit matrix of the corpus and writes the summary and the hits."""
+    try:
+        print(f"Reading corpus: {corpus_file}")
+        df = read_excel(corpus_file, compact=True)
+        columns = [c for c in TEXT_COLUMNS if c in df.columns]
+        texts = df[columns].itertuples(index=False, name=None)
+
+        term_patterns = arxiv_terms() if term_set == 'arxiv' else manual_search_terms()
+        print(f"Matching {len(term_patterns)} terms ({term_set}) against {len(df)} records...")
+        start = time.perf_counter()
+        matrix = TermHitMatrix.build(list(texts), term_patterns)
+        print(f"Done in {time.perf_counter() - start:.2f} s, {len(matrix.indices)} hits.")
+
+        summary = matrix.term_summary().sort_values(['Group', 'Unique'], ascending=[True, False])
+        print(f"Records matching every group: {len(matrix.retrieved_records())}")
+        print(summary.to_string(index=False))
+
+        hits = matrix.to_long()
+        keys = df[KEY_COLUMN] if KEY_COLUMN in df.columns else pd.Series(range(len(df)))
+        hits.insert(1, 'record_key', keys.iloc[hits['row']].to_numpy())
+        hits.insert(2, 'title', df['title'].iloc[hits['row']].to_numpy())
+        write_excel_sheets(output_file, {'Term summary': summary, 'Hits': hits})
+        print(f"\nResults saved to '{output_file}'.")
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+
+
+if __name__ == "__main__":
+    main()
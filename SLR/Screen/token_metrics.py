@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Token budget helpers and per-call token/latency metrics for the screening scripts.
+
+Every OpenAI call made through TokenMetrics.create() is timed and its usage
+(input, output and cached prompt tokens) is appended to a CSV metrics table,
+so the token spend and latency of each screening phase can be compared.
+
+The same wrapper bounds the tail latency of the serial screening loops:
+
+- Every request gets a wall-clock deadline of REQUEST_DEADLINE seconds. The
+  client's own retries are switched off (they would each get the full
+  timeout again), and a request that has not answered by then fails with
+  DeadlineExceeded, which the retry loops of the scripts handle like any
+  other API error.
+- With HEDGE enabled, a request that is still running after the
+  HEDGE_PERCENTILE latency of its phase (measured over the last calls) is
+  sent a second time and whichever answer arrives first is used. At most
+  HEDGE_BUDGET extra requests per request are made, so the extra spend is
+  capped. Both answers are billed, so both are recorded in the metrics table.
+"""
+import csv
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from slrkit import telemetry
+
+# Default metrics table shared by all screening phases (one row per API call)
+METRICS_FILE = 'token_metrics.csv'
+
+METRICS_COLUMNS = ['timestamp', 'phase', 'record_id', 'model', 'prompt_tokens',
+                   'completion_tokens', 'cached_tokens', 'latency_s']
+
+# Seconds after which a request is given up (DeadlineExceeded)
+REQUEST_DEADLINE = 60
+# Hedged requests: duplicate a request that is slower than the HEDGE_PERCENTILE latency
+# of its phase (at least HEDGE_MIN_DELAY seconds), for at most HEDGE_BUDGET of all requests
+HEDGE = False
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_DELAY = 1.0
+HEDGE_BUDGET = 0.1
+# Latencies of the last calls per phase used for the percentile, and how many are needed first
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+# Rough characters-per-token ratio used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+
+def _get_encoding(model):
+    """Returns a tiktoken encoding for the model, or None if tiktoken is unavailable."""
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding('cl100k_base')
+    except ImportError:
+        encoding = None
+    _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text, model='gpt-4o'):
+    """Counts the tokens of a text (exactly with tiktoken, approximately otherwise)."""
+    if not isinstance(text, str) or not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+
+def truncate_to_token_budget(text, max_tokens, model='gpt-4o'):
+    """
+    Truncates a text (e.g. an abstract) to at most `max_tokens` tokens.
+    A budget of None or 0 disables truncation.
+    """
+    if not max_tokens or not isinstance(text, str):
+        return text
+    encoding = _get_encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        # Cut on a word boundary so the last word is not mangled
+        return text[:max_chars].rsplit(' ', 1)[0] + ' ...'
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + ' ...'
+
+
+def _usage_counts(response):
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None, None, None
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', None) if details is not None else None
+    return usage.prompt_tokens, usage.completion_tokens, cached or 0
+
+
+class DeadlineExceeded(TimeoutError):
+    """A request did not answer within REQUEST_DEADLINE seconds."""
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TokenMetrics:
+    """
+    Collects per-call token counts and latency and appends them to a CSV table.
+    """
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self.rows = []
+        self.lock = threading.Lock()
+        self.latencies = {}     # phase -> latencies of the last LATENCY_WINDOW calls
+        self.requests = 0
+        self.hedges = 0
+        self.executor = None
+
+    def record(self, phase, record_id, response, latency_s, model=None):
+        prompt_tokens, completion_tokens, cached_tokens = _usage_counts(response)
+        row = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'phase': phase,
+            'record_id': record_id,
+            'model': model or getattr(response, 'model', ''),
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cached_tokens': cached_tokens,
+            'latency_s': round(latency_s, 3),
+        }
+        with self.lock:
+            self.rows.append(row)
+            self.latencies.setdefault(phase, deque(maxlen=LATENCY_WINDOW)).append(latency_s)
+            self._append(row)
+        # Prompt-prefix cache hits also go into the run's telemetry counters
+        telemetry.count('prompt_tokens', prompt_tokens or 0)
+        telemetry.count('cached_tokens', cached_tokens or 0)
+        telemetry.count('prompt_cache_hits', 1 if cached_tokens else 0)
+        return row
+
+    def create(self, client, phase, record_id=None, **kwargs):
+        """
+        Drop-in wrapper around client.chat.completions.create() that records
+        the usage and latency of the call, bounded by REQUEST_DEADLINE and
+        hedged if HEDGE is set.
+        """
+        kwargs.setdefault('timeout', REQUEST_DEADLINE)
+        if hasattr(client, 'with_options'):
+            # The SDK would retry twice, each attempt with the full timeout; the scripts retry instead
+            client = client.with_options(max_retries=0)
+        with self.lock:
+            self.requests += 1
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='request')
+        return self._bounded_create(client, phase, record_id, kwargs)
+
+    def _create(self, client, phase, record_id, kwargs):
+        start = time.perf_counter()
+        response = client.chat.completions.create(**kwargs)
+        self.record(phase, record_id, response, time.perf_counter() - start, kwargs.get('model'))
+        return response
+
+    def hedge_delay(self, phase):
+        """Seconds after which a request of `phase` is duplicated (None = not enough calls measured yet)."""
+        with self.lock:
+            latencies = list(self.latencies.get(phase, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, _percentile(latencies, HEDGE_PERCENTILE))
+
+    def _take_hedge(self):
+        """True (and counted) if one more hedged request fits into HEDGE_BUDGET."""
+        with self.lock:
+            if self.hedges >= HEDGE_BUDGET * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _bounded_create(self, client, phase, record_id, kwargs):
+        # The request runs on the executor so the deadline holds however long the client takes
+        deadline = time.perf_counter() + kwargs['timeout']
+        primary = self.executor.submit(self._create, client, phase, record_id, kwargs)
+        pending = {primary}
+        delay = self.hedge_delay(phase) if HEDGE else None
+        if delay is not None and not wait(pending, timeout=delay).done and self._take_hedge():
+            telemetry.count('hedged_requests', phase=phase)
+            pending.add(self.executor.submit(self._create, client, phase, record_id, kwargs))
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # The requests keep running in the background; their usage is still recorded
+                raise DeadlineExceeded(f"no answer within {kwargs['timeout']}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        telemetry.count('hedge_wins', phase=phase)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _append(self, row):
+        if not self.path:
+            return
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=METRICS_COLUMNS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def summary(self):
+        """Aggregates the calls recorded in this run per phase."""
+        phases = {}
+        for row in self.rows:
+            stats = phases.setdefault(row['phase'], {
+                'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'cached_tokens': 0, 'latency_s': 0.0})
+            stats['calls'] += 1
+            for key in ('prompt_tokens', 'completion_tokens', 'cached_tokens'):
+                stats[key] += row[key] or 0
+            stats['latency_s'] += row['latency_s']
+        for stats in phases.values():
+            stats['avg_latency_s'] = round(stats['latency_s'] / stats['calls'], 3)
+            stats['cache_hit_rate'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 3) if stats['prompt_tokens'] else 0.0
+        return phases
+
+    def print_summary(self):
+        for phase, stats in self.summary().items():
+            print(f"[{phase}] calls={stats['calls']} input={stats['prompt_tokens']} "
+                  f"cached={stats['cached_tokens']} ({stats['cache_hit_rate']:.0%}) "
+                  f"output={stats['completion_tokens']} avg_latency={stats['avg_latency_s']}s")
@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of the SLR pipeline on synthetic corpora.
+
+For every corpus size, a synthetic corpus is generated in each export format
+(synthetic_corpus.py) and the pipeline stages are timed against local stub
+servers (stub_servers.py) instead of OpenAI, arXiv, dblp, Springer, Crossref and the DOI resolver:
+
+    parse_*          parsing the raw exports (rispy, bibtexparser, CSV, WoS workbook)
+    merge_*          the merge scripts of each source, run as subprocesses
+    dedup_index      incremental DedupIndex over the whole corpus (+ recall vs. ground truth)
+    dedup_semantic   semantic_dedup.semantic_candidates() on title + abstract (IVF index, + recall)
+    dedup_pairwise   exclusion2.cluster_titles() (O(n^2), capped at PAIRWISE_LIMIT records)
+    harvest_arxiv    fetch_papers_for_query() against the stub arXiv API
+    harvest_arxiv_oai arxiv_oai_harvest.harvest_arxiv_oai(): OAI-PMH bulk harvest + local part1 x part2 queries
+    harvest_dblp     dblp_api_harvest.harvest_dblp() against the stub dblp search API
+    harvest_springer springer_api_harvest.harvest_springer() against the stub Metadata API
+    index_dblp_dump  dblp_dump_index.py: streaming ingestion of a synthetic dblp.xml into the local index
+    query_dblp_dump  dblp_dump_index.query_dblp_dump() against the index built by index_dblp_dump
+    enrich_crossref  crossref_enrich.enrich() of a corpus without abstracts/pages/venues
+    screen_*         inclusion / C3-C5 / EC7-EC8 GPT calls against the stub OpenAI API
+                     (screen_ec78_hedged: the same with hedged requests, token_metrics.HEDGE)
+    page_fetch_*     the Springer / ScienceDirect DOI page-count scripts (includes their 1 s delay)
+
+The results are written as a JSON report; --compare prints the change
+against an earlier report, so runs can be tracked for regressions:
+
+    python run_benchmarks.py --sizes 1000 10000 --output report.json
+    python run_benchmarks.py --sizes 1000 --compare report.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from datetime import datetime
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SLR_DIR = os.path.join(BENCH_DIR, '..')
+SCREEN_DIR = os.path.join(SLR_DIR, 'Screen')
+SOURCES_DIR = os.path.join(SLR_DIR, 'manual search & database auto search')
+sys.path.insert(0, SLR_DIR)
+sys.path.insert(0, SCREEN_DIR)
+
+from synthetic_corpus import generate_records, ground_truth_clusters, write_corpus, write_dblp_dump
+from stub_servers import StubServer
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
+
+# --- Configuration ---
+SIZES = [1000, 10000]
+DUPLICATE_RATE = 0.1
+OUTPUT_FILE = 'benchmark_report.json'
+# exclusion2.cluster_titles() compares all pairs; larger corpora are cut to this many records
+PAIRWISE_LIMIT = 2000
+# Records sent through each GPT screening phase / the page-count scripts
+SCREEN_SAMPLE = 50
+PAGE_SAMPLE = 10
+# Stub service behaviour
+LLM_LATENCY = 0.2
+LLM_ERROR_RATE = 0.02
+# Share of malformed LLM answers (repaired locally or requested again, see Screen/structured_output.py)
+LLM_MALFORMED_RATE = 0.1
+# Share of LLM requests with a slow answer, and how much slower they are (seconds)
+LLM_SLOW_RATE = 0.05
+LLM_SLOW_LATENCY = 3.0
+ARXIV_LATENCY = 0.05
+# dblp / Springer search APIs and Crossref (the harvesters and the enrichment retry the 429 replies)
+API_LATENCY = 0.05
+API_ERROR_RATE = 0.05
+DOI_LATENCY = 0.05
+DOI_ERROR_RATE = 0.0
+# A stage counts as a regression in --compare if it is this much slower
+# (stages faster than REGRESSION_MIN_SECONDS in both runs are too noisy to flag)
+REGRESSION_TOLERANCE = 0.2
+REGRESSION_MIN_SECONDS = 0.5
+
+STAGES = ['parse_ris', 'parse_bibtex', 'parse_ieee_csv', 'parse_springer_csv', 'parse_wos',
+          'merge_ieee', 'merge_springer', 'merge_sciencedirect', 'merge_wos', 'merge_dblp',
+          'dedup_index', 'dedup_pairwise', 'dedup_semantic', 'harvest_arxiv', 'harvest_arxiv_oai', 'harvest_dblp', 'harvest_springer',
+          'index_dblp_dump', 'query_dblp_dump', 'enrich_crossref',
+          'screen_inclusion', 'screen_c345', 'screen_ec78', 'screen_ec78_hedged',
+          'page_fetch_springer', 'page_fetch_sciencedirect']
+
+# merge stage -> (script relative to SOURCES_DIR, synthetic sub-folder)
+MERGE_SCRIPTS = {
+    'merge_ieee': ('ieee/mergecsv.py', 'ieee'),
+    'merge_springer': ('springer/springerlink-merge.py', 'springer'),
+    'merge_sciencedirect': ('sciencedirect/merge_ris.py', 'sciencedirect'),
+    'merge_wos': ('webofsceince/wos-python-merge.py', 'webofscience'),
+    'merge_dblp': ('dblp/dblp-bib-to-xlsx.py', 'dblp'),
+}
+
+
+def load_module(path, name):
+    """Imports a script by path (the source scripts have hyphens in their names)."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+class Benchmark:
+    """Collects one result row per (size, stage)."""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.results = []
+
+    @contextmanager
+    def stage(self, size, name):
+        """Times the block; the block fills the yielded dict ('records' and any extra metrics)."""
+        row = {'size': size, 'stage': name}
+        print(f"  [{size}] {name} ...", end=' ', flush=True)
+        start = time.perf_counter()
+        try:
+            # The scripts' own progress output is not part of the report
+            with redirect_stdout(StringIO()):
+                yield row
+        except Exception as e:
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['seconds'] = round(time.perf_counter() - start, 3)
+        if row.get('records') and 'error' not in row:
+            row['records_per_s'] = round(row['records'] / row['seconds'], 1) if row['seconds'] else None
+        print(row.get('error') or f"{row['seconds']:.2f} s")
+        self.results.append(row)
+
+    def wanted(self, name):
+        return name in self.stages
+
+
+def run_script(script, cwd):
+    """Runs a source script in `cwd` (where its input files are) and raises if it fails."""
+    result = subprocess.run([sys.executable, script], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return result.stdout
+
+
+# --- Stages ---
+
+def bench_parse(bench, size, files):
+    if bench.wanted('parse_ris'):
+        with bench.stage(size, 'parse_ris') as row:
+            merge_ris = load_module(os.path.join(SOURCES_DIR, 'sciencedirect', 'merge_ris.py'), 'merge_ris')
+            row['records'] = sum(len(merge_ris.read_ris_file(f)) for f in files['sciencedirect'])
+    if bench.wanted('parse_bibtex'):
+        with bench.stage(size, 'parse_bibtex') as row:
+            import bibtexparser
+            from bibtexparser.bparser import BibTexParser
+            from bibtexparser.customization import homogenize_latex_encoding
+            count = 0
+            for path in files['dblp']:
+                parser = BibTexParser()
+                parser.customization = homogenize_latex_encoding
+                parser.ignore_errors = True
+                with open(path, encoding='utf-8') as f:
+                    count += len(bibtexparser.load(f, parser=parser).entries)
+            row['records'] = count
+    for stage, source in [('parse_ieee_csv', 'ieee'), ('parse_springer_csv', 'springer')]:
+        if bench.wanted(stage):
+            with bench.stage(size, stage) as row:
+                row['records'] = sum(len(pd.read_csv(f)) for f in files[source])
+    if bench.wanted('parse_wos'):
+        with bench.stage(size, 'parse_wos') as row:
+            row['records'] = sum(len(read_excel(f)) for f in files['webofscience'])
+
+
+def bench_merge(bench, size, corpus_dir, n_records):
+    for stage, (script, folder) in MERGE_SCRIPTS.items():
+        if bench.wanted(stage):
+            with bench.stage(size, stage) as row:
+                run_script(os.path.join(SOURCES_DIR, script), os.path.join(corpus_dir, folder))
+                row['records'] = n_records
+
+
+def _recall(roots, truth):
+    """Share of true duplicates that ended up in the same cluster as their original."""
+    duplicates = [i for i, original in enumerate(truth) if original != i]
+    if not duplicates:
+        return None
+    return round(sum(roots[i] == roots[truth[i]] for i in duplicates) / len(duplicates), 4)
+
+
+def bench_dedup(bench, size, records):
+    corpus = pd.DataFrame({'title': [r['title'] for r in records], 'doi': [r['doi'] for r in records],
+                           'record_key': [str(r['id']) for r in records]})
+    truth = ground_truth_clusters(records)
+    if bench.wanted('dedup_index'):
+        with bench.stage(size, 'dedup_index') as row:
+            from dedup_index import DedupIndex
+            from exclusion2 import _find
+            index = DedupIndex()
+            index.add_batch(corpus, batch_name='benchmark')
+            roots = [_find(index.parent, i) for i in range(len(records))]
+            row.update(records=len(records), recall=_recall(roots, truth),
+                       clusters=len(set(roots)), true_clusters=len(set(truth)))
+    if bench.wanted('dedup_pairwise'):
+        with bench.stage(size, 'dedup_pairwise') as row:
+            import exclusion2
+            limit = min(len(records), PAIRWISE_LIMIT)
+            clustered = exclusion2.cluster_titles(corpus.head(limit), 'title', doi_col='doi')
+            roots = clustered[exclusion2.CLUSTER_COLUMN].tolist()
+            row.update(records=limit, recall=_recall(roots, [t if t < limit else i for i, t in enumerate(truth[:limit])]))
+    if bench.wanted('dedup_semantic'):
+        corpus['abstract'] = [r['abstract'] for r in records]
+        with bench.stage(size, 'dedup_semantic') as row:
+            import semantic_dedup
+            from exclusion2 import _find, _union
+            candidates = semantic_dedup.semantic_candidates(corpus, index_file=None)
+            # Identical title + abstract share one index entry; the exact-match step merges those
+            parent = list(range(len(records)))
+            first_position = {}
+            for position, (title, abstract) in enumerate(zip(corpus['title'], corpus['abstract'])):
+                key = semantic_dedup.content_key(title, abstract)
+                _union(parent, first_position.setdefault(key, position), position)
+            confirmed = candidates[candidates['confirmed']]
+            for a, b in zip(confirmed['position_a'], confirmed['position_b']):
+                _union(parent, a, b)
+            roots = [_find(parent, i) for i in range(len(records))]
+            row.update(records=len(records), recall=_recall(roots, truth),
+                       candidates=len(candidates), confirmed=len(confirmed))
+
+
+def bench_arxiv(bench, size, records, workdir):
+    if bench.wanted('harvest_arxiv'):
+        with StubServer(ARXIV_LATENCY, 0.0, records=records) as server, bench.stage(size, 'harvest_arxiv') as row:
+            arxiv = load_module(os.path.join(SOURCES_DIR, 'arxiv', 'arxiv-python.py'), 'arxiv_python')
+            arxiv.ARXIV_API_URL = server.url + '/api/query?'
+            arxiv.PAGE_DELAY = 0  # the politeness delay would dominate; it is constant per page
+            papers = arxiv.fetch_papers_for_query('cat:cs.*', datetime(2000, 1, 1), datetime(2100, 1, 1))
+            row.update(records=len(papers), **server.stats())
+    if bench.wanted('harvest_arxiv_oai'):
+        with StubServer(ARXIV_LATENCY, 0.0, records=records) as server, \
+                bench.stage(size, 'harvest_arxiv_oai') as row, working_directory(workdir):
+            oai = load_module(os.path.join(SOURCES_DIR, 'arxiv', 'arxiv_oai_harvest.py'), 'arxiv_oai_harvest')
+            oai.OAI_URL = server.url + '/oai'
+            # Full harvest into a fresh store, then every part2 sub-query evaluated locally
+            papers = oai.harvest_arxiv_oai('arxiv_oai.xlsx', 'arxiv_oai_bench.sqlite', '2000-01-01', '2100-01-01')
+            row.update(records=len(papers), **server.stats())
+            os.remove('arxiv_oai_bench.sqlite')
+
+
+def bench_api_harvest(bench, size, records, workdir):
+    stages = [s for s in ('harvest_dblp', 'harvest_springer') if bench.wanted(s)]
+    if not stages:
+        return
+    with StubServer(API_LATENCY, API_ERROR_RATE, records=records) as server:
+        for stage in stages:
+            before = server.stats()
+            output_file = os.path.join(workdir, f"{stage}.xlsx")
+            cursor_file = os.path.join(workdir, f"{stage}_cursor")
+            with bench.stage(size, stage) as row:
+                if stage == 'harvest_dblp':
+                    module = load_module(os.path.join(SOURCES_DIR, 'dblp', 'dblp_api_harvest.py'), 'dblp_api_harvest')
+                    module.DBLP_API_URL = server.url + '/search/publ/api'
+                    module.REQUEST_INTERVAL = 0
+                    df = module.harvest_dblp(output_file=output_file, cursor_file=cursor_file, restart=True)
+                else:
+                    module = load_module(os.path.join(SOURCES_DIR, 'springer', 'springer_api_harvest.py'),
+                                         'springer_api_harvest')
+                    module.SPRINGER_API_URL = server.url + '/meta/v2/json'
+                    module.REQUEST_INTERVAL = 0
+                    df = module.harvest_springer(output_file=output_file, cursor_file=cursor_file, restart=True)
+                after = server.stats()
+                row.update(records=len(df), requests=after['requests'] - before['requests'],
+                           rate_limited=after['rate_limited'] - before['rate_limited'],
+                           bytes_sent=after['bytes_sent'] - before['bytes_sent'])
+
+
+def bench_dblp_dump(bench, size, records, workdir):
+    if not (bench.wanted('index_dblp_dump') or bench.wanted('query_dblp_dump')):
+        return
+    folder = os.path.join(workdir, 'dblp_dump')
+    os.makedirs(folder, exist_ok=True)
+    dump_file = write_dblp_dump(records, folder)
+    index_file = os.path.join(folder, 'dblp_dump_index.sqlite')
+    module = load_module(os.path.join(SOURCES_DIR, 'dblp', 'dblp_dump_index.py'), 'dblp_dump_index')
+    with bench.stage(size, 'index_dblp_dump') as row, working_directory(folder):
+        index = module.open_index(dump_file, index_file)
+        row.update(records=int(index.meta()['records']), dump_mb=round(os.path.getsize(dump_file) / 2 ** 20, 1),
+                   index_mb=round(os.path.getsize(index_file) / 2 ** 20, 1))
+        index.close()
+    if bench.wanted('query_dblp_dump'):
+        with bench.stage(size, 'query_dblp_dump') as row, working_directory(folder):
+            df = module.query_dblp_dump(os.path.join(folder, 'dblp_dump.xlsx'), dump_file, index_file)
+            row['records'] = len(df)
+
+
+def bench_enrich(bench, size, records, workdir):
+    if not bench.wanted('enrich_crossref'):
+        return
+    corpus = pd.DataFrame({'title': [r['title'] for r in records], 'doi': [r['doi'] for r in records],
+                           'abstract': ''})
+    cache_file = os.path.join(workdir, 'crossref_cache.sqlite')
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    with StubServer(API_LATENCY, API_ERROR_RATE, records=records) as server, bench.stage(size, 'enrich_crossref') as row:
+        import crossref_enrich
+        crossref_enrich.CROSSREF_API_URL = server.url + '/works'
+        cache = crossref_enrich.CrossrefCache(cache_file)
+        _, filled = crossref_enrich.enrich(corpus, cache)
+        cache.close()
+        row.update(records=len(records), filled=filled['abstract'], **server.stats())
+
+
+def _llm_counters():
+    """
+    Malformed LLM answers repaired locally / requested again (Screen/structured_output.py)
+    and hedged requests (Screen/token_metrics.py) so far.
+    """
+    counters = telemetry.summary()['counters']
+    return {'repaired': counters.get('llm_output_repaired', 0), 'recalled': counters.get('llm_output_recalled', 0),
+            'hedged': counters.get('hedged_requests', 0)}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def bench_screening(bench, size, records, workdir):
+    stages = [s for s in ('screen_inclusion', 'screen_c345', 'screen_ec78', 'screen_ec78_hedged') if bench.wanted(s)]
+    if not stages:
+        return
+    sample = records[:SCREEN_SAMPLE]
+    with StubServer(LLM_LATENCY, LLM_ERROR_RATE, malformed_rate=LLM_MALFORMED_RATE, slow_rate=LLM_SLOW_RATE,
+                    slow_latency=LLM_SLOW_LATENCY) as server, working_directory(workdir):
+        # The screening scripts create their client at import time with an empty key
+        os.environ['OPENAI_API_KEY'] = 'benchmark'
+        os.environ['OPENAI_BASE_URL'] = server.url + '/v1'
+        from openai import OpenAI
+        client = OpenAI(base_url=server.url + '/v1', api_key='benchmark')
+        for stage in stages:
+            before = server.stats()
+            counted = _llm_counters()
+            latencies = []
+            with bench.stage(size, stage) as row:
+                if stage == 'screen_inclusion':
+                    import inclusionscreen1_2 as module
+                    module.client = client
+                    screen = lambda r: module.screen_record(r['title'], r['abstract'], ', '.join(r['keywords']),
+                                                            record_id=r['id'])
+                elif stage == 'screen_c345':
+                    import exclusion345 as module
+                    module.client = client
+                    screen = lambda r: module.screen_record({'ENTRYTYPE': r['entry_type'], 'title': r['title'],
+                                                             'booktitle': r['venue'], 'publisher': 'ACM'},
+                                                            record_id=r['id'])
+                else:
+                    import exclusion78 as module
+                    import token_metrics
+                    module.client = client
+                    token_metrics.HEDGE = stage == 'screen_ec78_hedged'
+                    screen = lambda r: module.analyze_paper_with_openai(r['title'], r['abstract'], record_id=r['id'])
+                for r in sample:
+                    start = time.perf_counter()
+                    screen(r)
+                    latencies.append(time.perf_counter() - start)
+                after = server.stats()
+                row.update(records=len(sample), requests=after['requests'] - before['requests'],
+                           rate_limited=after['rate_limited'] - before['rate_limited'],
+                           malformed=after['malformed'] - before['malformed'], slow=after['slow'] - before['slow'],
+                           p50_s=round(_percentile(latencies, 0.5), 3), p99_s=round(_percentile(latencies, 0.99), 3),
+                           **{name: count - counted[name] for name, count in _llm_counters().items()})
+
+
+def bench_page_fetch(bench, size, records, workdir):
+    stages = [s for s in ('page_fetch_springer', 'page_fetch_sciencedirect') if bench.wanted(s)]
+    if not stages:
+        return
+    sample = [r for r in records if r['doi']][:PAGE_SAMPLE]
+    with StubServer(DOI_LATENCY, DOI_ERROR_RATE) as server:
+        for stage in stages:
+            folder = os.path.join(workdir, stage)
+            os.makedirs(folder, exist_ok=True)
+            before = server.stats()
+            with bench.stage(size, stage) as row:
+                if stage == 'page_fetch_springer':
+                    write_excel(pd.DataFrame({'Item Title': [r['title'] for r in sample],
+                                              'Item DOI': [f"{server.url}/{r['doi']}" for r in sample]}),
+                                os.path.join(folder, 'springerlink-merged_results.xlsx'))
+                    run_script(os.path.join(SOURCES_DIR, 'springer', 'ex_springer_page_catch.py'), folder)
+                    fetched = read_excel(os.path.join(folder, 'springerlink_with_page_count.xlsx'))
+                else:
+                    write_excel(pd.DataFrame({'primary_title': [r['title'] for r in sample],
+                                              'doi': [f"{server.url}/doi.org/{r['doi']}" for r in sample],
+                                              'page_count': [None] * len(sample)}),
+                                os.path.join(folder, 'sciencedirect_merged_results.xlsx'))
+                    run_script(os.path.join(SOURCES_DIR, 'sciencedirect', 'python_catch_doi_page.py'), folder)
+                    fetched = read_excel(os.path.join(folder, 'sciencedirect_with_page_count.xlsx'))
+                row.update(records=len(sample), pages_found=int(fetched['page_count'].notna().sum()),
+                           **{key: value - before[key] for key, value in server.stats().items()})
+
+
+# --- Report ---
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SLR_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'git_commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'pandas': pd.__version__}
+
+
+def run(sizes, stages, duplicate_rate=DUPLICATE_RATE, keep=False):
+    bench = Benchmark(stages)
+    root = tempfile.mkdtemp(prefix='slr_benchmark_')
+    try:
+        for size in sizes:
+            print(f"\n=== {size} records ===")
+            corpus_dir = os.path.join(root, str(size))
+            with bench.stage(size, 'generate') as row:
+                records = generate_records(size, duplicate_rate)
+                files = write_corpus(records, corpus_dir)
+                row['records'] = size
+            bench_parse(bench, size, files)
+            bench_merge(bench, size, corpus_dir, size)
+            bench_dedup(bench, size, records)
+            bench_arxiv(bench, size, records, corpus_dir)
+            bench_api_harvest(bench, size, records, corpus_dir)
+            bench_dblp_dump(bench, size, records, corpus_dir)
+            bench_enrich(bench, size, records, corpus_dir)
+            bench_screening(bench, size, records, corpus_dir)
+            bench_page_fetch(bench, size, records, corpus_dir)
+    finally:
+        if keep:
+            print(f"\nSynthetic corpora kept in: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    config = {'sizes': sizes, 'duplicate_rate': duplicate_rate, 'pairwise_limit': PAIRWISE_LIMIT,
+              'screen_sample': SCREEN_SAMPLE, 'page_sample': PAGE_SAMPLE,
+              'llm_latency': LLM_LATENCY, 'llm_error_rate': LLM_ERROR_RATE, 'llm_malformed_rate': LLM_MALFORMED_RATE,
+              'llm_slow_rate': LLM_SLOW_RATE, 'llm_slow_latency': LLM_SLOW_LATENCY,
+              'arxiv_latency': ARXIV_LATENCY, 'api_latency': API_LATENCY, 'api_error_rate': API_ERROR_RATE, 'doi_latency': DOI_LATENCY, 'doi_error_rate': DOI_ERROR_RATE}
+    return {'schema': 1, 'environment': environment(), 'config': config, 'results': bench.results}
+
+
+def compare(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Joins two reports on (size, stage); 'ratio' > 1 means the new run is slower."""
+    old = pd.DataFrame(baseline['results'])
+    new = pd.DataFrame(report['results'])
+    merged = new.merge(old, on=['size', 'stage'], how='left', suffixes=('', '_baseline'))
+    merged['ratio'] = (merged['seconds'] / merged['seconds_baseline']).round(2)
+    merged['regression'] = (merged['ratio'] > 1 + tolerance) & (merged['seconds'] >= REGRESSION_MIN_SECONDS)
+    return merged[['size', 'stage', 'seconds_baseline', 'seconds', 'ratio', 'regression']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SLR pipeline on synthetic corpora.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="corpus sizes, e.g. 1000 10000 100000")
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, metavar='STAGE',
+                        help=f"stages to run (default: all): {', '.join(STAGES)}")
+    parser.add_argument('--duplicate-rate', type=float, default=DUPLICATE_RATE)
+    parser.add_argument('--output', default=OUTPUT_FILE, help="JSON report to write")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier JSON report to compare against")
+    parser.add_argument('--keep', action='store_true', help="keep the generated corpora")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.stages, args.duplicate_rate, args.keep)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_columns', 20)
+    print("\n--- Results ---")
+    print(pd.DataFrame(report['results']).fillna('').to_string(index=False))
+    print(f"\nReport saved to '{args.output}'.")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(report, baseline)
+        print(f"\n--- Compared with {args.compare} ---")
+        print(comparison.fillna('').to_string(index=False))
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            print(f"\n{len(regressions)} stage(s) slower by more than {REGRESSION_TOLERANCE:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
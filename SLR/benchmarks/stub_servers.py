@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-ins for the external services the pipeline calls.
+
+StubServer runs a threaded HTTP server on 127.0.0.1 that answers
+
+    POST /v1/chat/completions   OpenAI chat API: 'Yes'/'No' answers, the
+                                 'FM/LLM: ... SE: ... English: ...' lines of the
+                                 inclusion prompt, the EC7/EC8 JSON object, or a
+                                 single token with logprobs (max_tokens=1)
+    GET  /api/query              arXiv API: Atom pages over a record list
+    GET  /oai                    arXiv OAI-PMH ListRecords: OAI_PAGE_SIZE records per page
+                                 with a resumptionToken, filtered by 'from' (datestamp)
+    GET  /search/publ/api        dblp search API: JSON pages over the record list
+                                 (a 'year:YYYY:' in the query selects that year)
+    GET  /meta/v2/json           Springer Nature Metadata API: JSON pages, likewise
+                                 filtered by 'year:YYYY'
+    GET  /works                  Crossref: the works of a 'doi:a,doi:b,...' filter
+    GET  /<anything with a DOI>  DOI landing page with citation_firstpage/lastpage
+                                 meta tags and a 'Pages x-y' span
+
+with a configurable latency and share of '429 Too Many Requests' replies, and
+counts the requests it served. Answers are deterministic per prompt/DOI. A
+share `malformed_rate` of the structured chat answers is garbled the way real replies
+drift (code fences, key case, "Include.", cut off by the token limit), and a
+share `slow_rate` of all requests takes `slow_latency` seconds longer (the
+slow tail that hedged requests cut off).
+
+    with StubServer(latency=0.2, error_rate=0.05, records=records) as server:
+        client = OpenAI(base_url=server.url + '/v1', api_key='benchmark')
+
+With `recordings` (a folder written by a harvest run with SLR_HARVEST_RECORD
+set, see slrkit/harvest.py), GET requests whose path and parameters were
+recorded are answered with the recorded response instead.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_corpus import atom_feed, crossref_json, dblp_json, oai_list_records, springer_json, submitted_date
+from slrkit.harvest import recording_key
+
+# Default latency (seconds) and share of requests answered with HTTP 429
+LATENCY = 0.0
+ERROR_RATE = 0.0
+# Records per OAI-PMH ListRecords page (arXiv sends 1000)
+OAI_PAGE_SIZE = 100
+
+# Default share of chat answers that are malformed (see _malform())
+MALFORMED_RATE = 0.0
+# Default share of requests delayed by SLOW_LATENCY extra seconds
+SLOW_RATE = 0.0
+SLOW_LATENCY = 0.0
+
+
+def _stable_fraction(text):
+    """Deterministic number in [0, 1) for a string (same prompt -> same answer)."""
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16) / 0x100000000
+
+
+def _for_year(records, query):
+    """The records of the year named in a 'year:YYYY' query filter (all records without one)."""
+    match = re.search(r'year:(\d{4})', query)
+    return [r for r in records if r['year'] == int(match.group(1))] if match else records
+
+
+def _chat_reply(body):
+    """The assistant message (and logprobs) for a chat completion request."""
+    prompt = '\n'.join(str(m.get('content', '')) for m in body.get('messages', []))
+    p_yes = _stable_fraction(prompt)
+    yes = p_yes >= 0.3
+    if body.get('response_format', {}).get('type') == 'json_object':
+        ec7 = 'Include' if yes else 'Exclude'
+        ec8 = 'Include' if _stable_fraction(prompt[::-1]) >= 0.3 else 'Exclude'
+        return json.dumps({'EC7_Comment': 'The abstract describes the agent architecture in detail.',
+                           'EC7_Decision': ec7,
+                           'EC8_Comment': 'The main contribution is a new agent design.',
+                           'EC8_Decision': ec8}), None
+    if body.get('max_tokens') == 1 and body.get('logprobs'):
+        token = 'Yes' if yes else 'No'
+        top = [{'token': 'Yes', 'logprob': math.log(max(p_yes, 1e-6)), 'bytes': None},
+               {'token': 'No', 'logprob': math.log(max(1 - p_yes, 1e-6)), 'bytes': None}]
+        return token, {'content': [{'token': token, 'logprob': top[0 if yes else 1]['logprob'],
+                                    'bytes': None, 'top_logprobs': top}]}
+    if 'FM/LLM' in prompt and 'English' in prompt and 'Answer with only' not in prompt:
+        se = 'Yes' if _stable_fraction(prompt + 'se') >= 0.2 else 'No'
+        return f"FM/LLM: {'Yes' if yes else 'No'}\nSE: {se}\nEnglish: Yes", None
+    return ('Yes' if yes else 'No'), None
+
+
+def _malform(content, rng):
+    """A drifted version of a well-formed chat answer (some of them cannot be repaired)."""
+    kind = rng.choice(['fence', 'case', 'decision', 'truncate'])
+    if kind == 'fence':
+        return f"Here is my analysis:\n```json\n{content.rstrip('}')},\n}}\n```"
+    if kind == 'case':
+        return re.sub(r'(EC\d)_(Comment|Decision)', lambda m: f"{m.group(1).lower()} {m.group(2).lower()}",
+                      content).replace('FM/LLM', 'fm/llm').replace('English', 'ENGLISH')
+    if kind == 'decision':
+        return re.sub(r'\b(Include|Exclude|Yes|No)\b', lambda m: f"**{m.group(1).lower()}.**", content)
+    return content[:rng.randint(len(content) // 2, len(content) - 1)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttle(self):
+        """Applies latency; returns True if this request should be answered with 429."""
+        server = self.server.stub
+        with server.lock:
+            slow = server.rng.random() < server.slow_rate
+            server.slow += slow
+        if server.latency or slow:
+            time.sleep(server.latency + (server.slow_latency if slow else 0))
+        with server.lock:
+            server.requests += 1
+            if server.rng.random() < server.error_rate:
+                server.rate_limited += 1
+                return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self._throttle():
+            self._send(429, json.dumps({'error': {'message': 'Rate limit reached (stub)', 'type': 'rate_limit'}}))
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, '{}')
+            return
+        content, logprobs = _chat_reply(body)
+        with self.server.stub.lock:
+            # Only the structured answers (EC7/EC8 JSON, inclusion lines) are garbled
+            structured = logprobs is None and ('\n' in content or content.startswith('{'))
+            if structured and self.server.stub.rng.random() < self.server.stub.malformed_rate:
+                self.server.stub.malformed += 1
+                content = _malform(content, self.server.stub.rng)
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+        self.server.stub.bytes_sent += len(content)
+        self._send(200, json.dumps({
+            'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'logprobs': logprobs,
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': max(1, len(content) // 4),
+                      'total_tokens': prompt_tokens + max(1, len(content) // 4),
+                      'prompt_tokens_details': {'cached_tokens': 0}},
+        }))
+
+    def do_GET(self):
+        if self._throttle():
+            self._send(429, 'Too Many Requests', 'text/plain')
+            return
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        recordings = self.server.stub.recordings
+        if recordings:
+            recorded = os.path.join(recordings, recording_key(url.path, {k: v[0] for k, v in params.items()}))
+            if os.path.exists(recorded):
+                with open(recorded, encoding='utf-8') as f:
+                    page = f.read()
+                self.server.stub.bytes_sent += len(page)
+                self._send(200, page)
+                return
+        if url.path.rstrip('/') == '/search/publ/api':
+            query = params.get('q', [''])[0]
+            first = int(params.get('f', ['0'])[0])
+            hits = int(params.get('h', ['30'])[0])
+            records = _for_year(self.server.stub.records, query)
+            page = dblp_json(records[first:first + hits], len(records), first, query)
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page)
+            return
+        if url.path.rstrip('/') == '/meta/v2/json':
+            query = params.get('q', [''])[0]
+            start = int(params.get('s', ['1'])[0])
+            page_size = int(params.get('p', ['10'])[0])
+            records = _for_year(self.server.stub.records, query)
+            page = springer_json(records[start - 1:start - 1 + page_size], len(records), start, query)
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page)
+            return
+        if url.path.rstrip('/') == '/works':
+            wanted = [value[len('doi:'):].lower() for value in params.get('filter', [''])[0].split(',')
+                      if value.startswith('doi:')]
+            page = crossref_json([self.server.stub.by_doi[doi] for doi in wanted if doi in self.server.stub.by_doi])
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page)
+            return
+        if url.path.rstrip('/') == '/api/query':
+            start = int(params.get('start', ['0'])[0])
+            max_results = int(params.get('max_results', ['10'])[0])
+            records = self.server.stub.records
+            page = atom_feed(records[start:start + max_results], len(records), start)
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page, 'application/atom+xml')
+            return
+        if url.path.rstrip('/') == '/oai':
+            # The resumption token carries the 'from' date and the offset of the next page
+            token = params.get('resumptionToken', [''])[0]
+            since, offset = token.split('|') if token else (params.get('from', [''])[0], '0')
+            records = [r for r in self.server.stub.records if submitted_date(r) >= since]
+            offset = int(offset)
+            next_token = f"{since}|{offset + OAI_PAGE_SIZE}" if offset + OAI_PAGE_SIZE < len(records) else ''
+            page = oai_list_records(records[offset:offset + OAI_PAGE_SIZE], next_token)
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page, 'text/xml')
+            return
+        match = re.search(r'(10\.\d{4,9}/[^?#\s]+)', url.path)
+        if match:
+            doi = match.group(1)
+            first = 1 + int(_stable_fraction(doi) * 900)
+            last = first + int(_stable_fraction(doi[::-1]) * 25)
+            page = (f'<html><head><meta name="citation_doi" content="{doi}">'
+                    f'<meta name="citation_firstpage" content="{first}">'
+                    f'<meta name="citation_lastpage" content="{last}"></head>'
+                    f'<body><div class="text-xs"><span>Pages {first}-{last}</span></div></body></html>')
+            self.server.stub.bytes_sent += len(page)
+            self._send(200, page, 'text/html')
+            return
+        self._send(404, 'Not Found', 'text/plain')
+
+
+class StubServer:
+    """
+    Threaded HTTP stub on a free local port. `records` feeds the arXiv, dblp,
+    Springer and Crossref endpoints; `recordings` is a folder of recorded harvest responses.
+    Counts requests, 429 replies and response bytes.
+    """
+
+    def __init__(self, latency=LATENCY, error_rate=ERROR_RATE, records=None, seed=0, recordings=None,
+                 malformed_rate=MALFORMED_RATE, slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.slow = 0
+        self.malformed_rate = malformed_rate
+        self.malformed = 0
+        self.records = records or []
+        self.by_doi = {r['doi'].lower(): r for r in self.records if r.get('doi')}
+        self.recordings = recordings
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.bytes_sent = 0
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def stats(self):
+        return {'requests': self.requests, 'rate_limited': self.rate_limited, 'malformed': self.malformed,
+                'slow': self.slow, 'bytes_sent': self.bytes_sent}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else LATENCY
+    error_rate = float(sys.argv[2]) if len(sys.argv) > 2 else ERROR_RATE
+    recordings = sys.argv[3] if len(sys.argv) > 3 else None
+    from synthetic_corpus import generate_records
+    server = StubServer(latency, error_rate, records=generate_records(1000), recordings=recordings).start()
+    print(f"Stub server running at {server.url} (latency {latency}s, 429 rate {error_rate}). Ctrl+C to stop.")
+    print(f"  OpenAI:  OPENAI_BASE_URL={server.url}/v1")
+    print(f"  arXiv:   {server.url}/api/query?")
+    print(f"  dblp:    {server.url}/search/publ/api")
+    print(f"  Springer: {server.url}/meta/v2/json")
+    print(f"  Crossref: {server.url}/works")
+    print(f"  DOI:     {server.url}/doi.org/10.5555/bench.000001")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic literature corpora for the benchmarks.
+
+generate_records() creates N bibliographic records with a controlled share of
+duplicates (exact copies and near-duplicate titles with a typo / different
+case and punctuation, with or without the DOI). Every record carries the
+ground truth ('dup_of' = index of the original, or None), so deduplication
+recall can be measured.
+
+The writers reproduce the export formats the harvesting scripts read:
+
+    RIS (ScienceDirect), BibTeX (dblp), IEEE Xplore CSV, SpringerLink CSV,
+    Web of Science export, arXiv API Atom feed, dblp.xml dump (+ dblp.dtd)
+
+and the replies of the APIs the harvesters and the enrichment query (dblp
+search API JSON, Springer Nature Metadata API JSON, Crossref /works JSON).
+
+Usage:
+    python synthetic_corpus.py 10000 out_dir [duplicate_rate]
+"""
+import csv
+import html.entities
+import json
+import os
+import random
+import sys
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+SLR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SLR_DIR)
+from slrkit.excel_io import write_excel
+
+# Share of records that are duplicates of an earlier record
+DUPLICATE_RATE = 0.1
+# Of those, the share that are near duplicates (the rest are exact copies)
+NEAR_DUPLICATE_SHARE = 0.5
+SEED = 42
+
+# Records per exported file, like the page sizes of the real exports
+RECORDS_PER_FILE = {'ris': 100, 'bibtex': 1000, 'ieee': 1000, 'springer': 1000, 'wos': 500}
+
+TOPIC_WORDS = [
+    'agent', 'agents', 'multi-agent', 'language', 'model', 'models', 'large', 'foundation', 'LLM', 'LLMs',
+    'generative', 'autonomous', 'architecture', 'architectures', 'design', 'framework', 'pattern', 'patterns',
+    'software', 'engineering', 'code', 'generation', 'program', 'repair', 'testing', 'test', 'bug', 'fault',
+    'localization', 'review', 'requirements', 'maintenance', 'refactoring', 'security', 'prompt', 'prompting',
+    'planning', 'reasoning', 'tool', 'memory', 'retrieval', 'evaluation', 'benchmark', 'empirical', 'study',
+    'survey', 'taxonomy', 'adaptive', 'systems', 'system', 'collaborative', 'self-reflective', 'interactive',
+    'verification', 'synthesis', 'translation', 'completion', 'vulnerability', 'detection', 'analysis',
+    'specification', 'modeling', 'simulation', 'orchestration', 'workflow', 'pipeline', 'feedback', 'learning',
+]
+FILLER_WORDS = ['for', 'of', 'with', 'in', 'and', 'towards', 'using', 'via', 'on', 'the', 'a', 'an']
+FIRST_NAMES = ['Wei', 'Yu', 'Anna', 'Lukas', 'Maria', 'Jun', 'Sara', 'David', 'Chen', 'Li', 'Olga', 'Ravi',
+               'Aisha', 'Tom', 'Elena', 'Kenji', 'Fatima', 'Pablo', 'Ingrid', 'Omar', 'Mei', 'Jonas']
+LAST_NAMES = ['Zhang', 'Wang', 'Li', 'Müller', 'Smith', 'Garcia', 'Kim', 'Nguyen', 'Rossi', 'Novak', 'Sato',
+              'Khan', 'Silva', 'Johansson', 'Ivanova', 'Dubois', 'Patel', 'Cohen', 'Okafor', 'Larsen']
+VENUES = [('inproceedings', 'Proceedings of the International Conference on Software Engineering'),
+          ('inproceedings', 'Proceedings of the ACM Joint Meeting on Foundations of Software Engineering'),
+          ('inproceedings', 'International Conference on Automated Software Engineering'),
+          ('inproceedings', 'Workshop on Large Language Models for Code'),
+          ('article', 'IEEE Transactions on Software Engineering'),
+          ('article', 'ACM Transactions on Software Engineering and Methodology'),
+          ('article', 'Empirical Software Engineering'),
+          ('article', 'Journal of Systems and Software'),
+          ('article', 'Information and Software Technology')]
+
+
+def _title(rng):
+    words = [rng.choice(TOPIC_WORDS) for _ in range(rng.randint(5, 10))]
+    for _ in range(rng.randint(1, 3)):
+        words.insert(rng.randint(1, len(words) - 1), rng.choice(FILLER_WORDS))
+    title = ' '.join(words)
+    return title[0].upper() + title[1:]
+
+
+def _abstract(rng):
+    sentences = []
+    for _ in range(rng.randint(6, 10)):
+        words = [rng.choice(TOPIC_WORDS + FILLER_WORDS) for _ in range(rng.randint(12, 24))]
+        sentences.append(' '.join(words).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def _near_duplicate_title(title, rng):
+    """Same title with different case/punctuation and one typo in a long word (similarity stays >= 95)."""
+    words = title.split()
+    long_words = [i for i, w in enumerate(words) if len(w) >= 8]
+    if long_words:
+        i = rng.choice(long_words)
+        w = words[i]
+        j = rng.randint(1, len(w) - 2)
+        words[i] = w[:j] + w[j + 1] + w[j] + w[j + 2:]  # swap two letters
+    variant = ' '.join(words)
+    return rng.choice([variant.lower(), variant.upper(), variant + '.', variant.replace(' ', '  ', 1)])
+
+
+def generate_records(n, duplicate_rate=DUPLICATE_RATE, near_duplicate_share=NEAR_DUPLICATE_SHARE, seed=SEED):
+    """
+    Returns `n` record dicts. Duplicates point to their original through 'dup_of'
+    and are spread over the whole list (they come after their original).
+    """
+    rng = random.Random(seed)
+    records = []
+    n_duplicates = int(round(n * duplicate_rate))
+    duplicate_slots = set(rng.sample(range(1, n), n_duplicates)) if n > 1 else set()
+    for i in range(n):
+        originals = [r for r in records[-200:] if r['dup_of'] is None] if i in duplicate_slots else []
+        if originals:
+            original = rng.choice(originals)
+            record = dict(original, id=i, dup_of=original['id'])
+            if rng.random() < near_duplicate_share:
+                record['title'] = _near_duplicate_title(original['title'], rng)
+                record['dup_kind'] = 'near'
+                if rng.random() < 0.5:
+                    record['doi'] = ''
+            else:
+                record['dup_kind'] = 'exact'
+            records.append(record)
+            continue
+        entry_type, venue = rng.choice(VENUES)
+        start_page = rng.randint(1, 900)
+        records.append({
+            'id': i,
+            'dup_of': None,
+            'dup_kind': '',
+            'title': _title(rng),
+            'abstract': _abstract(rng),
+            'authors': [(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)) for _ in range(rng.randint(1, 6))],
+            'year': rng.randint(2017, 2025),
+            'entry_type': entry_type,
+            'venue': venue,
+            'start_page': start_page,
+            'end_page': start_page + rng.randint(0, 24),
+            'doi': f"10.5555/bench.{i:06d}",
+            'keywords': rng.sample(TOPIC_WORDS, 4),
+        })
+    return records
+
+
+def ground_truth_clusters(records):
+    """Record index -> index of the original it duplicates (originals map to themselves)."""
+    return [r['dup_of'] if r['dup_of'] is not None else r['id'] for r in records]
+
+
+def _chunks(records, size):
+    for start in range(0, len(records), size):
+        yield start // size, records[start:start + size]
+
+
+# --- Writers ---
+
+def write_ris(records, directory):
+    """ScienceDirect-style RIS files (one file per RECORDS_PER_FILE['ris'] records)."""
+    paths = []
+    for number, chunk in _chunks(records, RECORDS_PER_FILE['ris']):
+        path = os.path.join(directory, f"ScienceDirect_citations_{number:05d}.ris")
+        with open(path, 'w', encoding='utf-8') as f:
+            for r in chunk:
+                f.write("TY  - JOUR\n")
+                f.write(f"T1  - {r['title']}\n")
+                for first, last in r['authors']:
+                    f.write(f"AU  - {last}, {first}\n")
+                f.write(f"JO  - {r['venue']}\n")
+                f.write(f"SP  - {r['start_page']}\nEP  - {r['end_page']}\n")
+                f.write(f"PY  - {r['year']}\n")
+                if r['doi']:
+                    f.write(f"DO  - https://doi.org/{r['doi']}\n")
+                f.write(f"UR  - https://www.sciencedirect.com/science/article/pii/S{r['id']:012d}\n")
+                for keyword in r['keywords']:
+                    f.write(f"KW  - {keyword}\n")
+                f.write(f"AB  - {r['abstract']}\n")
+                f.write("ER  - \n\n")
+        paths.append(path)
+    return paths
+
+
+def write_bibtex(records, directory):
+    """dblp-style BibTeX files."""
+    paths = []
+    for number, chunk in _chunks(records, RECORDS_PER_FILE['bibtex']):
+        path = os.path.join(directory, f"dblp_{number:05d}.bib")
+        with open(path, 'w', encoding='utf-8') as f:
+            for r in chunk:
+                venue_field = 'booktitle' if r['entry_type'] == 'inproceedings' else 'journal'
+                authors = ' and\n                  '.join(f"{first} {last}" for first, last in r['authors'])
+                f.write(f"@{r['entry_type']}{{DBLP:bench/{r['id']},\n")
+                f.write(f"  author       = {{{authors}}},\n")
+                f.write(f"  title        = {{{r['title']}}},\n")
+                f.write(f"  {venue_field:<12} = {{{r['venue']}}},\n")
+                f.write(f"  pages        = {{{r['start_page']}--{r['end_page']}}},\n")
+                f.write(f"  year         = {{{r['year']}}},\n")
+                if r['doi']:
+                    f.write(f"  doi          = {{{r['doi']}}},\n")
+                f.write(f"  abstract     = {{{r['abstract']}}}\n}}\n\n")
+        paths.append(path)
+    return paths
+
+
+IEEE_COLUMNS = ['Document Title', 'Authors', 'Author Affiliations', 'Publication Title', 'Date Added To Xplore',
+                'Publication Year', 'Volume', 'Issue', 'Start Page', 'End Page', 'Abstract', 'ISSN', 'ISBNs', 'DOI',
+                'Funding Information', 'PDF Link', 'Author Keywords', 'IEEE Terms', 'Mesh_Terms',
+                'Article Citation Count', 'Patent Citation Count', 'Reference Count', 'License', 'Online Date',
+                'Issue Date', 'Meeting Date', 'Publisher', 'Document Identifier']
+
+
+def write_ieee_csv(records, directory):
+    """IEEE Xplore CSV exports."""
+    paths = []
+    for number, chunk in _chunks(records, RECORDS_PER_FILE['ieee']):
+        path = os.path.join(directory, f"ieee{number:05d}.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(IEEE_COLUMNS)
+            for r in chunk:
+                row = dict.fromkeys(IEEE_COLUMNS, '')
+                row.update({
+                    'Document Title': r['title'],
+                    'Authors': '; '.join(f"{first[0]}. {last}" for first, last in r['authors']),
+                    'Publication Title': r['venue'], 'Publication Year': r['year'],
+                    'Start Page': r['start_page'], 'End Page': r['end_page'], 'Abstract': r['abstract'],
+                    'DOI': r['doi'], 'PDF Link': f"https://ieeexplore.ieee.org/stamp/stamp.jsp?arnumber={r['id']}",
+                    'Author Keywords': ';'.join(r['keywords']), 'Publisher': 'IEEE',
+                    'Document Identifier': 'IEEE Conferences' if r['entry_type'] == 'inproceedings' else 'IEEE Journals',
+                })
+                writer.writerow([row[c] for c in IEEE_COLUMNS])
+        paths.append(path)
+    return paths
+
+
+SPRINGER_COLUMNS = ['Item Title', 'Publication Title', 'Book Series Title', 'Journal Volume', 'Journal Issue',
+                    'Item DOI', 'Authors', 'Publication Year', 'URL', 'Content Type']
+
+
+def write_springer_csv(records, directory):
+    """SpringerLink search result CSVs (authors concatenated without separator, like the real export)."""
+    paths = []
+    for number, chunk in _chunks(records, RECORDS_PER_FILE['springer']):
+        path = os.path.join(directory, f"SearchResults ({number}).csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(SPRINGER_COLUMNS)
+            for r in chunk:
+                writer.writerow([r['title'], r['venue'], '', '', '', r['doi'],
+                                 ''.join(f"{first} {last}" for first, last in r['authors']), r['year'],
+                                 f"https://link.springer.com/chapter/{r['doi']}",
+                                 'Conference paper' if r['entry_type'] == 'inproceedings' else 'Article'])
+        paths.append(path)
+    return paths
+
+
+def write_wos(records, directory):
+    """
+    Web of Science exports with the WoS column names. xlwt is not maintained, so
+    the files are written as .xlsx content under the .xls name the merge script
+    globs for; calamine (slrkit.excel_io.READ_ENGINE) reads them by content.
+    """
+    paths = []
+    for number, chunk in _chunks(records, RECORDS_PER_FILE['wos']):
+        path = os.path.join(directory, f"savedrecs{number}.xls")
+        df = pd.DataFrame({
+            'Publication Type': ['C' if r['entry_type'] == 'inproceedings' else 'J' for r in chunk],
+            'Authors': ['; '.join(f"{last}, {first[0]}" for first, last in r['authors']) for r in chunk],
+            'Author Full Names': ['; '.join(f"{last}, {first}" for first, last in r['authors']) for r in chunk],
+            'Article Title': [r['title'] for r in chunk],
+            'Source Title': [r['venue'].upper() for r in chunk],
+            'Author Keywords': ['; '.join(r['keywords']) for r in chunk],
+            'Abstract': [r['abstract'] for r in chunk],
+            'Publication Year': [r['year'] for r in chunk],
+            'Start Page': [r['start_page'] for r in chunk],
+            'End Page': [r['end_page'] for r in chunk],
+            'DOI': [r['doi'] for r in chunk],
+            'UT (Unique WOS ID)': [f"WOS:{r['id']:015d}" for r in chunk],
+        })
+        write_excel(df, path)
+        paths.append(path)
+    return paths
+
+
+def _arxiv_id(r):
+    return f"2{r['year'] % 100:02d}1.{r['id']:05d}"
+
+
+def submitted_date(r):
+    """The arXiv submission date of a record (also its OAI-PMH datestamp), 'YYYY-MM-DD'."""
+    return f"{r['year']}-0{1 + r['id'] % 9}-1{r['id'] % 10}"
+
+
+def atom_entry(r):
+    """One arXiv API <entry> for a record."""
+    arxiv_id = _arxiv_id(r) + 'v1'
+    published = f"{submitted_date(r)}T12:00:00Z"
+    authors = ''.join(f"<author><name>{escape(first)} {escape(last)}</name></author>" for first, last in r['authors'])
+    return (f"<entry><id>http://arxiv.org/abs/{arxiv_id}</id><published>{published}</published>"
+            f"<updated>{published}</updated><title>{escape(r['title'])}</title>"
+            f"<summary>{escape(r['abstract'])}</summary>{authors}"
+            f"<link title=\"pdf\" href=\"http://arxiv.org/pdf/{arxiv_id}\" rel=\"related\" type=\"application/pdf\"/>"
+            f"<arxiv:primary_category xmlns:arxiv=\"http://arxiv.org/schemas/atom\" term=\"cs.SE\" "
+            f"scheme=\"http://arxiv.org/schemas/atom\"/></entry>")
+
+
+def atom_feed(records, total, start):
+    """An arXiv API response page: `records` starting at `start` out of `total` results."""
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+            f'<title>ArXiv Query</title><opensearch:totalResults>{total}</opensearch:totalResults>'
+            f'<opensearch:startIndex>{start}</opensearch:startIndex>'
+            f'<opensearch:itemsPerPage>{len(records)}</opensearch:itemsPerPage>'
+            + ''.join(atom_entry(r) for r in records) + '</feed>')
+
+
+def oai_record(r):
+    """One OAI-PMH <record> in arXiv's metadata format for a record."""
+    authors = ''.join(f"<author><keyname>{escape(last)}</keyname><forenames>{escape(first)}</forenames></author>"
+                      for first, last in r['authors'])
+    return (f"<record><header><identifier>oai:arXiv.org:{_arxiv_id(r)}</identifier>"
+            f"<datestamp>{submitted_date(r)}</datestamp><setSpec>cs</setSpec></header>"
+            f"<metadata><arXiv xmlns=\"http://arxiv.org/OAI/arXiv/\"><id>{_arxiv_id(r)}</id>"
+            f"<created>{submitted_date(r)}</created><authors>{authors}</authors><title>{escape(r['title'])}</title>"
+            f"<categories>cs.SE cs.AI</categories><abstract>{escape(r['abstract'])}</abstract></arXiv></metadata></record>")
+
+
+def oai_list_records(records, token=''):
+    """An OAI-PMH ListRecords reply with `records` and the resumption token of the next page ('' = last page)."""
+    if not records:
+        return ('<?xml version="1.0" encoding="UTF-8"?><OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+                '<error code="noRecordsMatch">No records match</error></OAI-PMH>')
+    return ('<?xml version="1.0" encoding="UTF-8"?><OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+            '<responseDate>2025-08-01T00:00:00Z</responseDate><ListRecords>'
+            + ''.join(oai_record(r) for r in records)
+            + f'<resumptionToken>{escape(token)}</resumptionToken></ListRecords></OAI-PMH>')
+
+
+def dblp_hit(r):
+    """One hit of the dblp search API for a record."""
+    conference = r['entry_type'] == 'inproceedings'
+    key = f"{'conf' if conference else 'journals'}/bench/R{r['id']:06d}"
+    authors = [{'@pid': f"{r['id']}/{i}", 'text': f"{first} {last}"} for i, (first, last) in enumerate(r['authors'])]
+    info = {'authors': {'author': authors if len(authors) > 1 else authors[0]},
+            'title': r['title'] + '.', 'venue': r['venue'], 'pages': f"{r['start_page']}-{r['end_page']}",
+            'year': str(r['year']),
+            'type': 'Conference and Workshop Papers' if conference else 'Journal Articles',
+            'key': key, 'url': f"https://dblp.org/rec/{key}"}
+    if r['doi']:
+        info.update(doi=r['doi'], ee=f"https://doi.org/{r['doi']}")
+    return {'@score': '1', '@id': str(r['id']), 'info': info, 'url': f"https://dblp.org/rec/{key}"}
+
+
+def dblp_json(records, total, first, query=''):
+    """A dblp search API reply: `records` starting at hit `first` out of `total`."""
+    hits = {'@total': str(total), '@computed': str(total), '@sent': str(len(records)), '@first': str(first)}
+    if records:
+        hits['hit'] = [dblp_hit(r) for r in records]
+    return json.dumps({'result': {'query': query, 'status': {'@code': '200', 'text': 'OK'}, 'hits': hits}})
+
+
+def springer_record(r):
+    """One record of the Springer Nature Metadata API (v2) for a record."""
+    conference = r['entry_type'] == 'inproceedings'
+    return {'contentType': 'Chapter' if conference else 'Article',
+            'genre': ['ConferencePaper' if conference else 'OriginalPaper'],
+            'identifier': f"doi:{r['doi']}", 'title': r['title'],
+            'creators': [{'creator': f"{last}, {first}"} for first, last in r['authors']],
+            'publicationName': r['venue'], 'doi': r['doi'], 'publicationDate': f"{r['year']}-01-01",
+            'startingPage': str(r['start_page']), 'endingPage': str(r['end_page']),
+            'url': [{'format': 'html', 'platform': 'web', 'value': f"https://link.springer.com/chapter/{r['doi']}"}],
+            'abstract': r['abstract']}
+
+
+def springer_json(records, total, start, query=''):
+    """A Springer Metadata API reply: `records` starting at record `start` (1-based) out of `total`."""
+    return json.dumps({'apiMessage': 'This JSON was provided by Springer Nature', 'query': query,
+                       'result': [{'total': str(total), 'start': str(start), 'pageLength': str(len(records)),
+                                   'recordsDisplayed': str(len(records))}],
+                       'records': [springer_record(r) for r in records]})
+
+
+def crossref_item(r):
+    """One Crossref work (the fields crossref_enrich.py selects) for a record."""
+    return {'DOI': r['doi'].upper(),
+            'type': 'proceedings-article' if r['entry_type'] == 'inproceedings' else 'journal-article',
+            'abstract': f"<jats:title>Abstract</jats:title><jats:p>{escape(r['abstract'])}</jats:p>",
+            'page': f"{r['start_page']}-{r['end_page']}", 'container-title': [r['venue']],
+            'publisher': 'Association for Computing Machinery (ACM)'}
+
+
+def crossref_json(records):
+    """A Crossref /works reply listing `records`."""
+    return json.dumps({'status': 'ok', 'message-type': 'work-list',
+                       'message': {'total-results': len(records), 'items': [crossref_item(r) for r in records]}})
+
+
+def write_arxiv_atom(records, directory, page_size=200):
+    """arXiv API result pages as Atom files."""
+    paths = []
+    for number, chunk in _chunks(records, page_size):
+        path = os.path.join(directory, f"arxiv_page_{number:05d}.xml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(atom_feed(chunk, len(records), number * page_size))
+        paths.append(path)
+    return paths
+
+
+def _dblp_escape(text):
+    # dblp.xml writes non-ASCII characters as the entities defined in dblp.dtd ("M&uuml;ller")
+    return ''.join(f"&{html.entities.codepoint2name[ord(char)]};" if ord(char) > 127 else char
+                   for char in escape(text))
+
+
+def write_dblp_dump(records, directory, other_years=1):
+    """
+    A dblp.xml dump with its dblp.dtd: one publication per record, plus
+    `other_years` publications outside 2017-2025 and one person page (<www>)
+    per record, as in the real dump. Titles of every 7th record carry <i> markup.
+    """
+    with open(os.path.join(directory, 'dblp.dtd'), 'w', encoding='latin-1') as f:
+        f.write('<!ELEMENT dblp ANY>\n')
+        # The ISO 8859-1 character entities, as in the real dblp.dtd
+        for codepoint in sorted(set(html.entities.codepoint2name) & set(range(160, 256))):
+            f.write(f'<!ENTITY {html.entities.codepoint2name[codepoint]} "&#{codepoint};">\n')
+    path = os.path.join(directory, 'dblp.xml')
+    with open(path, 'w', encoding='latin-1') as f:
+        f.write('<?xml version="1.0" encoding="ISO-8859-1"?>\n<!DOCTYPE dblp SYSTEM "dblp.dtd">\n<dblp>\n')
+        for r in records:
+            conference = r['entry_type'] == 'inproceedings'
+            tag, venue_tag = ('inproceedings', 'booktitle') if conference else ('article', 'journal')
+            authors = [f"{first} {last}" for first, last in r['authors']]
+            title = _dblp_escape(r['title'])
+            if r['id'] % 7 == 0:
+                first_word, _, rest = title.partition(' ')
+                title = f"<i>{first_word}</i> {rest}"
+            for offset in range(1 + other_years):
+                year = r['year'] if offset == 0 else 2000 + offset % 10
+                key = f"{'conf' if conference else 'journals'}/bench/R{r['id']:06d}" + (f"-{offset}" if offset else '')
+                f.write(f'<{tag} mdate="2025-08-01" key="{key}">'
+                        + ''.join(f"<author>{_dblp_escape(author)}</author>" for author in authors)
+                        + f"<title>{title}.</title><pages>{r['start_page']}-{r['end_page']}</pages>"
+                        f"<year>{year}</year><{venue_tag}>{_dblp_escape(r['venue'])}</{venue_tag}>"
+                        + (f"<ee>https://doi.org/{r['doi']}</ee>" if r['doi'] else '')
+                        + f"</{tag}>\n")
+            f.write(f'<www mdate="2025-08-01" key="homepages/bench/{r["id"]}"><author>{_dblp_escape(authors[0])}</author>'
+                    f'<title>Home Page</title></www>\n')
+        f.write('</dblp>\n')
+    return path
+
+
+WRITERS = {
+    'sciencedirect': write_ris,
+    'dblp': write_bibtex,
+    'ieee': write_ieee_csv,
+    'springer': write_springer_csv,
+    'webofscience': write_wos,
+    'arxiv': write_arxiv_atom,
+}
+
+
+def write_corpus(records, directory):
+    """Writes every format into its own sub-folder. Returns {source: [paths]}."""
+    files = {}
+    for source, writer in WRITERS.items():
+        folder = os.path.join(directory, source)
+        os.makedirs(folder, exist_ok=True)
+        files[source] = writer(records, folder)
+    return files
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{size}"
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else DUPLICATE_RATE
+    records = generate_records(size, rate)
+    for source, paths in write_corpus(records, out_dir).items():
+        print(f"{source:<14} {len(paths):>4} files")
+    print(f"{size} records ({sum(r['dup_of'] is not None for r in records)} duplicates) written to '{out_dir}'.")
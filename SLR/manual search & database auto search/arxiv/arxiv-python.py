@@ -5,8 +5,43 @@ import pandas as pd
 from datetime import datetime
 import time
 import re
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import write_excel
+
+# arXiv API 地址和分页请求之间的等待时间（秒），arXiv 要求两次请求之间至少间隔 3 秒
+ARXIV_API_URL = 'http://export.arxiv.org/api/query?'
+PAGE_DELAY = 3
+
+# --- 设置日期和输出文件名 ---
+START_DATE = '2017-01-01'
+END_DATE = '2025-07-31'
+OUTPUT_FILE = 'arXiv_Final_Results_v3.xlsx'
+
+# --- 定义查询的各个部分 ---
+PART1_QUERY_STR = (
+    '"FM-based agent" OR "Foundation Models" OR "Large Language Models" OR "LLMs" OR "Generative AI" OR "Conversational AI" OR "Transformer Models" OR "Autonomous Agents" OR "Agentic AI" OR "Multi-agent Systems" OR "MAS" OR "LLM-based Agents" OR "Generative Agents" OR "Autonomous Web Agent" OR "AWA"'
+)
+
+PART2_TERMS = [
+    "AI Agent Architecture", "Agent-based Systems", "Modular Architectures for AI Agent", "AI Agent Design", 
+    "Autonomous Agent System Design", "Adaptive AI Architectures", "Adaptive AI Taxonomy", "Software Architecture", 
+    "System Design", "Software Engineering Task", "Code Generation", "Automated Program Repair", "APR", 
+    "Bug Fixing", "Fault Localization", "Software Testing", "Code Review", "Requirements Engineering", 
+    "Software Maintenance", "Refactoring", "Code Snippet Adaptation", "Code Intent Extraction", 
+    "Simulation Testing", "Security", "Prompt Engineering"
+]
+
+
+def build_sub_query(term):
+    """按 part1 AND part2 的方式为单个 part2 术语构造 arXiv 子查询。"""
+    abs_query = f'abs:(({PART1_QUERY_STR}) AND "{term}")'
+    return f'(cat:cs.*) AND {abs_query}'
+
+
 def clean_text(text):
     """清理从 XML 中提取的文本，替换多个换行符和空格。"""
     if not text:
@@ -15,19 +50,22 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+@telemetry.timed('arxiv.fetch_query', records=len)
 def fetch_papers_for_query(search_query, start_date, end_date):
     """
     为单个查询获取所有符合条件的论文。
     这是一个核心函数，用于被循环调用。
     """
-    base_url = 'http://export.arxiv.org/api/query?'
+    base_url = ARXIV_API_URL
     papers_for_this_query = []
     
     # 1. 获取此子查询的总结果数
     try:
         initial_query_params = {'search_query': search_query, 'start': 0, 'max_results': 1}
         with urllib.request.urlopen(base_url + urllib.parse.urlencode(initial_query_params)) as response:
-            initial_xml = response.read().decode('utf-8')
+            initial_bytes = response.read()
+        telemetry.count('bytes_fetched', len(initial_bytes))
+        initial_xml = initial_bytes.decode('utf-8')
         root = ET.fromstring(initial_xml)
         namespace = {'atom': 'http://www.w3.org/2005/Atom', 'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'}
         total_results = int(root.find('opensearch:totalResults', namespace).text)
@@ -54,16 +92,20 @@ def fetch_papers_for_query(search_query, start_date, end_date):
         
         try:
             with urllib.request.urlopen(url) as response:
-                xml_data = response.read().decode('utf-8')
-        except Exception:
+                page_bytes = response.read()
+        except Exception as e:
+            telemetry.count('retries', source='arxiv', error=str(e))
             time.sleep(5) # 如果失败，等待后重试一次
             try:
                  with urllib.request.urlopen(url) as response:
-                    xml_data = response.read().decode('utf-8')
+                    page_bytes = response.read()
             except Exception as e:
+                telemetry.count('failed_pages', source='arxiv', error=str(e))
                 print(f" -> 请求失败: {e}, 跳过此分页。")
                 start += results_per_page
                 continue
+        telemetry.count('bytes_fetched', len(page_bytes))
+        xml_data = page_bytes.decode('utf-8')
 
         root = ET.fromstring(xml_data)
         entries = root.findall('atom:entry', namespace)
@@ -93,56 +135,43 @@ def fetch_papers_for_query(search_query, start_date, end_date):
                 })
         
         start += len(entries)
-        time.sleep(3) 
+        time.sleep(PAGE_DELAY)
         
     return papers_for_this_query
 
 
-if __name__ == '__main__':
-    # --- 定义查询的各个部分 ---
-    part1_query_str = (
-        '"FM-based agent" OR "Foundation Models" OR "Large Language Models" OR "LLMs" OR "Generative AI" OR "Conversational AI" OR "Transformer Models" OR "Autonomous Agents" OR "Agentic AI" OR "Multi-agent Systems" OR "MAS" OR "LLM-based Agents" OR "Generative Agents" OR "Autonomous Web Agent" OR "AWA"'
-    )
-    
-    part2_terms = [
-        "AI Agent Architecture", "Agent-based Systems", "Modular Architectures for AI Agent", "AI Agent Design", 
-        "Autonomous Agent System Design", "Adaptive AI Architectures", "Adaptive AI Taxonomy", "Software Architecture", 
-        "System Design", "Software Engineering Task", "Code Generation", "Automated Program Repair", "APR", 
-        "Bug Fixing", "Fault Localization", "Software Testing", "Code Review", "Requirements Engineering", 
-        "Software Maintenance", "Refactoring", "Code Snippet Adaptation", "Code Intent Extraction", 
-        "Simulation Testing", "Security", "Prompt Engineering"
-    ]
-
-    # --- 设置日期和输出文件名 ---
-    start_date_str = '2017-01-01'
-    end_date_str = '2025-07-31'
-    output_file = 'arXiv_Final_Results_v3.xlsx'
-
-    start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
-    end_date_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
-    
+def harvest_arxiv(output_file=OUTPUT_FILE, start_date=START_DATE, end_date=END_DATE, terms=PART2_TERMS):
+    """
+    对每个 part2 术语执行一次子查询，按 arXiv ID 去重后写入 output_file，返回论文列表。
+    日期为 'YYYY-MM-DD' 字符串。
+    """
+    start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
+    end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+
     master_paper_list = []
     processed_ids = set()
 
     # --- 循环执行每个子查询 ---
-    for i, term in enumerate(part2_terms):
-        print(f"\n--- 开始执行子查询 {i+1}/{len(part2_terms)}: (Term: '{term}') ---")
+    with telemetry.stage('arxiv.harvest') as stage_info:
+        for i, term in enumerate(terms):
+            print(f"\n--- 开始执行子查询 {i+1}/{len(terms)}: (Term: '{term}') ---")
+            telemetry.gauge('queue_depth', len(terms) - i)
         
-        # 采用新的、更细粒度的拆分方式
-        abs_query = f'abs:(({part1_query_str}) AND "{term}")'
-        final_query = f'(cat:cs.*) AND {abs_query}'
+            # 采用新的、更细粒度的拆分方式
+            final_query = build_sub_query(term)
         
-        papers_from_query = fetch_papers_for_query(final_query, start_date_obj, end_date_obj)
+            papers_from_query = fetch_papers_for_query(final_query, start_date_obj, end_date_obj)
         
-        new_papers_found = 0
-        for paper in papers_from_query:
-            if paper['arXiv ID'] not in processed_ids:
-                master_paper_list.append(paper)
-                processed_ids.add(paper['arXiv ID'])
-                new_papers_found += 1
+            new_papers_found = 0
+            for paper in papers_from_query:
+                if paper['arXiv ID'] not in processed_ids:
+                    master_paper_list.append(paper)
+                    processed_ids.add(paper['arXiv ID'])
+                    new_papers_found += 1
         
-        print(f" -> 完成。本次查询新增了 {new_papers_found} 篇独一无二的论文。")
-        print(f" -> 当前论文总数: {len(master_paper_list)}")
+            print(f" -> 完成。本次查询新增了 {new_papers_found} 篇独一无二的论文。")
+            print(f" -> 当前论文总数: {len(master_paper_list)}")
+        stage_info['records'] = len(master_paper_list)
 
     # --- 所有查询完成，进行最后处理 ---
     print(f"\n\n所有子查询执行完毕！总共收集到 {len(master_paper_list)} 篇独一无二的论文。")
@@ -154,5 +183,11 @@ if __name__ == '__main__':
         df = pd.DataFrame(master_paper_list)
         # 按日期降序排序
         df_sorted = df.sort_values(by='Published Date', ascending=False)
-        df_sorted.to_excel(output_file, index=False, engine='openpyxl')
+        write_excel(df_sorted, output_file)
         print(f"任务成功！最终数据已保存至 {output_file}")
+    telemetry.print_summary()
+    return master_paper_list
+
+
+if __name__ == '__main__':
+    harvest_arxiv()
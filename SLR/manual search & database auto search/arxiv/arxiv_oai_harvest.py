@@ -0,0 +1,235 @@
+#
+# 通过 OAI-PMH 一次性批量获取 arXiv cs 分类的元数据并保存到本地 SQLite，
+# 然后在本地执行与 arxiv-python.py 相同的 part1 AND part2 查询和日期过滤。
+#
+# arxiv-python.py 对每个 part2 术语调用一次搜索 API（每页之间等待 3 秒，且受分页限制）；
+# 这里只需按 datestamp 增量获取一次 cs 元数据，之后的查询在内存中（FTS5）完成，
+# 再次运行时只获取上次 datestamp 之后新增或修改的记录。
+#
+import os
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+ARXIV_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ARXIV_DIR, '..', '..'))
+sys.path.insert(0, os.path.join(ARXIV_DIR, '..', '..', 'Screen'))
+from slrkit import telemetry
+from slrkit.excel_io import write_excel
+from search_index import SearchIndex, load_arxiv_design
+
+# arXiv 的 OAI-PMH 接口；arXiv 用 503 + Retry-After 控制请求频率
+OAI_URL = 'https://oaipmh.arxiv.org/oai'
+OAI_SET = 'cs'
+METADATA_PREFIX = 'arXiv'
+RETRIES = 5
+TIMEOUT = 120
+
+# 与 arxiv-python.py 相同的日期范围（按 v1 提交日期过滤）和查询（PART1_QUERY_STR、PART2_TERMS、build_sub_query）
+START_DATE = '2017-01-01'
+END_DATE = '2025-07-31'
+ARXIV_SCRIPT = os.path.join(ARXIV_DIR, 'arxiv-python.py')
+
+# 本地元数据库（首次运行时创建，之后增量更新）和输出文件
+STORE_FILE = 'arxiv_oai_cs.sqlite'
+OUTPUT_FILE = 'arXiv_OAI_Results.xlsx'
+
+NAMESPACES = {'oai': 'http://www.openarchives.org/OAI/2.0/', 'arxiv': 'http://arxiv.org/OAI/arXiv/'}
+
+
+class ArxivStore:
+    """arXiv ID -> 元数据，以及未完成的 ListRecords 请求（from 日期 + resumptionToken），保存在 SQLite 中。"""
+
+    def __init__(self, path=STORE_FILE):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                arxiv_id TEXT PRIMARY KEY, datestamp TEXT, created TEXT, title TEXT, authors TEXT,
+                abstract TEXT, categories TEXT, deleted INTEGER DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);""")
+
+    def get(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def last_datestamp(self):
+        return self.connection.execute("SELECT max(datestamp) FROM records").fetchone()[0]
+
+    def add_page(self, records, token, since):
+        """保存一页记录和下一页的 resumptionToken（同一事务，中断后从这一页之后继续）。"""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO records (arxiv_id, datestamp, created, title, authors, abstract, categories, deleted) "
+            "VALUES (:arxiv_id, :datestamp, :created, :title, :authors, :abstract, :categories, :deleted)", records)
+        self.set('resumption_token', token)
+        self.set('harvest_from', since)
+        self.connection.commit()
+
+    def window(self, start_date, end_date):
+        """提交日期在 [start_date, end_date] 之间、未删除的记录。"""
+        return pd.read_sql_query(
+            "SELECT * FROM records WHERE deleted = 0 AND created BETWEEN ? AND ? ORDER BY arxiv_id",
+            self.connection, params=(start_date, end_date))
+
+    def close(self):
+        self.connection.close()
+
+
+def clean_text(text):
+    return ' '.join((text or '').split())
+
+
+def parse_record(record):
+    """一个 OAI <record> -> 一行元数据（删除的记录只有 ID 和 datestamp）。"""
+    header = record.find('oai:header', NAMESPACES)
+    identifier = header.findtext('oai:identifier', '', NAMESPACES)
+    row = {'arxiv_id': identifier.replace('oai:arXiv.org:', ''), 'datestamp': header.findtext('oai:datestamp', '', NAMESPACES),
+           'created': '', 'title': '', 'authors': '', 'abstract': '', 'categories': '',
+           'deleted': int(header.get('status') == 'deleted')}
+    meta = record.find('oai:metadata/arxiv:arXiv', NAMESPACES)
+    if meta is not None:
+        authors = []
+        for author in meta.findall('arxiv:authors/arxiv:author', NAMESPACES):
+            name = [author.findtext('arxiv:forenames', '', NAMESPACES), author.findtext('arxiv:keyname', '', NAMESPACES)]
+            authors.append(' '.join(part for part in name if part))
+        row.update(arxiv_id=meta.findtext('arxiv:id', row['arxiv_id'], NAMESPACES),
+                   created=meta.findtext('arxiv:created', '', NAMESPACES),
+                   title=clean_text(meta.findtext('arxiv:title', '', NAMESPACES)),
+                   authors=', '.join(authors),
+                   abstract=clean_text(meta.findtext('arxiv:abstract', '', NAMESPACES)),
+                   categories=meta.findtext('arxiv:categories', '', NAMESPACES))
+    return row
+
+
+@telemetry.timed('arxiv.oai_page', records=lambda result: len(result[0]))
+def fetch_page(params):
+    """请求一页 ListRecords，返回 (记录列表, 下一页的 resumptionToken)；503 时按 Retry-After 等待后重试。"""
+    url = OAI_URL + '?' + urllib.parse.urlencode(params)
+    for attempt in range(RETRIES):
+        try:
+            with urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+                data = response.read()
+            break
+        except urllib.error.HTTPError as e:
+            if e.code not in (429, 500, 502, 503, 504) or attempt == RETRIES - 1:
+                raise
+            retry_after = e.headers.get('Retry-After', '')
+            telemetry.count('retries', source='arxiv_oai', error=f"HTTP {e.code}")
+            time.sleep(int(retry_after) if retry_after.isdigit() else 2 ** attempt * 5)
+        except urllib.error.URLError as e:
+            if attempt == RETRIES - 1:
+                raise
+            telemetry.count('retries', source='arxiv_oai', error=str(e.reason))
+            time.sleep(2 ** attempt * 5)
+    telemetry.count('bytes_fetched', len(data))
+    root = ET.fromstring(data)
+    error = root.find('oai:error', NAMESPACES)
+    if error is not None:
+        if error.get('code') == 'noRecordsMatch':
+            return [], ''
+        raise ValueError(f"OAI-PMH 错误 {error.get('code')}: {error.text}")
+    records = [parse_record(record) for record in root.iterfind('oai:ListRecords/oai:record', NAMESPACES)]
+    token = root.findtext('oai:ListRecords/oai:resumptionToken', '', NAMESPACES).strip()
+    return records, token
+
+
+def harvest_oai(store):
+    """
+    增量获取：从上次中断的 resumptionToken 继续；否则从本地最新的 datestamp 开始
+    （首次运行获取整个 cs 集合）。返回本次获取的记录数。
+    """
+    token = store.get('resumption_token')
+    since = store.get('harvest_from') or ''
+    if not token:
+        since = store.last_datestamp() or ''
+    print(f"OAI-PMH: {OAI_URL} set={OAI_SET} " + (f"从 {since} 开始" if since else "全量获取")
+          + ("（继续上次中断的请求）" if token else ""))
+
+    fetched = 0
+    while True:
+        if token:
+            params = {'verb': 'ListRecords', 'resumptionToken': token}
+        else:
+            params = {'verb': 'ListRecords', 'metadataPrefix': METADATA_PREFIX, 'set': OAI_SET}
+            if since:
+                params['from'] = since
+        try:
+            records, token = fetch_page(params)
+        except ValueError as e:
+            if token and 'badResumptionToken' in str(e):
+                # resumptionToken 已过期：从同一个 from 日期重新开始
+                print(" -> resumptionToken 已过期，重新开始本次增量获取。")
+                token = ''
+                continue
+            raise
+        store.add_page(records, token, since)
+        fetched += len(records)
+        telemetry.gauge('records_fetched', fetched)
+        print(f" -> 已获取 {fetched} 条记录")
+        if not token:
+            return fetched
+
+
+def evaluate_queries(df, terms):
+    """
+    在本地执行 arxiv-python.py 的子查询（每个 part2 术语一次 build_sub_query()），
+    按 arXiv ID 去重后返回匹配的记录（顺序与 API 版本相同：按术语顺序）。
+    """
+    design = load_arxiv_design(ARXIV_SCRIPT)
+    index = SearchIndex.build(df.rename(columns={'arxiv_id': 'record_key'}), ':memory:')
+    matched = []
+    seen = set()
+    for term in terms:
+        hits, elapsed_ms = index.search(design.build_sub_query(term))
+        new = [row for row in sorted(hits) if row not in seen]
+        seen.update(new)
+        matched.extend(new)
+        print(f" -> '{term}': {len(hits)} 篇（新增 {len(new)} 篇，{elapsed_ms:.1f} ms）")
+    return df.iloc[matched]
+
+
+def harvest_arxiv_oai(output_file=OUTPUT_FILE, store_file=STORE_FILE, start_date=START_DATE, end_date=END_DATE,
+                      terms=None, offline=False):
+    """
+    更新本地元数据库（offline=True 时跳过），在本地执行 part1 AND part2 查询和日期过滤，
+    写出与 arxiv-python.py 相同的列并返回 DataFrame。日期为 'YYYY-MM-DD' 字符串。
+    """
+    store = ArxivStore(store_file)
+    try:
+        if not offline:
+            with telemetry.stage('arxiv.oai_harvest') as stage_info:
+                stage_info['records'] = harvest_oai(store)
+        df = store.window(start_date, end_date)
+    finally:
+        store.close()
+    print(f"\n本地元数据库中 {start_date} 至 {end_date} 的记录: {len(df)} 篇")
+
+    terms = terms or load_arxiv_design(ARXIV_SCRIPT).PART2_TERMS
+    with telemetry.stage('arxiv.local_query', records=len(df)):
+        matched = evaluate_queries(df, terms)
+    print(f"\n所有子查询执行完毕！总共匹配到 {len(matched)} 篇独一无二的论文。")
+
+    # 与 arxiv-python.py 相同的列；OAI 的 arXiv ID 不带版本号，第一个分类为主分类
+    result = pd.DataFrame({
+        'Title': matched['title'], 'Authors': matched['authors'], 'Abstract': matched['abstract'],
+        'Published Date': matched['created'], 'arXiv ID': matched['arxiv_id'],
+        'PDF Link': 'http://arxiv.org/pdf/' + matched['arxiv_id'],
+        'Primary Category': matched['categories'].str.split().str[0].fillna('N/A'),
+    }).sort_values(by='Published Date', ascending=False)
+    if len(result):
+        write_excel(result, output_file)
+        print(f"任务成功！最终数据已保存至 {output_file}")
+    telemetry.print_summary()
+    return result
+
+
+if __name__ == '__main__':
+    harvest_arxiv_oai()
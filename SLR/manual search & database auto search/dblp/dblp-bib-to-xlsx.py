@@ -1,10 +1,18 @@
 import os
+import sys
 import bibtexparser
 import pandas as pd
 from bibtexparser.bparser import BibTexParser
 from bibtexparser.customization import homogenize_latex_encoding
 
-def parse_bib_files_to_excel(directory_path, output_filename="bib_summary.xlsx"):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit.excel_io import write_excel
+
+# .bib 文件所在的目录和输出的 Excel 文件
+BIB_DIRECTORY = "."
+OUTPUT_FILE = "my_literature_summary.xlsx"
+
+def parse_bib_files_to_excel(directory_path=BIB_DIRECTORY, output_filename=OUTPUT_FILE):
 
     all_entries_data = []
     
@@ -68,19 +76,14 @@ def parse_bib_files_to_excel(directory_path, output_filename="bib_summary.xlsx")
     print(f"\ndone！all {len(all_entries_data)} refernces")
     
     # 创建 DataFrame 并保存到 Excel
+    df = pd.DataFrame(all_entries_data)
     try:
-        df = pd.DataFrame(all_entries_data)
-        df.to_excel(output_filename, index=False, engine='openpyxl')
+        write_excel(df, output_filename)
         print(f"saved to: {output_filename}")
     except Exception as e:
         print(f"write Excel error: {e}")
+    return df
 
 
 if __name__ == '__main__':
-
-    bib_files_directory = "."
-
-    # 
-    output_excel_file = "my_literature_summary.xlsx"
-
-    parse_bib_files_to_excel(bib_files_directory, output_excel_file)
+    parse_bib_files_to_excel()
@@ -0,0 +1,110 @@
+import os
+import re
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import write_excel
+from slrkit.harvest import HarvestCursor, Source, harvest
+
+# dblp 搜索 API：每页最多 1000 条，每个查询最多只能翻到前 10000 条
+DBLP_API_URL = 'https://dblp.org/search/publ/api'
+PAGE_SIZE = 1000
+MAX_HITS = 10000
+# 对 dblp.org 的并发请求数和两次请求之间的间隔（秒），请求过快时 dblp 返回 429
+CONCURRENCY = 2
+REQUEST_INTERVAL = 1.0
+
+# 与手动导出的 .bib 文件相同的查询（文件名 q[...year:YYYY:]），每个年份单独查询
+QUERIES = {
+    'LLM | language model | generative AI | code generation | testing': (2019, 2025),
+    'agent | multi-agent | architecture | software engineering': (2017, 2025),
+}
+OUTPUT_FILE = "dblp_api_results.xlsx"
+# 断点续传：dblp_harvest.json 记录每个查询已完成的分页，dblp_harvest.jsonl 保存已获取的记录
+CURSOR_FILE = "dblp_harvest"
+
+# dblp 的出版物类型 -> .bib 导出中的条目类型
+ENTRY_TYPES = {
+    'Journal Articles': 'article',
+    'Conference and Workshop Papers': 'inproceedings',
+    'Informal and Other Publications': 'article',
+    'Parts in Books or Collections': 'incollection',
+    'Books and Theses': 'book',
+    'Editorship': 'proceedings',
+    'Reference Works': 'incollection',
+    'Data and Artifacts': 'misc',
+}
+
+
+def build_queries(queries=QUERIES):
+    """每个查询按年份拆分，与 .bib 导出时的 year:YYYY: 过滤相同。"""
+    return [f"{query} year:{year}:" for query, (first, last) in queries.items() for year in range(first, last + 1)]
+
+
+def dblp_params(query, offset, page_size):
+    return {'q': query, 'format': 'json', 'h': page_size, 'f': offset, 'c': 0}
+
+
+def parse_dblp_page(payload):
+    """dblp 的 JSON 回复 -> (命中总数, 每条命中的 info)。"""
+    hits = payload['result']['hits']
+    return int(hits.get('@total', 0)), [hit['info'] for hit in hits.get('hit', [])]
+
+
+def _as_list(value):
+    # 只有一个作者（或一个会议）时 dblp 返回的不是列表
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def info_to_row(info, query):
+    """一条 dblp 命中 -> 与 dblp-bib-to-xlsx.py 相同的列。"""
+    authors = [author['text'] if isinstance(author, dict) else author
+               for author in _as_list((info.get('authors') or {}).get('author'))]
+    # 同名作者的编号（"Wei Li 0001"）不出现在 .bib 中
+    authors = [re.sub(r'\s+\d{4}$', '', author) for author in authors]
+    title = info.get('title', 'N/A')
+    pages = info.get('pages', 'N/A')
+    return {
+        'Citation Key': f"DBLP:{info['key']}" if info.get('key') else 'N/A',
+        'Type': ENTRY_TYPES.get(info.get('type'), 'misc'),
+        'Title': title[:-1] if title.endswith('.') else title,
+        'Authors': ', '.join(authors) if authors else 'N/A',
+        'Year': info.get('year', 'N/A'),
+        'Journal/Conference': ', '.join(_as_list(info.get('venue'))) or 'N/A',
+        'Volume': info.get('volume', 'N/A'),
+        'Pages': re.sub(r'(?<=\d)-(?=\d)', '--', pages),
+        'DOI': info.get('doi', 'N/A'),
+        'Abstract': 'N/A',
+        'Source File': f"dblp API: {query}",
+    }
+
+
+def harvest_dblp(output_file=OUTPUT_FILE, queries=QUERIES, cursor_file=CURSOR_FILE, restart=False):
+    """按查询和年份并发分页请求 dblp 搜索 API（从 cursor_file 断点续传），写出与 dblp-bib-to-xlsx.py 相同的列并返回 DataFrame。"""
+    source = Source('dblp', DBLP_API_URL, dblp_params, parse_dblp_page, page_size=PAGE_SIZE,
+                    max_hits=MAX_HITS, concurrency=CONCURRENCY, interval=REQUEST_INTERVAL)
+    cursor = HarvestCursor(cursor_file)
+    if restart:
+        cursor.reset()
+
+    year_queries = build_queries(queries)
+    print(f"start: {len(year_queries)} queries against {DBLP_API_URL}")
+    results = harvest(source, year_queries, cursor)
+    if not results:
+        print("no records")
+        return
+
+    df = pd.DataFrame([info_to_row(info, query) for query, info in results])
+    print(f"\ndone！all {len(df)} references")
+    write_excel(df, output_file)
+    print(f"saved to: {output_file}")
+    telemetry.print_summary()
+    return df
+
+
+if __name__ == '__main__':
+    harvest_dblp()
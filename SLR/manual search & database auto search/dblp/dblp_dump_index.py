@@ -0,0 +1,242 @@
+#
+# 读取 dblp 的 XML 数据（https://dblp.org/xml/dblp.xml.gz 和 dblp.dtd），建立本地索引，
+# 然后在本地执行与 dblp_api_harvest.py 相同的查询（QUERIES，标题关键词 + 年份范围），
+# 不再需要逐个年份在网页上查询并导出 .bib 文件。
+#
+# dblp.xml 有数 GB：这里用 iterparse 流式读取，每条记录处理完后立即清除，内存占用与文件大小无关；
+# dblp.xml 中的字符实体（&uuml; 等）在 dblp.dtd 中定义，读取前先从 DTD 中载入。
+# 只有查询年份范围内的记录进入索引（SQLite + 标题的 FTS5 索引），之后的查询只需几毫秒；
+# 数据文件或年份范围改变时重新建立索引。
+#
+import gzip
+import html.entities
+import os
+import re
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+DBLP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DBLP_DIR, '..', '..'))
+sys.path.insert(0, os.path.join(DBLP_DIR, '..', '..', 'Screen'))
+sys.path.insert(0, DBLP_DIR)
+from slrkit import telemetry
+from slrkit.excel_io import write_excel
+from search_index import TOKENIZER, to_fts5
+from dblp_api_harvest import QUERIES
+
+# dblp 的 XML 数据（.xml 或 .xml.gz）和定义字符实体的 DTD（默认与数据文件在同一目录）
+DUMP_FILE = 'dblp.xml.gz'
+DTD_FILE = None
+# 本地索引和输出文件
+INDEX_FILE = 'dblp_dump_index.sqlite'
+OUTPUT_FILE = 'dblp_dump_results.xlsx'
+# 建立索引时每多少条记录写入一次数据库
+BATCH_SIZE = 10000
+
+# dblp.xml 中的出版物元素（与 .bib 导出中的条目类型相同）；www（作者主页）等不进入索引
+RECORD_TAGS = {'article', 'inproceedings', 'proceedings', 'book', 'incollection', 'phdthesis', 'mastersthesis'}
+COLUMNS = ['key', 'type', 'title', 'authors', 'year', 'venue', 'volume', 'pages', 'doi']
+ENTITY_PATTERN = re.compile(r'<!ENTITY\s+(\w+)\s+"([^"]*)"')
+
+
+def load_entities(dtd_file):
+    """dblp.dtd 中的字符实体 -> 字符；没有 DTD 时使用 HTML 的同名实体（dblp 的实体都是 ISO 8859-1 / HTML 中的名称）。"""
+    entities = {name: chr(codepoint) for name, codepoint in html.entities.name2codepoint.items()}
+    if dtd_file and os.path.exists(dtd_file):
+        with open(dtd_file, encoding='latin-1') as f:
+            for name, value in ENTITY_PATTERN.findall(f.read()):
+                entities[name] = re.sub(r'&#(x?)([0-9a-fA-F]+);',
+                                        lambda m: chr(int(m.group(2), 16 if m.group(1) else 10)), value)
+    else:
+        print(f"warning: DTD '{dtd_file}' not found, using the HTML character entities")
+    return entities
+
+
+def _text(element):
+    # 标题中可能有 <i>、<sub> 等标记
+    return ' '.join(''.join(element.itertext()).split()) if element is not None else ''
+
+
+def parse_publication(element):
+    """一个出版物元素 -> 一行元数据。"""
+    title = _text(element.find('title'))
+    names = element.findall('author') or element.findall('editor')
+    # 同名作者的编号（"Wei Li 0001"）不出现在 .bib 中
+    authors = [re.sub(r'\s+\d{4}$', '', _text(name)) for name in names]
+    dois = [_text(ee) for ee in element.findall('ee') if _text(ee).startswith('https://doi.org/')]
+    return {
+        'key': element.get('key', ''),
+        'type': element.tag,
+        'title': title[:-1] if title.endswith('.') else title,
+        'authors': ', '.join(authors),
+        'year': int(_text(element.find('year')) or 0),
+        'venue': _text(element.find('journal')) or _text(element.find('booktitle')),
+        'volume': _text(element.find('volume')),
+        'pages': re.sub(r'(?<=\d)-(?=\d)', '--', _text(element.find('pages'))),
+        'doi': dois[0][len('https://doi.org/'):] if dois else '',
+    }
+
+
+def iter_dump(dump_file, dtd_file=None, first_year=None, last_year=None):
+    """
+    流式读取 dblp.xml(.gz)，逐条返回年份在 [first_year, last_year] 之间的出版物。
+    每条记录处理完后从树中清除，内存占用不随文件大小增长。
+    """
+    parser = ET.XMLParser()
+    parser.entity.update(load_entities(dtd_file or os.path.join(os.path.dirname(dump_file), 'dblp.dtd')))
+    opener = gzip.open if dump_file.endswith('.gz') else open
+    with opener(dump_file, 'rb') as f:
+        root = None
+        depth = 0
+        for event, element in ET.iterparse(f, events=('start', 'end'), parser=parser):
+            if event == 'start':
+                root = element if root is None else root
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            # 一条记录（<dblp> 的直接子元素）读完
+            if element.tag in RECORD_TAGS:
+                year = int(element.findtext('year') or 0)
+                if (first_year is None or year >= first_year) and (last_year is None or year <= last_year):
+                    yield parse_publication(element)
+            root.clear()
+
+
+def query_years(queries=QUERIES):
+    """所有查询的年份范围的并集 (first, last)。"""
+    return min(first for first, _ in queries.values()), max(last for _, last in queries.values())
+
+
+def dblp_to_fts5(query):
+    """dblp 的查询 'LLM | language model' -> FTS5：'|' 分隔的任一项的所有单词都（作为前缀）出现在标题中。"""
+    alternatives = [' '.join(word + '*' for word in part.split()) for part in query.split('|') if part.strip()]
+    return to_fts5(' OR '.join(f"({alternative})" for alternative in alternatives))
+
+
+class DblpDumpIndex:
+    """年份范围内的 dblp 出版物（records 表）和标题的 FTS5 索引（只保存索引，不重复保存标题）。"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT, type TEXT, title TEXT, authors TEXT, year INTEGER,
+                venue TEXT, volume TEXT, pages TEXT, doi TEXT);
+            CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(
+                title, content='records', content_rowid='rowid', tokenize='{TOKENIZER}');
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);""")
+
+    def meta(self):
+        return dict(self.connection.execute("SELECT key, value FROM meta"))
+
+    def is_current(self, source, first_year, last_year):
+        """索引是否由同一个数据文件建立，且包含 [first_year, last_year]。"""
+        meta = self.meta()
+        return (meta.get('source') == source and meta.get('tokenizer') == TOKENIZER
+                and int(meta.get('first_year', 10 ** 4)) <= first_year
+                and int(meta.get('last_year', 0)) >= last_year)
+
+    def build(self, dump_file, dtd_file, source, first_year, last_year):
+        """重新建立索引。返回索引中的记录数。"""
+        c = self.connection
+        c.executescript("DELETE FROM records; INSERT INTO titles(titles) VALUES ('delete-all'); DELETE FROM meta;")
+        count = 0
+        batch = []
+        started = time.perf_counter()
+
+        def flush():
+            c.executemany(f"INSERT INTO records ({', '.join(COLUMNS)}) "
+                          f"VALUES ({', '.join(':' + column for column in COLUMNS)})", batch)
+            batch.clear()
+
+        for row in iter_dump(dump_file, dtd_file, first_year, last_year):
+            batch.append(row)
+            count += 1
+            if len(batch) >= BATCH_SIZE:
+                flush()
+                telemetry.gauge('records_indexed', count)
+                print(f" -> {count} 条记录（{time.perf_counter() - started:.0f} 秒）")
+        flush()
+        c.execute("INSERT INTO titles(titles) VALUES ('rebuild')")
+        c.executemany("INSERT INTO meta VALUES (?, ?)",
+                      [('source', source), ('tokenizer', TOKENIZER), ('first_year', str(first_year)),
+                       ('last_year', str(last_year)), ('records', str(count))])
+        c.commit()
+        return count
+
+    def search(self, query, first_year, last_year):
+        """标题符合 dblp 查询、年份在 [first_year, last_year] 之间的记录，DataFrame（COLUMNS）。"""
+        return pd.read_sql_query(
+            f"SELECT {', '.join('r.' + column for column in COLUMNS)} FROM titles JOIN records r ON r.rowid = titles.rowid "
+            "WHERE titles MATCH ? AND r.year BETWEEN ? AND ? ORDER BY r.year, r.key",
+            self.connection, params=(dblp_to_fts5(query), first_year, last_year))
+
+    def close(self):
+        self.connection.close()
+
+
+def open_index(dump_file=DUMP_FILE, index_file=INDEX_FILE, dtd_file=DTD_FILE, queries=QUERIES):
+    """打开本地索引；数据文件改变或索引不包含查询的年份范围时重新建立。"""
+    first_year, last_year = query_years(queries)
+    index = DblpDumpIndex(index_file)
+    if os.path.exists(dump_file):
+        source = f"{os.path.abspath(dump_file)}|{os.path.getsize(dump_file)}|{os.path.getmtime(dump_file)}"
+        if not index.is_current(source, first_year, last_year):
+            print(f"建立索引 '{index_file}'：{dump_file}（{first_year}–{last_year}）...")
+            with telemetry.stage('dblp.dump_index') as stage_info:
+                stage_info['records'] = index.build(dump_file, dtd_file, source, first_year, last_year)
+    elif not index.meta():
+        index.close()
+        raise FileNotFoundError(f"dblp 数据文件 '{dump_file}' 不存在（下载：https://dblp.org/xml/）")
+    return index
+
+
+def query_dblp_dump(output_file=OUTPUT_FILE, dump_file=DUMP_FILE, index_file=INDEX_FILE, dtd_file=DTD_FILE,
+                    queries=QUERIES):
+    """按查询和年份在本地索引中查询，写出与 dblp-bib-to-xlsx.py 相同的列并返回 DataFrame。"""
+    index = open_index(dump_file, index_file, dtd_file, queries)
+    rows = []
+    try:
+        with telemetry.stage('dblp.dump_query') as stage_info:
+            for query, (first, last) in queries.items():
+                start = time.perf_counter()
+                hits = index.search(query, first, last)
+                print(f" -> '{query}' {first}–{last}: {len(hits)} 篇（{(time.perf_counter() - start) * 1000:.1f} ms）")
+                for hit in hits.itertuples(index=False):
+                    rows.append({
+                        'Citation Key': f"DBLP:{hit.key}",
+                        'Type': hit.type,
+                        'Title': hit.title or 'N/A',
+                        'Authors': hit.authors or 'N/A',
+                        'Year': str(hit.year),
+                        'Journal/Conference': hit.venue or 'N/A',
+                        'Volume': hit.volume or 'N/A',
+                        'Pages': hit.pages or 'N/A',
+                        'DOI': hit.doi or 'N/A',
+                        'Abstract': 'N/A',
+                        # 与 .bib 导出的文件名和 dblp_api_harvest.py 一样，每个年份单独记录来源
+                        'Source File': f"dblp dump: {query} year:{hit.year}:",
+                    })
+            stage_info['records'] = len(rows)
+    finally:
+        index.close()
+    if not rows:
+        print("no records")
+        return
+
+    df = pd.DataFrame(rows)
+    print(f"\ndone！all {len(df)} references")
+    write_excel(df, output_file)
+    print(f"saved to: {output_file}")
+    telemetry.print_summary()
+    return df
+
+
+if __name__ == '__main__':
+    query_dblp_dump()
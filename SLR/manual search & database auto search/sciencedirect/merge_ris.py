@@ -6,9 +6,13 @@
 
 import os
 import glob
+import sys
 import pandas as pd
 import rispy
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit.excel_io import write_excel
+
 # --- Configuration ---
 # The path to the directory containing your RIS files.
 # Use '.' if the script is in the same folder as the RIS files.
@@ -16,58 +20,92 @@ ris_directory = '.'
 
 # The name of the final merged Excel file.
 output_file = 'sciencedirect_merged_results.xlsx'
+
+# Number of worker processes for parsing (1 = parse in this process).
+# Workers hand their entries back as shared Arrow files (slrkit/shared_corpus.py) instead of pickles.
+workers = 1
 # -------------------
 
-try:
-    # Find all files ending with .ris in the specified directory
-    all_files = glob.glob(os.path.join(ris_directory, "*.ris"))
+
+def read_ris_file(f):
+    """Parses one RIS file with rispy, falling back to latin-1 if it is not valid UTF-8."""
+    try:
+        # Open and parse the RIS file using rispy
+        # We try utf-8 encoding first, which is common.
+        with open(f, 'r', encoding='utf-8') as ris_file:
+            entries = rispy.load(ris_file)
+            print(f"  - Reading {f}... Found {len(entries)} entries.")
+    except UnicodeDecodeError:
+        # If utf-8 fails, try a more lenient encoding like latin-1
+        print(f"  - Warning: UTF-8 decoding failed for {f}. Trying with 'latin-1' encoding.")
+        with open(f, 'r', encoding='latin-1') as ris_file:
+            entries = rispy.load(ris_file)
+            print(f"  - Successfully read {f} with 'latin-1'. Found {len(entries)} entries.")
+    return entries
+
+
+def read_ris_frame(f):
+    """read_ris_file() as a DataFrame (the unit of work of the parallel path)."""
+    try:
+        return pd.DataFrame(read_ris_file(f))
+    except Exception as e:
+        print(f"  - Could not process file {f}. Error: {e}")
+        return None
+
+
+def merge_ris_files(ris_directory=ris_directory, output_file=output_file, workers=workers):
+    """
+    Merges every RIS file in `ris_directory` into `output_file`; returns the
+    merged DataFrame (None if no file was found).
+    """
+    try:
+        # Find all files ending with .ris in the specified directory
+        all_files = glob.glob(os.path.join(ris_directory, "*.ris"))
     
-    if not all_files:
-        print(f"No .ris files found in the directory: {os.path.abspath(ris_directory)}")
-        print("Please make sure your .ris files and the script are in the correct folder.")
-    else:
-        print(f"Found {len(all_files)} RIS files to merge.")
-        
-        # A list to hold all publication entries from all files
-        all_entries = []
-        
-        for f in all_files:
-            try:
-                # Open and parse the RIS file using rispy
-                # We try utf-8 encoding first, which is common.
-                with open(f, 'r', encoding='utf-8') as ris_file:
-                    entries = rispy.load(ris_file)
-                    all_entries.extend(entries)
-                    print(f"  - Reading {f}... Found {len(entries)} entries.")
-            except UnicodeDecodeError:
-                # If utf-8 fails, try a more lenient encoding like latin-1
-                print(f"  - Warning: UTF-8 decoding failed for {f}. Trying with 'latin-1' encoding.")
-                with open(f, 'r', encoding='latin-1') as ris_file:
-                    entries = rispy.load(ris_file)
-                    all_entries.extend(entries)
-                    print(f"  - Successfully read {f} with 'latin-1'. Found {len(entries)} entries.")
-            except Exception as e:
-                print(f"  - Could not process file {f}. Error: {e}")
-
-        if not all_entries:
-            print("\nNo entries were successfully read from the files. Exiting.")
+        if not all_files:
+            print(f"No .ris files found in the directory: {os.path.abspath(ris_directory)}")
+            print("Please make sure your .ris files and the script are in the correct folder.")
         else:
-            # Convert the list of dictionaries to a pandas DataFrame
-            # The keys from the dictionaries will automatically become column headers
-            print("\nCreating DataFrame from all entries...")
-            df = pd.DataFrame(all_entries)
-            
-            # Save the DataFrame to an Excel file
-            print(f"Saving to Excel file: {output_file}...")
-            df.to_excel(output_file, index=False)
+            print(f"Found {len(all_files)} RIS files to merge.")
+        
+            if workers > 1:
+                from slrkit.shared_corpus import parallel_map
+                print("\nParsing files in parallel and merging them...")
+                df = parallel_map(read_ris_frame, all_files, workers)
+            else:
+                # A list to hold all publication entries from all files
+                all_entries = []
+
+                for f in all_files:
+                    try:
+                        all_entries.extend(read_ris_file(f))
+                    except Exception as e:
+                        print(f"  - Could not process file {f}. Error: {e}")
+
+                # Convert the list of dictionaries to a pandas DataFrame
+                # The keys from the dictionaries will automatically become column headers
+                print("\nCreating DataFrame from all entries...")
+                df = pd.DataFrame(all_entries)
+
+            if df.empty:
+                print("\nNo entries were successfully read from the files. Exiting.")
+            else:
+                # Save the DataFrame to an Excel file
+                print(f"Saving to Excel file: {output_file}...")
+                write_excel(df, output_file)
             
-            print(f"\nMerge complete!")
-            print(f"All data has been saved to: {output_file}")
-            print(f"Total records processed: {len(df)}")
-
-except ImportError:
-    print("Error: Required libraries are not installed.")
-    print("Please install them by running:")
-    print("pip install pandas openpyxl rispy")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+                print(f"\nMerge complete!")
+                print(f"All data has been saved to: {output_file}")
+                print(f"Total records processed: {len(df)}")
+            return df
+
+    except ImportError:
+        print("Error: Required libraries are not installed.")
+        print("Please install them by running:")
+        print("pip install pandas openpyxl rispy")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+
+if __name__ == "__main__":
+    merge_ris_files()
@@ -1,15 +1,25 @@
+import os
 import requests
+import sys
 from bs4 import BeautifulSoup
 import pandas as pd
 import time
 
-# 读取Excel文件
-df = pd.read_excel("sciencedirect_merged_results.xlsx")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
 
+# 输入、输出文件，以及两次请求之间的等待时间（秒，避免被封锁）
+INPUT_FILE = "sciencedirect_merged_results.xlsx"
+OUTPUT_FILE = "sciencedirect_with_page_count.xlsx"
+REQUEST_DELAY = 1
+
+@telemetry.timed('sciencedirect.fetch_doi_page', failed=lambda result: result is None)
 def fetch_page_count_from_doi(doi_url):
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
         resp = requests.get(doi_url, headers=headers, timeout=10)
+        telemetry.count('bytes_fetched', len(resp.content))
         if resp.status_code != 200:
             return None
         soup = BeautifulSoup(resp.text, "html.parser")
@@ -26,16 +36,30 @@ def fetch_page_count_from_doi(doi_url):
     except Exception as e:
         return None
 
-# 仅抓取没有 page_count 的行
-for idx, row in df[df["page_count"].isna()].iterrows():
-    doi_url = row["doi"]
-    if pd.isna(doi_url) or not isinstance(doi_url, str) or "doi.org" not in doi_url:
-        continue
-    print(f"Fetching for: {doi_url}")
-    page_count = fetch_page_count_from_doi(doi_url)
-    if page_count:
-        df.at[idx, "page_count"] = page_count
-    time.sleep(1)  # 避免被封锁
-
-# 保存结果
-df.to_excel("sciencedirect_with_page_count.xlsx", index=False)
\ No newline at end of file
+def fetch_page_counts(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
+    """为 input_file 中还没有 page_count 的记录抓取页数，结果保存到 output_file 并返回 DataFrame。"""
+    # 读取Excel文件
+    df = read_excel(input_file)
+
+    # 仅抓取没有 page_count 的行
+    pending = df[df["page_count"].isna()]
+    with telemetry.stage('sciencedirect.doi_page_count', records=len(pending)):
+        for position, (idx, row) in enumerate(pending.iterrows()):
+            doi_url = row["doi"]
+            if pd.isna(doi_url) or not isinstance(doi_url, str) or "doi.org" not in doi_url:
+                continue
+            print(f"Fetching for: {doi_url}")
+            telemetry.gauge('queue_depth', len(pending) - position)
+            page_count = fetch_page_count_from_doi(doi_url)
+            if page_count:
+                df.at[idx, "page_count"] = page_count
+            time.sleep(REQUEST_DELAY)
+
+    # 保存结果
+    write_excel(df, output_file)
+    telemetry.print_summary()
+    return df
+
+
+if __name__ == "__main__":
+    fetch_page_counts()
@@ -1,30 +1,34 @@
-import pandas as pd
+import os
 import time
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import sys
 from bs4 import BeautifulSoup
-from selenium.webdriver.chrome.service import Service
 
-# 初始化浏览器（无头模式）
-options = Options()
-options.add_argument('--headless')
-options.add_argument('--disable-gpu')
-options.add_argument('--no-sandbox')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
+
+# 输入、输出文件，以及两次页面请求之间的等待时间（秒）
+INPUT_FILE = "sciencedirect_merged_results.xlsx"
+OUTPUT_FILE = "sciencedirect_with_page_count.xlsx"
+REQUEST_DELAY = 1.5
 
-# 正确初始化浏览器的写法
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
+# 初始化浏览器（无头模式）
+# selenium 只在这里导入：启动浏览器（并下载 ChromeDriver）只在真正抓取时发生，而不是在导入本模块时
+def start_browser():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
 
-# 读取 Excel 文件
-df = pd.read_excel("sciencedirect_merged_results.xlsx")
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
 
-# 初始化新列
-if "page_count" not in df.columns:
-    df["page_count"] = None
-if "page_fetch_status" not in df.columns:
-    df["page_fetch_status"] = None
+    # 正确初始化浏览器的写法
+    service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=options)
 
 # 提取干净的 URL 函数
 def extract_clean_url(raw_url):
@@ -34,11 +38,14 @@ def extract_clean_url(raw_url):
     return match.group(0) if match else None
 
 # 抓取页码数
-def fetch_page_count(url):
+@telemetry.timed('sciencedirect.fetch_page', failed=lambda result: result[1].startswith('error'))
+def fetch_page_count(driver, url):
     try:
         driver.get(url)
         time.sleep(1.5)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        page_source = driver.page_source
+        telemetry.count('bytes_fetched', len(page_source.encode('utf-8')))
+        soup = BeautifulSoup(page_source, "html.parser")
 
         # 查找包含页码的标签
         page_span = soup.find("span", string=re.compile(r"Pages", re.IGNORECASE))
@@ -56,26 +63,46 @@ def fetch_page_count(url):
     except Exception as e:
         return None, f"error: {str(e)}"
 
-# 主循环
-for idx, row in df.iterrows():
-    raw_url = row.get("urls", None)
-    url = extract_clean_url(raw_url)
-
-    if not url:
-        df.at[idx, "page_fetch_status"] = "no valid url"
-        continue
-
-    print(f"🔍 [{idx}] Fetching: {url}")
-    count, status = fetch_page_count(url)
-    df.at[idx, "page_count"] = count
-    df.at[idx, "page_fetch_status"] = status
-    print(f"→ page count: {count}, status: {status}")
-    time.sleep(1.5)
-
-# 保存结果
-output_path = "sciencedirect_with_page_count.xlsx"
-df.to_excel(output_path, index=False)
-print(f"✅ 完成！结果保存为 {output_path}")
-
-# 关闭浏览器
-driver.quit()
\ No newline at end of file
+def fetch_page_counts(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
+    """用无头 Chrome 抓取 input_file 中每篇文章的页数，结果保存到 output_file 并返回 DataFrame。"""
+    # 读取 Excel 文件
+    df = read_excel(input_file)
+
+    # 初始化新列
+    if "page_count" not in df.columns:
+        df["page_count"] = None
+    if "page_fetch_status" not in df.columns:
+        df["page_fetch_status"] = None
+
+    driver = start_browser()
+    try:
+        # 主循环
+        with telemetry.stage('sciencedirect.page_count', records=len(df)):
+            for idx, row in df.iterrows():
+                raw_url = row.get("urls", None)
+                url = extract_clean_url(raw_url)
+
+                if not url:
+                    df.at[idx, "page_fetch_status"] = "no valid url"
+                    continue
+
+                print(f"🔍 [{idx}] Fetching: {url}")
+                telemetry.gauge('queue_depth', len(df) - idx)
+                count, status = fetch_page_count(driver, url)
+                df.at[idx, "page_count"] = count
+                df.at[idx, "page_fetch_status"] = status
+                print(f"→ page count: {count}, status: {status}")
+                time.sleep(REQUEST_DELAY)
+    finally:
+        # 关闭浏览器
+        driver.quit()
+
+    # 保存结果
+    write_excel(df, output_file)
+    print(f"✅ 完成！结果保存为 {output_file}")
+    telemetry.print_summary()
+    return df
+
+
+if __name__ == "__main__":
+    fetch_page_counts()
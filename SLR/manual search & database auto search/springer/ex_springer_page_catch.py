@@ -1,22 +1,26 @@
 import pandas as pd
+import os
 import requests
+import sys
 from bs4 import BeautifulSoup
 import time
 
-# 读取 Excel 文件
-df = pd.read_excel("springerlink-merged_results.xlsx")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import read_excel, write_excel
 
-# 添加空列：page_count 和 status
-if "page_count" not in df.columns:
-    df["page_count"] = None
-if "page_fetch_status" not in df.columns:
-    df["page_fetch_status"] = None
+# 输入、输出文件，以及两次请求之间的等待时间（秒，限速，避免被封）
+INPUT_FILE = "springerlink-merged_results.xlsx"
+OUTPUT_FILE = "springerlink_with_page_count.xlsx"
+REQUEST_DELAY = 1
 
 # 抓取页码的函数
+@telemetry.timed('springer.fetch_pages', failed=lambda result: result[1].startswith(('HTTP', 'error')))
 def fetch_springer_pages(doi_url):
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
         resp = requests.get(doi_url, headers=headers, timeout=10)
+        telemetry.count('bytes_fetched', len(resp.content))
         if resp.status_code != 200:
             return None, f"HTTP {resp.status_code}"
 
@@ -38,23 +42,42 @@ def fetch_springer_pages(doi_url):
     except Exception as e:
         return None, f"error: {str(e)}"
 
-# 逐条抓取
-for idx, row in df.iterrows():
-    doi = row["Item DOI"]
-    if pd.isna(doi) or not isinstance(doi, str):
-        df.at[idx, "page_fetch_status"] = "no doi"
-        continue
-
-    doi_url = doi if doi.startswith("http") else f"https://doi.org/{doi}"
-    print(f"Fetching for: {doi_url}")
-
-    count, status = fetch_springer_pages(doi_url)
-    df.at[idx, "page_count"] = count
-    df.at[idx, "page_fetch_status"] = status
-    print(f"→ page count: {count}, status: {status}")
-    
-    time.sleep(1)  # 限速，避免被封
-
-# 保存结果
-df.to_excel("springerlink_with_page_count.xlsx", index=False)
-print("✅ 抓取完成，结果已保存为 springerlink_with_page_count.xlsx")
\ No newline at end of file
+def fetch_page_counts(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
+    """逐条抓取 input_file 中每个 DOI 的页数，结果保存到 output_file 并返回 DataFrame。"""
+    # 读取 Excel 文件
+    df = read_excel(input_file)
+
+    # 添加空列：page_count 和 status
+    if "page_count" not in df.columns:
+        df["page_count"] = None
+    if "page_fetch_status" not in df.columns:
+        df["page_fetch_status"] = None
+
+    # 逐条抓取
+    with telemetry.stage('springer.page_count', records=len(df)):
+        for idx, row in df.iterrows():
+            doi = row["Item DOI"]
+            if pd.isna(doi) or not isinstance(doi, str):
+                df.at[idx, "page_fetch_status"] = "no doi"
+                continue
+
+            doi_url = doi if doi.startswith("http") else f"https://doi.org/{doi}"
+            print(f"Fetching for: {doi_url}")
+            telemetry.gauge('queue_depth', len(df) - idx)
+
+            count, status = fetch_springer_pages(doi_url)
+            df.at[idx, "page_count"] = count
+            df.at[idx, "page_fetch_status"] = status
+            print(f"→ page count: {count}, status: {status}")
+
+            time.sleep(REQUEST_DELAY)
+
+    # 保存结果
+    write_excel(df, output_file)
+    print(f"✅ 抓取完成，结果已保存为 {output_file}")
+    telemetry.print_summary()
+    return df
+
+
+if __name__ == "__main__":
+    fetch_page_counts()
@@ -0,0 +1,130 @@
+#
+# Harvests the SpringerLink search results through the Springer Nature
+# Metadata API instead of exporting them page by page as "SearchResults (n).csv",
+# and saves them with the same columns as springerlink-merge.py.
+#
+
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit import telemetry
+from slrkit.excel_io import write_excel
+from slrkit.harvest import HarvestCursor, Source, harvest
+
+# --- Configuration ---
+# Your Springer Nature API key (https://dev.springernature.com/).
+# If left empty, the SPRINGER_API_KEY environment variable is used.
+api_key = ""
+
+SPRINGER_API_URL = 'https://api.springernature.com/meta/v2/json'
+# Records per request (the basic plan serves at most 25)
+PAGE_SIZE = 25
+# Requests in flight and seconds between two requests to the API
+CONCURRENCY = 2
+REQUEST_INTERVAL = 1.0
+
+# The search string of the SpringerLink search (wildcards are not supported by the API),
+# run once per publication year
+SEARCH_QUERY = (
+    '("foundation model" OR "large language model" OR "LLM" OR "GPT" OR "ChatGPT" OR "generative AI" '
+    'OR "agentic systems" OR "multimodal agents" OR "AutoGPT" OR "LLM-based agent") AND '
+    '("agent architecture" OR "modular agent system" OR "adaptive agent design" OR "agent-based system" '
+    'OR "tool-using agents" OR "planning architecture" OR "reasoning module" OR "workflow orchestration" '
+    'OR "ReAct framework")'
+)
+YEARS = (2017, 2025)
+
+output_file = 'springer_api_results.xlsx'
+# Resume state: springer_harvest.json (pages done per query) and springer_harvest.jsonl (records)
+cursor_file = 'springer_harvest'
+# -------------------
+
+# Columns of the SpringerLink CSV export
+COLUMNS = ['Item Title', 'Publication Title', 'Book Series Title', 'Journal Volume', 'Journal Issue',
+           'Item DOI', 'Authors', 'Publication Year', 'URL', 'Content Type']
+CONTENT_TYPES = {'ConferencePaper': 'Conference paper', 'ReferenceWorkEntry': 'Reference work entry'}
+
+
+def build_queries(query=SEARCH_QUERY, years=YEARS):
+    """One query per publication year."""
+    return [f"{query} year:{year}" for year in range(years[0], years[1] + 1)]
+
+
+def springer_params(query, offset, page_size):
+    return {'q': query, 's': offset, 'p': page_size, 'api_key': api_key or os.environ.get('SPRINGER_API_KEY', '')}
+
+
+def parse_springer_page(payload):
+    """Metadata API reply -> (total number of records, records)."""
+    result = payload.get('result') or [{}]
+    return int(result[0].get('total', 0)), payload.get('records', [])
+
+
+def content_type(record):
+    genres = record.get('genre') or []
+    if 'ConferencePaper' in genres:
+        return 'Conference paper'
+    kind = record.get('contentType', '')
+    return CONTENT_TYPES.get(kind, kind)
+
+
+def record_to_row(record):
+    """
+    Converts one API record to a row of the CSV export. Creators come as
+    "Last, First" and are written as "First Last", separated by commas.
+    """
+    authors = []
+    for creator in record.get('creators', []):
+        name = creator.get('creator', '')
+        last, _, first = name.partition(', ')
+        authors.append(f"{first} {last}".strip())
+    urls = record.get('url') or []
+    html = [u['value'] for u in urls if u.get('format') == 'html'] or [u['value'] for u in urls if u.get('value')]
+    doi = record.get('doi') or None
+    date = record.get('publicationDate') or ''
+    return {
+        'Item Title': record.get('title'),
+        'Publication Title': record.get('publicationName'),
+        'Book Series Title': record.get('seriesTitle'),
+        'Journal Volume': record.get('volume') or None,
+        'Journal Issue': record.get('number') or None,
+        'Item DOI': doi,
+        'Authors': ', '.join(authors),
+        'Publication Year': int(date[:4]) if date[:4].isdigit() else None,
+        'URL': html[0] if html else (f"https://doi.org/{doi}" if doi else None),
+        'Content Type': content_type(record),
+    }
+
+
+def harvest_springer(output_file=output_file, queries=None, cursor_file=cursor_file, restart=False):
+    """
+    Pages through the Metadata API for every query (default: SEARCH_QUERY per
+    year), resuming from `cursor_file`, and saves the records to `output_file`.
+    Returns the DataFrame (None if nothing was harvested).
+    """
+    source = Source('springer', SPRINGER_API_URL, springer_params, parse_springer_page, page_size=PAGE_SIZE,
+                    first_offset=1, concurrency=CONCURRENCY, interval=REQUEST_INTERVAL)
+    cursor = HarvestCursor(cursor_file)
+    if restart:
+        cursor.reset()
+
+    queries = queries or build_queries()
+    print(f"Harvesting {len(queries)} queries from {SPRINGER_API_URL}...")
+    results = harvest(source, queries, cursor)
+    if not results:
+        print("\nNo records were harvested.")
+        return
+
+    merged_df = pd.DataFrame([record_to_row(record) for _, record in results], columns=COLUMNS)
+    print(f"Saving to Excel file: {output_file}...")
+    write_excel(merged_df, output_file)
+    print("\nHarvest complete!")
+    print(f"Total rows in the harvested file: {len(merged_df)}")
+    telemetry.print_summary()
+    return merged_df
+
+
+if __name__ == "__main__":
+    harvest_springer()
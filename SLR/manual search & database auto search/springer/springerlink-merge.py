@@ -6,8 +6,12 @@
 
 import os
 import glob
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from slrkit.excel_io import write_excel
+
 # --- Configuration ---
 # The path to the directory containing your CSV files.
 # Use '.' if the script is in the same folder as the CSVs.
@@ -17,47 +21,58 @@ csv_directory = '.'
 output_file = 'merged_results.xlsx'
 # -------------------
 
-try:
-    # Find all files ending with .csv in the specified directory
-    all_files = glob.glob(os.path.join(csv_directory, "*.csv"))
-    
-    if not all_files:
-        print(f"No CSV files found in the directory: {os.path.abspath(csv_directory)}")
-        print("Please make sure your CSV files and the script are in the correct folder.")
-    else:
-        print(f"Found {len(all_files)} CSV files to merge.")
-        
-        # Create a list to hold the individual DataFrames
-        df_list = []
-        
-        for f in all_files:
-            try:
-                # Read each CSV file into a DataFrame
-                df = pd.read_csv(f)
-                df_list.append(df)
-                print(f"  - Reading {f}...")
-            except Exception as e:
-                print(f"  - Could not read file {f}. Error: {e}")
-
-        if not df_list:
-             print("\nNo data was successfully read from the files. Exiting.")
+
+def merge_csv_files(csv_directory=csv_directory, output_file=output_file):
+    """
+    Merges every CSV export in `csv_directory` into `output_file`; returns the merged
+    DataFrame (None if nothing was read).
+    """
+    try:
+        # Find all files ending with .csv in the specified directory
+        all_files = glob.glob(os.path.join(csv_directory, "*.csv"))
+
+        if not all_files:
+            print(f"No CSV files found in the directory: {os.path.abspath(csv_directory)}")
+            print("Please make sure your CSV files and the script are in the correct folder.")
         else:
-            # Concatenate all DataFrames in the list into a single DataFrame
-            print("\nMerging all CSV files...")
-            merged_df = pd.concat(df_list, ignore_index=True)
-
-            # Save the merged DataFrame to a new Excel file
-            print(f"Saving to new Excel file: {output_file}...")
-            # 'index=False' prevents pandas from writing the DataFrame index as a column
-            merged_df.to_excel(output_file, index=False)
-            
-            print(f"\nMerge complete!")
-            print(f"All data has been successfully saved to: {output_file}")
-            print(f"Total rows in the merged file: {len(merged_df)}")
-
-except ImportError:
-    print("Error: Required libraries 'pandas' or 'openpyxl' are not installed.")
-    print("Please install them by running the following command in your terminal:")
-    print("pip install pandas openpyxl")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+            print(f"Found {len(all_files)} CSV files to merge.")
+
+            # Create a list to hold the individual DataFrames
+            df_list = []
+
+            for f in all_files:
+                try:
+                    # Read each CSV file into a DataFrame
+                    df = pd.read_csv(f)
+                    df_list.append(df)
+                    print(f"  - Reading {f}...")
+                except Exception as e:
+                    print(f"  - Could not read file {f}. Error: {e}")
+
+            if not df_list:
+                 print("\nNo data was successfully read from the files. Exiting.")
+            else:
+                # Concatenate all DataFrames in the list into a single DataFrame
+                print("\nMerging all CSV files...")
+                merged_df = pd.concat(df_list, ignore_index=True)
+
+                # Save the merged DataFrame to a new Excel file
+                print(f"Saving to new Excel file: {output_file}...")
+                # 'index=False' prevents pandas from writing the DataFrame index as a column
+                write_excel(merged_df, output_file)
+
+                print(f"\nMerge complete!")
+                print(f"All data has been successfully saved to: {output_file}")
+                print(f"Total rows in the merged file: {len(merged_df)}")
+                return merged_df
+
+    except ImportError:
+        print("Error: Required libraries 'pandas' or 'openpyxl' are not installed.")
+        print("Please install them by running the following command in your terminal:")
+        print("pip install pandas openpyxl")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+
+if __name__ == "__main__":
+    merge_csv_files()
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+Content-hash-driven runner for the SLR pipeline.
+
+The harvesting, merging and screening scripts are standalone and read/write
+hard-coded file names in their own folders. This runner declares them as
+stages of a DAG (harvest -> merge -> page count -> assemble -> corpus -> Crossref
+enrichment -> dedup -> inclusion -> C3-C5 -> dedup -> EC7/EC8 -> page filter) with the files each stage reads and writes; the edges
+follow from those files. A stage's fingerprint covers
+
+- the content of its input files,
+- its script and the local modules it imports (which hold the prompts), and
+- its declared config (values that live outside the code),
+
+and a stage is only re-executed when its fingerprint differs from the last
+successful run or one of its outputs is missing. A stage whose re-run
+produces byte-identical outputs does not invalidate the stages after it.
+Screening scripts resume from their own output file when it exists, so
+before such a stage runs with a new fingerprint (or --force) its previous
+outputs are moved aside to <name>.previous<ext>; a run that was interrupted
+under the same fingerprint still resumes.
+Independent branches (e.g. the per-source merges) run in parallel.
+
+Where the chain relied on renaming a file by hand (e.g.
+slr_gpt_results_included.xlsx -> Exclusion345.xlsx) a 'copy' stage does it.
+A script that needs other file names than its defaults runs through slr.py.
+
+Usage:
+    python pipeline.py                  # run everything that is out of date
+    python pipeline.py ec78             # only ec78 and the stages it depends on
+    python pipeline.py --dry-run        # show what would run
+    python pipeline.py --force dedup    # re-run dedup (and whatever that changes)
+"""
+import argparse
+import ast
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(BASE_DIR, '.pipeline_state.json')
+LOG_DIR = os.path.join(BASE_DIR, 'pipeline_logs')
+MAX_PARALLEL_STAGES = 4
+SEARCH = 'manual search & database auto search'
+SCREEN = 'Screen'
+# All stages append their telemetry events (slrkit/telemetry.py) to this one file
+os.environ.setdefault('SLR_TELEMETRY', os.path.join(BASE_DIR, 'telemetry.jsonl'))
+
+from slrkit import telemetry
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    name:    unique stage name
+    workdir: folder (relative to SLR/) the script runs in; file names are relative to it
+    script:  the script to run, or None for a copy stage
+    inputs:  files or glob patterns the stage reads
+    outputs: files the stage writes
+    config:  extra values that are part of the fingerprint (the model names and prompts
+             are in the scripts, so they are covered by the code hash)
+    after:   stage names to run before this one, in addition to the file-based edges
+    command: slr.py subcommand and arguments to run instead of the bare script, for a
+             script that is used with other file names than its defaults (the code
+             hash still covers `script`; the arguments are part of the fingerprint)
+    resumes: the script resumes from its output file if it exists (checkpointing
+             screening scripts), so stale outputs are moved aside before a re-run
+    """
+
+    def __init__(self, name, workdir, script=None, inputs=(), outputs=(), config=None, after=(), command=None,
+                 resumes=False):
+        self.name = name
+        self.workdir = os.path.join(BASE_DIR, workdir)
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.config = config or {}
+        self.after = list(after)
+        self.command = list(command) if command else None
+        self.resumes = resumes
+
+    def path(self, name):
+        return os.path.normpath(os.path.join(self.workdir, name))
+
+    def input_files(self):
+        files = []
+        for pattern in self.inputs:
+            matches = sorted(glob.glob(glob.escape(self.workdir) + os.sep + pattern))
+            files += [os.path.normpath(m) for m in matches] if any(c in pattern for c in '*?[') \
+                else [self.path(pattern)]
+        return files
+
+    def output_files(self):
+        return [self.path(name) for name in self.outputs]
+
+
+def copy_stage(name, workdir, source, target):
+    return Stage(name, workdir, None, inputs=[source], outputs=[target])
+
+
+STAGES = [
+    # --- Harvest (remote APIs) ---
+    Stage('harvest_arxiv', f'{SEARCH}/arxiv', 'arxiv-python.py',
+          outputs=['arXiv_Final_Results_v3.xlsx']),
+    # --- Per-source merges of the database exports ---
+    Stage('merge_ieee', f'{SEARCH}/ieee', 'mergecsv.py',
+          inputs=['ieee*.csv'], outputs=['ieee_merged_results.xlsx']),
+    Stage('merge_sciencedirect', f'{SEARCH}/sciencedirect', 'merge_ris.py',
+          inputs=['*.ris'], outputs=['sciencedirect_merged_results.xlsx']),
+    Stage('merge_springer', f'{SEARCH}/springer', 'springerlink-merge.py',
+          inputs=['SearchResults*.csv'], outputs=['merged_results.xlsx']),
+    copy_stage('springer_rename', f'{SEARCH}/springer', 'merged_results.xlsx', 'springerlink-merged_results.xlsx'),
+    Stage('merge_wos', f'{SEARCH}/webofsceince', 'wos-python-merge.py',
+          inputs=['savedrecs*.xls'], outputs=['merged_results.xlsx']),
+    Stage('merge_dblp', f'{SEARCH}/dblp', 'dblp-bib-to-xlsx.py',
+          inputs=['*.bib'], outputs=['my_literature_summary.xlsx']),
+    # --- Page counts (scraped from the publisher pages) ---
+    Stage('pages_sciencedirect', f'{SEARCH}/sciencedirect', 'sciencedirect_page_count.py',
+          inputs=['sciencedirect_merged_results.xlsx'], outputs=['sciencedirect_with_page_count.xlsx']),
+    Stage('pages_springer', f'{SEARCH}/springer', 'ex_springer_page_catch.py',
+          inputs=['springerlink-merged_results.xlsx'], outputs=['springerlink_with_page_count.xlsx']),
+    # --- Screening ---
+    # The per-source results are mapped onto the corpus columns and appended (with record_key and database)
+    Stage('assemble', SCREEN, 'merge_sources.py',
+          inputs=[f'../{SEARCH}/ieee/ieee_merged_results.xlsx',
+                  f'../{SEARCH}/acm/acm-database-search.xlsx',
+                  f'../{SEARCH}/sciencedirect/sciencedirect_with_page_count.xlsx',
+                  f'../{SEARCH}/springer/springerlink_with_page_count.xlsx',
+                  f'../{SEARCH}/webofsceince/merged_results.xlsx',
+                  f'../{SEARCH}/dblp/my_literature_summary.xlsx',
+                  f'../{SEARCH}/arxiv/arXiv_Final_Results_v3.xlsx'],
+          outputs=['merged_literature_data.csv']),
+    Stage('corpus', SCREEN, 'csvtoxlsx.py',
+          inputs=['merged_literature_data.csv'], outputs=['merged_literature_data.xlsx']),
+    # Missing abstracts/pages/venues are filled from Crossref (cached in crossref_cache.sqlite)
+    Stage('enrich', SCREEN, 'crossref_enrich.py',
+          inputs=['merged_literature_data.xlsx'], outputs=['final_merged_literature_data.xlsx']),
+    # Duplicate clusters of the corpus: every record with its cluster ID and representative flag.
+    # The screening stages screen one representative per cluster and copy its decisions to the members.
+    Stage('dedup_corpus', SCREEN, 'exclusion2.py',
+          inputs=['final_merged_literature_data.xlsx'],
+          outputs=['final_merged_literature_data_deduplicated.xlsx', 'final_merged_literature_data_dup_clusters.xlsx'],
+          command=['dedup', '--input', 'final_merged_literature_data.xlsx',
+                   '--output', 'final_merged_literature_data_deduplicated.xlsx',
+                   '--clusters', 'final_merged_literature_data_dup_clusters.xlsx']),
+    Stage('inclusion', SCREEN, 'inclusionscreen1_2.py',
+          inputs=['final_merged_literature_data_dup_clusters.xlsx'], outputs=['phase2_screened_gpt_output.xlsx'],
+          command=['screen-inclusion', '--input', 'final_merged_literature_data_dup_clusters.xlsx'],
+          resumes=True),
+    Stage('c345', SCREEN, 'exclusion345.py',
+          inputs=['phase2_screened_gpt_output.xlsx'],
+          outputs=['slr_gpt_results_all.xlsx', 'slr_gpt_results_included.xlsx']),
+    copy_stage('c345_result', SCREEN, 'slr_gpt_results_included.xlsx', 'Exclusion345.xlsx'),
+    # The included records are clustered again; EC7/EC8 get the cluster file (all members, both columns)
+    Stage('dedup', SCREEN, 'exclusion2.py',
+          inputs=['Exclusion345.xlsx'], outputs=['Exclusion345_deduplicated.xlsx', 'Exclusion345_dup_clusters.xlsx']),
+    copy_stage('dedup_result', SCREEN, 'Exclusion345_dup_clusters.xlsx', 'Exclusion2_1588.xlsx'),
+    Stage('ec78', SCREEN, 'exclusion78.py',
+          inputs=['Exclusion2_1588.xlsx'], outputs=['Exclusion_Screening_Results_OpenAI.xlsx'], resumes=True),
+    # Exclude Less Than 8 Pages (records without a page count are left for manual review)
+    Stage('page_filter', SCREEN, 'page_filter.py',
+          inputs=['Exclusion_Screening_Results_OpenAI.xlsx'],
+          outputs=['Page_Filter_Results.xlsx', 'Page_Filter_Included.xlsx']),
+]
+
+
+# --- Fingerprints ---
+
+def file_hash(path, cache):
+    """SHA-256 of a file, cached by (size, mtime) across runs."""
+    stat = os.stat(path)
+    key = os.path.relpath(path, BASE_DIR)
+    cached = cache.get(key)
+    if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+        return cached['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    cache[key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def local_modules(script_path):
+    """
+    The script plus the local modules it imports, recursively: modules of its
+    own folder and the shared slrkit package under SLR/.
+    """
+    folder = os.path.dirname(script_path)
+    found, pending = [], [script_path]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.level == 1 and node.module:
+                # Relative import inside slrkit (from .compact import ...)
+                pending.append(os.path.join(os.path.dirname(path), *node.module.split('.')) + '.py')
+                continue
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else \
+                [node.module] if isinstance(node, ast.ImportFrom) and node.module and not node.level else []
+            for name in names:
+                pending.append(os.path.join(folder, name.split('.')[0] + '.py'))
+                pending.append(os.path.join(BASE_DIR, *name.split('.')) + '.py')
+    return sorted(found)
+
+
+def stage_fingerprint(stage, cache):
+    parts = [f"config={json.dumps(stage.config, sort_keys=True)}"]
+    if stage.command:
+        parts.append(f"command={json.dumps(stage.command)}")
+    if stage.script:
+        for path in local_modules(stage.path(stage.script)):
+            parts.append(f"code:{os.path.relpath(path, BASE_DIR)}={file_hash(path, cache)}")
+    for path in stage.input_files():
+        parts.append(f"input:{os.path.relpath(path, BASE_DIR)}={file_hash(path, cache)}")
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+# --- DAG ---
+
+def build_dependencies(stages):
+    """Stage -> set of stages it depends on (producers of its input files, plus 'after')."""
+    producers = {}
+    for stage in stages:
+        for path in stage.output_files():
+            producers[path] = stage.name
+    dependencies = {}
+    for stage in stages:
+        deps = set(stage.after)
+        for pattern in stage.inputs:
+            target = stage.path(pattern)
+            for path, producer in producers.items():
+                if producer != stage.name and (path == target or fnmatch.fnmatch(path, target)):
+                    deps.add(producer)
+        dependencies[stage.name] = deps
+    return dependencies
+
+
+def select_stages(stages, dependencies, targets):
+    """The target stages and everything they (transitively) depend on."""
+    if not targets:
+        return [s.name for s in stages]
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in dependencies:
+            raise KeyError(f"Unknown stage '{name}'")
+        if name not in selected:
+            selected.add(name)
+            pending += dependencies[name]
+    return [s.name for s in stages if s.name in selected]
+
+
+# --- Execution ---
+
+def run_stage(stage):
+    """Runs one stage; returns (success, seconds, log file)."""
+    start = time.perf_counter()
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    if stage.script is None:
+        shutil.copyfile(stage.input_files()[0], stage.output_files()[0])
+        return True, time.perf_counter() - start, None
+    argv = [os.path.join(BASE_DIR, 'slr.py')] + stage.command if stage.command else [stage.script]
+    with open(log_path, 'w', encoding='utf-8') as log:
+        process = subprocess.run([sys.executable] + argv, cwd=stage.workdir,
+                                 stdout=log, stderr=subprocess.STDOUT)
+    missing = [p for p in stage.output_files() if not os.path.exists(p)]
+    success, seconds = process.returncode == 0 and not missing, time.perf_counter() - start
+    telemetry.record_call(f"pipeline.{stage.name}", seconds, ok=success, returncode=process.returncode)
+    return success, seconds, log_path
+
+
+def rotate_outputs(stage):
+    """Moves the existing outputs of a stage aside (<name>.previous<ext>) so its script starts from scratch."""
+    for path in stage.output_files():
+        if os.path.exists(path):
+            root, ext = os.path.splitext(path)
+            os.replace(path, f"{root}.previous{ext}")
+            print(f"[note] {stage.name}: previous output moved to {os.path.relpath(root, BASE_DIR)}.previous{ext}")
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'stages': {}, 'hashes': {}}
+
+
+def save_state(state):
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def run_pipeline(targets=(), force=(), dry_run=False, jobs=MAX_PARALLEL_STAGES, stages=STAGES):
+    """
+    Runs the out-of-date stages in dependency order, independent ones in parallel.
+    Returns {stage name: 'ran' | 'up to date' | 'failed' | 'skipped' | 'would run'}.
+    """
+    by_name = {s.name: s for s in stages}
+    dependencies = build_dependencies(stages)
+    order = select_stages(stages, dependencies, targets)
+    state = load_state()
+    status = {}
+
+    def ready(name):
+        return all(status.get(dep) in ('ran', 'up to date', 'would run')
+                   for dep in dependencies[name] if dep in order)
+
+    def decide(name):
+        """Returns (needs_run, fingerprint) or (None, reason) if the stage cannot run."""
+        stage = by_name[name]
+        missing = [p for p in stage.input_files() if not os.path.exists(p)]
+        if missing and not dry_run:
+            return None, f"missing input {os.path.relpath(missing[0], BASE_DIR)}"
+        if missing:
+            return True, None
+        if dry_run and any(status.get(dep) == 'would run' for dep in dependencies[name]):
+            return True, None
+        fingerprint = stage_fingerprint(stage, state['hashes'])
+        previous = state['stages'].get(name, {}).get('fingerprint')
+        outputs_exist = all(os.path.exists(p) for p in stage.output_files())
+        return name in force or fingerprint != previous or not outputs_exist, fingerprint
+
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(status.get(dep) in ('failed', 'skipped') for dep in dependencies[name] if dep in order):
+                    status[name] = 'skipped'
+                    pending.remove(name)
+                    print(f"[skip] {name}: an upstream stage failed")
+                    continue
+                if not ready(name):
+                    continue
+                pending.remove(name)
+                needs_run, fingerprint = decide(name)
+                if needs_run is None:
+                    status[name] = 'failed'
+                    print(f"[fail] {name}: {fingerprint}")
+                elif not needs_run:
+                    status[name] = 'up to date'
+                    print(f"[ ok ] {name}: up to date")
+                elif dry_run:
+                    status[name] = 'would run'
+                    print(f"[plan] {name}: would run")
+                else:
+                    stage_state = state['stages'].setdefault(name, {})
+                    if by_name[name].resumes:
+                        # Its output is only a valid checkpoint if it was written under the same fingerprint
+                        if name in force or stage_state.get('started') != fingerprint:
+                            rotate_outputs(by_name[name])
+                        stage_state['started'] = fingerprint
+                        save_state(state)
+                    print(f"[run ] {name} ...")
+                    running[pool.submit(run_stage, by_name[name])] = (name, fingerprint)
+
+            if not running:
+                if pending and not any(ready(n) for n in pending):
+                    raise RuntimeError(f"Dependency cycle between stages: {pending}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                success, seconds, log_path = future.result()
+                if success:
+                    status[name] = 'ran'
+                    state['stages'][name] = {'fingerprint': fingerprint, 'started': fingerprint,
+                                             'seconds': round(seconds, 2),
+                                             'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+                    save_state(state)
+                    print(f"[done] {name} in {seconds:.1f} s")
+                else:
+                    status[name] = 'failed'
+                    print(f"[fail] {name} after {seconds:.1f} s, see {log_path}")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the out-of-date stages of the SLR pipeline.")
+    parser.add_argument('targets', nargs='*', help="stages to bring up to date (default: all)")
+    parser.add_argument('--force', nargs='*', default=[], help="stages to re-run even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="only show which stages would run")
+    parser.add_argument('--jobs', type=int, default=MAX_PARALLEL_STAGES, help="stages to run in parallel")
+    parser.add_argument('--list', action='store_true', help="list the stages and their dependencies")
+    args = parser.parse_args()
+
+    if args.list:
+        dependencies = build_dependencies(STAGES)
+        for stage in STAGES:
+            after = ', '.join(sorted(dependencies[stage.name])) or '-'
+            print(f"{stage.name:22} <- {after}")
+    else:
+        result = run_pipeline(args.targets, set(args.force), args.dry_run, args.jobs)
+        print("\nSummary: " + ', '.join(f"{v}: {list(result.values()).count(v)}"
+                                         for v in dict.fromkeys(result.values())))
+        if not args.dry_run:
+            telemetry.print_summary()
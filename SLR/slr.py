@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Single command line for the SLR scripts.
+
+Every harvesting, merging and screening script exposes its work as a function
+(e.g. merge_csv_files() in ieee/mergecsv.py, main() in Screen/exclusion78.py).
+Each subcommand here runs one of those functions. A script is only imported
+when its subcommand runs, so pandas, openai, selenium, bs4, bibtexparser and
+rispy are only loaded by the commands that need them, and `--help` loads none
+of them.
+
+Paths given on the command line are relative to the current directory. A path
+that is not given keeps the script's default, which is relative to the
+script's own folder, exactly as when the script is run directly. Settings
+(model, thresholds, delays, workers) override the script's config constants
+for this run.
+
+Usage:
+    python slr.py --help
+    python slr.py merge-ieee --dir exports/ieee --output ieee.xlsx
+    python slr.py dedup --input Exclusion345.xlsx --threshold 92 --workers 4
+    python slr.py screen-ec78 --model gpt-4o-mini --abstract-tokens 400
+    python slr.py pipeline --dry-run
+"""
+import argparse
+import importlib
+import importlib.util
+import os
+import runpy
+import sys
+from contextlib import contextmanager
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEARCH = 'manual search & database auto search'
+SCREEN = 'Screen'
+
+
+class Command:
+    """
+    One subcommand.
+
+    name:     subcommand name
+    script:   the script (relative to SLR/) that defines the function
+    function: the function to call; None runs the script itself with the remaining arguments
+    help:     one-line description
+    paths:    {option: (keyword argument, help)} - files and folders, resolved against the current directory
+    options:  {option: (keyword argument, type, help)} - other keyword arguments of the function
+    settings: {option: (module constant, type, help)} - config constants overridden for this run
+
+    A type of bool makes the option a flag; a tuple restricts it to those choices.
+    """
+
+    def __init__(self, name, script, function, help, paths=None, options=None, settings=None):
+        self.name = name
+        self.script = os.path.join(BASE_DIR, script)
+        self.function = function
+        self.help = help
+        self.paths = paths or {}
+        self.options = options or {}
+        self.settings = settings or {}
+
+    def add_parser(self, subparsers):
+        # A script run as a whole parses its own arguments (including --help)
+        parser = subparsers.add_parser(self.name, help=self.help, description=self.help,
+                                       add_help=self.function is not None)
+        parser.set_defaults(command=self)
+        if self.function is None:
+            return parser
+        for option, (_, help) in self.paths.items():
+            parser.add_argument(option, metavar='PATH', help=help)
+        for option, (_, kind, help) in {**self.options, **self.settings}.items():
+            add_typed_argument(parser, option, kind, help)
+        return parser
+
+    def run(self, args, extra=()):
+        if self.function is None:
+            return run_script(self.script, extra)
+        # Paths are resolved before changing into the script's folder
+        kwargs = {}
+        for option, (keyword, _) in self.paths.items():
+            value = getattr(args, option_dest(option))
+            if value is not None:
+                kwargs[keyword] = os.path.abspath(value)
+        for option, (keyword, _, _) in self.options.items():
+            value = getattr(args, option_dest(option))
+            if value is not None:
+                kwargs[keyword] = value
+
+        module = load_script(self.script)
+        for option, (constant, _, _) in self.settings.items():
+            value = getattr(args, option_dest(option))
+            if value is not None:
+                setattr(module, constant, value)
+
+        with working_directory(os.path.dirname(self.script)):
+            return getattr(module, self.function)(**kwargs)
+
+
+def option_dest(option):
+    return option.lstrip('-').replace('-', '_')
+
+
+def add_typed_argument(parser, option, kind, help):
+    if kind is bool:
+        parser.add_argument(option, action='store_true', default=None, help=help)
+    elif isinstance(kind, tuple):
+        parser.add_argument(option, choices=kind, help=help)
+    else:
+        parser.add_argument(option, type=kind, help=help)
+
+
+def load_script(path):
+    """
+    Imports a script by path. Its folder goes on sys.path so its own local
+    imports resolve; file names that are not identifiers (arxiv-python.py)
+    are loaded under a sanitized module name.
+    """
+    folder, filename = os.path.split(path)
+    name = os.path.splitext(filename)[0]
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    if name.isidentifier():
+        return importlib.import_module(name)
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_script(path, argv):
+    """Runs a script with its own command line, as `python <script> <argv>` would."""
+    sys.argv = [path] + list(argv)
+    sys.path.insert(0, os.path.dirname(path))
+    runpy.run_path(path, run_name='__main__')
+
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+COMMANDS = [
+    # --- Harvest ---
+    Command('harvest-arxiv', f'{SEARCH}/arxiv/arxiv-python.py', 'harvest_arxiv',
+            'query the arXiv API and save the de-duplicated results',
+            paths={'--output': ('output_file', 'Excel file to write')},
+            options={'--start-date': ('start_date', str, 'first submission date (YYYY-MM-DD)'),
+                     '--end-date': ('end_date', str, 'last submission date (YYYY-MM-DD)')},
+            settings={'--page-delay': ('PAGE_DELAY', float, 'seconds between result pages'),
+                      '--api-url': ('ARXIV_API_URL', str, 'arXiv API endpoint')}),
+    Command('harvest-arxiv-oai', f'{SEARCH}/arxiv/arxiv_oai_harvest.py', 'harvest_arxiv_oai',
+            'bulk-harvest arXiv cs metadata via OAI-PMH (incremental) and run the queries locally',
+            paths={'--output': ('output_file', 'Excel file to write'),
+                   '--store': ('store_file', 'local SQLite metadata store')},
+            options={'--start-date': ('start_date', str, 'first submission date (YYYY-MM-DD)'),
+                     '--end-date': ('end_date', str, 'last submission date (YYYY-MM-DD)'),
+                     '--offline': ('offline', bool, 'only query the local store, do not harvest')},
+            settings={'--oai-url': ('OAI_URL', str, 'arXiv OAI-PMH endpoint')}),
+    Command('harvest-dblp', f'{SEARCH}/dblp/dblp_api_harvest.py', 'harvest_dblp',
+            'page through the dblp search API (resumable) instead of the .bib exports',
+            paths={'--output': ('output_file', 'Excel file to write'),
+                   '--cursor': ('cursor_file', 'resume state (.json/.jsonl are appended)')},
+            options={'--restart': ('restart', bool, 'discard the resume state and start over')},
+            settings={'--concurrency': ('CONCURRENCY', int, 'requests in flight'),
+                      '--interval': ('REQUEST_INTERVAL', float, 'seconds between requests'),
+                      '--api-url': ('DBLP_API_URL', str, 'dblp search API endpoint')}),
+    Command('query-dblp-dump', f'{SEARCH}/dblp/dblp_dump_index.py', 'query_dblp_dump',
+            'run the dblp queries against a local dblp.xml dump (indexed on first use)',
+            paths={'--output': ('output_file', 'Excel file to write'),
+                   '--dump': ('dump_file', 'dblp.xml or dblp.xml.gz'),
+                   '--index': ('index_file', 'local SQLite index of the dump'),
+                   '--dtd': ('dtd_file', 'dblp.dtd (default: next to the dump)')},
+            settings={'--batch-size': ('BATCH_SIZE', int, 'records written per transaction while indexing')}),
+    Command('harvest-springer', f'{SEARCH}/springer/springer_api_harvest.py', 'harvest_springer',
+            'page through the Springer Nature Metadata API (resumable) instead of the CSV exports',
+            paths={'--output': ('output_file', 'Excel file to write'),
+                   '--cursor': ('cursor_file', 'resume state (.json/.jsonl are appended)')},
+            options={'--restart': ('restart', bool, 'discard the resume state and start over')},
+            settings={'--api-key': ('api_key', str, 'Springer Nature API key (default: $SPRINGER_API_KEY)'),
+                      '--concurrency': ('CONCURRENCY', int, 'requests in flight'),
+                      '--interval': ('REQUEST_INTERVAL', float, 'seconds between requests'),
+                      '--api-url': ('SPRINGER_API_URL', str, 'Metadata API endpoint')}),
+
+    # --- Merge the exports of each source ---
+    Command('merge-ieee', f'{SEARCH}/ieee/mergecsv.py', 'merge_csv_files',
+            'merge the IEEE Xplore CSV exports',
+            paths={'--dir': ('csv_directory', 'folder with the CSV exports'),
+                   '--output': ('output_file', 'Excel file to write')}),
+    Command('merge-springer', f'{SEARCH}/springer/springerlink-merge.py', 'merge_csv_files',
+            'merge the SpringerLink CSV exports',
+            paths={'--dir': ('csv_directory', 'folder with the CSV exports'),
+                   '--output': ('output_file', 'Excel file to write')}),
+    Command('merge-wos', f'{SEARCH}/webofsceince/wos-python-merge.py', 'merge_xls_files',
+            'merge the Web of Science .xls exports',
+            paths={'--dir': ('xls_directory', 'folder with the .xls exports'),
+                   '--output': ('output_file', 'Excel file to write')}),
+    Command('merge-dblp', f'{SEARCH}/dblp/dblp-bib-to-xlsx.py', 'parse_bib_files_to_excel',
+            'merge the dblp BibTeX exports',
+            paths={'--dir': ('directory_path', 'folder with the .bib files'),
+                   '--output': ('output_filename', 'Excel file to write')}),
+    Command('merge-sciencedirect', f'{SEARCH}/sciencedirect/merge_ris.py', 'merge_ris_files',
+            'merge the ScienceDirect RIS exports',
+            paths={'--dir': ('ris_directory', 'folder with the .ris files'),
+                   '--output': ('output_file', 'Excel file to write')},
+            options={'--workers': ('workers', int, 'parser processes')}),
+
+    # --- Page counts ---
+    Command('pages-springer', f'{SEARCH}/springer/ex_springer_page_catch.py', 'fetch_page_counts',
+            'fetch Springer page counts via the DOI landing pages',
+            paths={'--input': ('input_file', 'merged Springer Excel file'),
+                   '--output': ('output_file', 'Excel file to write')},
+            settings={'--delay': ('REQUEST_DELAY', float, 'seconds between requests')}),
+    Command('pages-sciencedirect', f'{SEARCH}/sciencedirect/python_catch_doi_page.py', 'fetch_page_counts',
+            'fetch missing ScienceDirect page counts via the DOI landing pages',
+            paths={'--input': ('input_file', 'merged ScienceDirect Excel file'),
+                   '--output': ('output_file', 'Excel file to write')},
+            settings={'--delay': ('REQUEST_DELAY', float, 'seconds between requests')}),
+    Command('pages-sciencedirect-browser', f'{SEARCH}/sciencedirect/sciencedirect_page_count.py', 'fetch_page_counts',
+            'fetch ScienceDirect page counts with headless Chrome',
+            paths={'--input': ('input_file', 'merged ScienceDirect Excel file'),
+                   '--output': ('output_file', 'Excel file to write')},
+            settings={'--delay': ('REQUEST_DELAY', float, 'seconds between pages')}),
+
+    # --- Screening ---
+    Command('assemble', f'{SCREEN}/merge_sources.py', 'main',
+            'map the per-source results onto the corpus columns and write the merged CSV',
+            paths={'--output': ('output_file', 'CSV file to write')}),
+    Command('corpus', f'{SCREEN}/csvtoxlsx.py', 'convert',
+            'convert the merged literature CSV to Excel',
+            paths={'--input': ('csv_file', 'CSV file to convert'),
+                   '--output': ('xlsx_file', 'Excel file to write (default: next to the CSV)')},
+            options={'--encoding': ('encoding', str, 'CSV encoding, e.g. gbk')}),
+    Command('enrich', f'{SCREEN}/crossref_enrich.py', 'main',
+            'fill missing abstracts, pages and venues from Crossref (batched, cached)',
+            paths={'--input': ('input_file', 'Excel corpus with a doi column'),
+                   '--output': ('output_file', 'Excel file to write'),
+                   '--cache': ('cache_file', 'SQLite cache of Crossref answers')},
+            settings={'--api-url': ('CROSSREF_API_URL', str, 'Crossref /works endpoint'),
+                      '--mailto': ('MAILTO', str, "contact address for Crossref's polite pool"),
+                      '--batch-size': ('BATCH_SIZE', int, 'DOIs per query'),
+                      '--concurrency': ('CONCURRENCY', int, 'parallel queries')}),
+    Command('screen-inclusion', f'{SCREEN}/inclusionscreen1_2.py', 'main',
+            'GPT screening against the inclusion criteria (FM/LLM, SE, English)',
+            paths={'--input': ('input_file', 'Excel file to screen'),
+                   '--output': ('output_file', 'Excel file to write (resumed if it exists)')},
+            settings={'--model': ('MODEL', str, 'OpenAI model'),
+                      '--logprob': ('USE_LOGPROB_MODE', bool, 'single-token logprob mode'),
+                      '--logprob-threshold': ('LOGPROB_THRESHOLD', float, 'P(Yes) needed for "Yes"'),
+                      '--abstract-tokens': ('ABSTRACT_TOKEN_BUDGET', int, 'truncate abstracts to this many tokens'),
+                      '--max-output-tokens': ('MAX_OUTPUT_TOKENS', int, 'cap the length of the reply (default: no cap)'),
+                      '--delay': ('RATE_LIMIT_DELAY', float, 'seconds between API calls'),
+                      '--checkpoint': ('CHECKPOINT_INTERVAL', int, 'save every N articles')}),
+    Command('screen-c345', f'{SCREEN}/exclusion345.py', 'intelligent_screening',
+            'GPT screening against C3-C5',
+            paths={'--input': ('input_filename', 'Excel file to screen'),
+                   '--output': ('output_all_filename', 'Excel file with all results'),
+                   '--included': ('output_included_filename', 'Excel file with the included papers')},
+            settings={'--logprob': ('USE_LOGPROB_MODE', bool, 'single-token logprob mode'),
+                      '--logprob-threshold': ('LOGPROB_THRESHOLD', float, 'P(Yes) needed for "Yes"')}),
+    Command('calibrate-logprob', f'{SCREEN}/logprob_classifier.py', 'calibrate',
+            'fit the logprob-mode P(Yes) calibration on hand-labelled records (<criterion>_label columns)',
+            paths={'--input': ('input_file', 'screening results with <criterion>_prob and <criterion>_label columns'),
+                   '--output': ('output_file', 'where the fitted temperature is stored')}),
+    Command('dedup', f'{SCREEN}/exclusion2.py', 'main',
+            'cluster duplicate titles and mark the cluster representatives',
+            paths={'--input': ('input_file', 'Excel file to de-duplicate'),
+                   '--output': ('output_file', 'Excel file to write'),
+                   '--clusters': ('cluster_file', 'Excel file with the duplicate clusters')},
+            options={'--title-column': ('title_column', str, 'column holding the title')},
+            settings={'--threshold': ('SIMILARITY_THRESHOLD', int, 'fuzzy title similarity (0-100)'),
+                      '--workers': ('WORKERS', int, 'processes for the fuzzy comparison')}),
+    Command('semantic-dedup', f'{SCREEN}/semantic_dedup.py', 'main',
+            'list reworded near-duplicates found by title + abstract embeddings',
+            paths={'--input': ('input_file', 'Excel file with title and abstract columns'),
+                   '--output': ('output_file', 'Excel file with the candidate pairs'),
+                   '--index': ('index_file', 'persistent embedding index (.npz)')},
+            settings={'--threshold': ('COSINE_THRESHOLD', float, 'cosine similarity of a candidate pair'),
+                      '--nprobe': ('NPROBE', int, 'index lists searched per record')}),
+    Command('screen-ec78', f'{SCREEN}/exclusion78.py', 'main',
+            'GPT screening against EC7/EC8',
+            paths={'--input': ('input_file', 'Excel file to screen'),
+                   '--output': ('output_file', 'Excel file to write')},
+            settings={'--model': ('MODEL_NAME', str, 'OpenAI model'),
+                      '--abstract-tokens': ('ABSTRACT_TOKEN_BUDGET', int, 'truncate abstracts to this many tokens')}),
+    Command('screen-ec78-queue', f'{SCREEN}/exclusion78.py', 'main_queue',
+            'EC7/EC8 screening from a shared lease-based queue (run on several machines)',
+            paths={'--input': ('input_file', 'Excel file to screen'),
+                   '--output': ('output_file', 'Excel file to write once the queue is empty'),
+                   '--queue': ('queue_file', 'SQLite queue file shared by all workers')},
+            options={'--workers': ('workers', int, 'worker processes on this machine')},
+            settings={'--model': ('MODEL_NAME', str, 'OpenAI model'),
+                      '--abstract-tokens': ('ABSTRACT_TOKEN_BUDGET', int, 'truncate abstracts to this many tokens'),
+                      '--batch-size': ('QUEUE_BATCH_SIZE', int, 'records claimed per batch'),
+                      '--lease': ('QUEUE_LEASE_SECONDS', int, 'seconds before records of a stalled worker are re-queued')}),
+    Command('page-filter', f'{SCREEN}/page_filter.py', 'main',
+            'exclude included records with fewer pages than the minimum',
+            paths={'--input': ('input_file', 'EC7/EC8 results'),
+                   '--output': ('output_all_file', 'Excel file with all results'),
+                   '--included': ('output_included_file', 'Excel file with the included papers')},
+            settings={'--min-pages': ('MIN_PAGES', int, 'minimum number of pages')}),
+    Command('screen-fused', f'{SCREEN}/screening_pipeline.py', 'main',
+            'inclusion, C3-C5 and EC7/EC8 in one pass over the corpus',
+            paths={'--input': ('input_file', 'Excel file to screen'),
+                   '--output': ('output_file', 'Excel file to write (resumed if it exists)')},
+            settings={'--checkpoint': ('CHECKPOINT_INTERVAL', int, 'save every N articles')}),
+
+    # --- Indexes and snapshots ---
+    Command('dedup-index', f'{SCREEN}/dedup_index.py', 'main',
+            'match a new batch against the persistent duplicate index',
+            paths={'--index': ('index_file', 'index file'),
+                   '--batch': ('new_batch_file', 'Excel file with the new records'),
+                   '--output': ('output_file', 'Excel file to write')},
+            options={'--verify': ('verify', bool, 'compare the index against a full rebuild')}),
+    Command('search-index', f'{SCREEN}/search_index.py', 'main',
+            'build the inverted index and evaluate the search strings locally',
+            paths={'--corpus': ('corpus_file', 'Excel corpus to index'),
+                   '--index': ('index_file', 'index file'),
+                   '--report': ('report_file', 'Excel report to write')}),
+    Command('term-hits', f'{SCREEN}/term_hits.py', 'main',
+            'count search-term hits per record',
+            paths={'--corpus': ('corpus_file', 'Excel corpus'),
+                   '--output': ('output_file', 'Excel file to write')},
+            options={'--terms': ('term_set', ('arxiv', 'manual'), 'term set to count')}),
+    Command('snapshot', f'{SCREEN}/snapshot_store.py', 'main',
+            'import an export into the snapshot store or compute the delta',
+            paths={'--export': ('export_file', 'export to import'),
+                   '--store': ('store_file', 'snapshot store'),
+                   '--delta': ('delta_file', 'Excel file with the new/changed records'),
+                   '--carried': ('carried_file', 'Excel file with the carried-over decisions'),
+                   '--decisions': ('decisions_file', 'Excel file with the previous decisions')},
+            options={'--mode': ('mode', ('diff', 'record_decisions'), 'diff an export or store the decisions'),
+                     '--source': ('source', str, 'source name of the export')}),
+
+    # --- Whole workflow ---
+    Command('pipeline', 'pipeline.py', None,
+            'run the stages that are out of date (see pipeline.py --help)'),
+    Command('benchmark', 'benchmarks/run_benchmarks.py', None,
+            'run the benchmark suite (see benchmarks/run_benchmarks.py --help)'),
+]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='slr.py', description='Systematic literature review tools.')
+    parser.add_argument('--profile', choices=('cprofile', 'sample'),
+                        help='profile the top-level stages (sets SLR_PROFILE)')
+    parser.add_argument('--telemetry', metavar='FILE',
+                        help='append telemetry events to FILE (sets SLR_TELEMETRY)')
+    subparsers = parser.add_subparsers(metavar='command', required=True)
+    for command in COMMANDS:
+        command.add_parser(subparsers)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command.function is not None:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    # slrkit.telemetry reads these when a script first imports it
+    if args.profile:
+        os.environ['SLR_PROFILE'] = args.profile
+    if args.telemetry:
+        os.environ['SLR_TELEMETRY'] = os.path.abspath(args.telemetry)
+    args.command.run(args, extra)
+
+
+if __name__ == '__main__':
+    main()
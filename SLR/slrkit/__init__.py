@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Shared helpers for the SLR scripts.
+
+The harvesting and screening scripts live in their own folders and are run
+from there, so they put SLR/ on sys.path before importing from here:
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from slrkit.excel_io import read_excel, write_excel
+"""
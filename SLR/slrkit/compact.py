@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-compact representation of the literature corpus.
+
+After merging, every title, abstract, author list and repeated label
+('inproceedings', 'IEEE', 'Yes', 'Include', ...) is a separate Python string
+in an object column. compact_frame() converts a DataFrame column by column:
+
+- low-cardinality text columns (entry type, publisher, source, decision
+  labels) become categoricals, storing each distinct value once,
+- author columns become Arrow lists of dictionary-encoded names, so every
+  author name is stored once however many papers list it (only when the
+  column splits and re-joins losslessly on its separator),
+- the remaining text (titles, abstracts, GPT comments) becomes Arrow-backed
+  strings, i.e. one contiguous buffer per column instead of a PyObject per cell.
+
+Without pyarrow only the categorical conversion is applied. restore_frame()
+turns author lists back into the original strings; write_excel() calls it.
+
+Running this file prints the memory report for the checked-in workbooks.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# A text column becomes categorical if it has at most this many distinct values per row
+CATEGORY_RATIO = 0.2
+# Columns holding author lists, and the separators tried for them (first lossless one wins)
+AUTHOR_COLUMNS = ['author', 'authors', 'Authors', 'Author Full Names']
+AUTHOR_SEPARATORS = ['; ', ' and ', ', ']
+# Where compact_frame() records the author separators, so restore_frame() can re-join them
+ATTRS_KEY = 'interned_authors'
+
+
+def _arrow_string_dtype():
+    """Arrow-backed string dtype with NaN as missing value (like object columns), or None."""
+    if pa is None:
+        return None
+    for make in (lambda: pd.StringDtype('pyarrow', na_value=np.nan),
+                 lambda: pd.StringDtype('pyarrow_numpy')):
+        try:
+            return make()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _is_text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype) or isinstance(series.dtype, getattr(pd, 'ArrowDtype', ())):
+        return False
+    if is_object_dtype(series.dtype):
+        # Mixed columns (e.g. page numbers read as int and str) are left alone
+        return series.dropna().map(type).eq(str).all()
+    return is_string_dtype(series.dtype)
+
+
+def _author_separator(values):
+    """The separator that splits and re-joins every value unchanged, or None."""
+    values = [v for v in values if isinstance(v, str)]
+    for separator in AUTHOR_SEPARATORS:
+        if any(separator in v for v in values) and \
+                all(separator.join(v.split(separator)) == v and '' not in v.split(separator) for v in values):
+            return separator
+    return None
+
+
+def intern_authors(series, separator):
+    """Author strings -> Arrow list<dictionary<string>>: each distinct name is stored once."""
+    lists = [v.split(separator) if isinstance(v, str) else None for v in series]
+    array = pa.array(lists, type=pa.list_(pa.string()))
+    names = array.flatten().dictionary_encode()
+    array = pa.ListArray.from_arrays(array.offsets, names, mask=array.is_null())
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=series.index, name=series.name)
+
+
+def compact_frame(df, exclude=(), category_ratio=CATEGORY_RATIO):
+    """
+    Returns a memory-compact copy of `df` (see module docstring).
+    Columns in `exclude` are left as they are, e.g. result columns that a
+    script fills with new values later.
+    """
+    df = df.copy()
+    string_dtype = _arrow_string_dtype()
+    separators = dict(df.attrs.get(ATTRS_KEY, {}))
+    for column in df.columns:
+        if column in exclude or not _is_text(df[column]):
+            continue
+        series = df[column]
+        non_null = series.notna().sum()
+        if non_null and series.nunique() <= category_ratio * non_null:
+            df[column] = series.astype('category')
+            continue
+        if pa is not None and column in AUTHOR_COLUMNS:
+            separator = _author_separator(series.tolist())
+            if separator:
+                df[column] = intern_authors(series, separator)
+                separators[column] = separator
+                continue
+        if string_dtype is not None and series.dtype != string_dtype:
+            df[column] = series.astype(string_dtype)
+    df.attrs[ATTRS_KEY] = separators
+    return df
+
+
+def restore_frame(df):
+    """Re-joins interned author lists into strings (for writing or libraries that need them)."""
+    separators = df.attrs.get(ATTRS_KEY, {})
+    if not separators:
+        return df
+    df = df.copy()
+    for column, separator in separators.items():
+        if column in df.columns:
+            df[column] = [separator.join(v) if v is not None and not (np.ndim(v) == 0 and pd.isna(v)) else np.nan
+                          for v in df[column]]
+    df.attrs[ATTRS_KEY] = {}
+    return df
+
+
+def set_cell(df, index, column, value):
+    """
+    df.at[index, column] = value that also works on compacted columns:
+    new labels are added to a categorical, and a value an Arrow string column
+    cannot hold turns the column back into object dtype.
+    """
+    if column not in df.columns:
+        df[column] = None
+        df[column] = df[column].astype(object)
+    dtype = df[column].dtype
+    if isinstance(dtype, pd.CategoricalDtype) and not pd.isna(value) and value not in dtype.categories:
+        df[column] = df[column].cat.add_categories([value])
+    try:
+        df.at[index, column] = value
+    except (TypeError, ValueError):
+        df[column] = df[column].astype(object)
+        df.at[index, column] = value
+
+
+def memory_mb(df):
+    """Deep memory use of a DataFrame in MB."""
+    return df.memory_usage(deep=True, index=False).sum() / 1e6
+
+
+class MemoryReport:
+    """Collects the memory use of the corpus at each stage of a script."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, stage, df):
+        self.rows.append({'Stage': stage, 'Rows': len(df), 'Columns': len(df.columns),
+                          'Memory (MB)': round(memory_mb(df), 2)})
+        return df
+
+    def to_frame(self):
+        return pd.DataFrame(self.rows)
+
+    def print_report(self):
+        print("\n--- Memory report ---")
+        print(self.to_frame().to_string(index=False))
+
+
+def column_report(before, after):
+    """Per-column memory before and after compaction."""
+    old = before.memory_usage(deep=True, index=False)
+    new = after.memory_usage(deep=True, index=False)
+    return pd.DataFrame({'Before (MB)': old / 1e6, 'After (MB)': new / 1e6,
+                         'dtype': after.dtypes.astype(str)}).round(3)
+
+
+if __name__ == "__main__":
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    rows = []
+    for path in sorted(glob.glob(os.path.join(base, '**', '*.xlsx'), recursive=True)):
+        if os.path.getsize(path) < 200_000:
+            continue
+        df = pd.read_excel(path, dtype=object)
+        compact = compact_frame(df)
+        rows.append({'Workbook': os.path.relpath(path, base), 'Rows': len(df),
+                     'Object (MB)': round(memory_mb(df), 2), 'Compact (MB)': round(memory_mb(compact), 2),
+                     'Categorical': sum(isinstance(t, pd.CategoricalDtype) for t in compact.dtypes),
+                     'Interned authors': ', '.join(compact.attrs[ATTRS_KEY]) or '-'})
+    pd.set_option('display.width', 200)
+    print(f"pyarrow: {'yes' if pa is not None else 'no (categoricals only)'}")
+    print(pd.DataFrame(rows).to_string(index=False))
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Fast Excel I/O for the merge and screening scripts.
+
+Reads go through the Rust-backed calamine engine (python-calamine) with
+optional column projection; writes stream the rows with xlsxwriter in
+constant_memory mode, so only the current row is kept in memory instead of
+openpyxl's full cell model. Both fall back to openpyxl (pandas' default)
+when the optional packages are not installed:
+
+    pip install python-calamine xlsxwriter
+
+Note that pandas' own to_excel(engine='xlsxwriter') writes column by column
+and therefore cannot be used with constant_memory; write_excel() writes row
+by row itself.
+
+Running this file times openpyxl against calamine/xlsxwriter on the
+checked-in workbooks.
+"""
+import datetime
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .compact import compact_frame, restore_frame
+
+try:
+    import python_calamine  # noqa: F401  (pandas' 'calamine' engine)
+    READ_ENGINE = 'calamine'
+except ImportError:
+    READ_ENGINE = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Excel cannot store longer strings in a cell (GPT comments and abstracts can get close)
+EXCEL_MAX_STRING = 32767
+DATE_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+# Workbook creation time written into docProps/core.xml. xlsxwriter stamps the current time by
+# default, which makes every re-run of a stage byte-different even when the cells are identical
+# (pipeline.py only skips downstream stages for byte-identical outputs).
+CREATED = datetime.datetime(2000, 1, 1)
+WORKBOOK_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_urls': False,      # DOIs/URLs stay plain text, like openpyxl writes them
+    'strings_to_numbers': False,
+    'strings_to_formulas': False,  # abstracts starting with '=' are text, not formulas
+}
+
+
+def read_excel(path, columns=None, sheet_name=0, compact=False, **kwargs):
+    """
+    pd.read_excel() through calamine when available.
+    `columns` limits the read to the given column names (column projection).
+    `compact=True` returns the memory-compact representation (see compact.py).
+    """
+    if columns is not None:
+        kwargs['usecols'] = lambda name: name in set(columns)
+    engine = READ_ENGINE if not str(path).lower().endswith('.xlsb') else 'calamine'
+    df = pd.read_excel(path, sheet_name=sheet_name, engine=engine, **kwargs)
+    return compact_frame(df) if compact else df
+
+
+def _cell(value):
+    """Converts a pandas/NumPy value into something xlsxwriter writes natively (None = blank)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:EXCEL_MAX_STRING]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) or np.isinf(value) else float(value)
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.to_pydatetime().replace(tzinfo=None)
+    if isinstance(value, (datetime.datetime, datetime.date, int)):
+        return value
+    if value is pd.NaT or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    return str(value)[:EXCEL_MAX_STRING]
+
+
+def _write_sheet(workbook, sheet_name, df, index=False):
+    worksheet = workbook.add_worksheet(sheet_name[:31])
+    date_format = workbook.add_format({'num_format': DATE_FORMAT})
+    header_format = workbook.add_format({'bold': True})
+    if index:
+        df = df.reset_index()
+    worksheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+    for row_number, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        for column_number, value in enumerate(row):
+            value = _cell(value)
+            if value is None:
+                continue
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                worksheet.write_datetime(row_number, column_number, value, date_format)
+            elif isinstance(value, str):
+                worksheet.write_string(row_number, column_number, value)
+            else:
+                worksheet.write(row_number, column_number, value)
+
+
+def _open_workbook(path):
+    """Streaming xlsxwriter workbook with reproducible document properties."""
+    workbook = xlsxwriter.Workbook(path, WORKBOOK_OPTIONS)
+    workbook.set_properties({'created': CREATED})
+    return workbook
+
+
+def write_excel_sheets(path, sheets, index=False):
+    """
+    Writes {sheet name: DataFrame} to one workbook, streaming row by row.
+    Falls back to pandas/openpyxl if xlsxwriter is not installed.
+    Interned author lists of compacted frames are written as the original strings.
+    """
+    sheets = {sheet_name: restore_frame(df) for sheet_name, df in sheets.items()}
+    if xlsxwriter is None:
+        with pd.ExcelWriter(path) as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=index)
+        return
+    # Write to a temporary file first so an interrupted run never leaves a truncated workbook
+    tmp_path = f"{path}.tmp.xlsx"
+    workbook = _open_workbook(tmp_path)
+    try:
+        for sheet_name, df in sheets.items():
+            _write_sheet(workbook, sheet_name, df, index)
+    finally:
+        workbook.close()
+    os.replace(tmp_path, path)
+
+
+def write_excel(df, path, sheet_name='Sheet1', index=False):
+    """df.to_excel(path, index=False) replacement with constant-memory streaming."""
+    write_excel_sheets(path, {sheet_name: df}, index)
+
+
+def csv_to_excel(csv_path, xlsx_path, encoding='utf-8-sig', chunksize=5000):
+    """
+    Converts a CSV file to .xlsx chunk by chunk, so the whole CSV is never
+    loaded at once. Returns the number of data rows written.
+    """
+    chunks = pd.read_csv(csv_path, encoding=encoding, chunksize=chunksize)
+    if xlsxwriter is None:
+        df = pd.concat(chunks, ignore_index=True)
+        df.to_excel(xlsx_path, index=False)
+        return len(df)
+    tmp_path = f"{xlsx_path}.tmp.xlsx"
+    workbook = _open_workbook(tmp_path)
+    worksheet = workbook.add_worksheet('Sheet1')
+    rows = 0
+    try:
+        for number, chunk in enumerate(chunks):
+            if number == 0:
+                worksheet.write_row(0, 0, [str(c) for c in chunk.columns], workbook.add_format({'bold': True}))
+            for row in chunk.itertuples(index=False, name=None):
+                rows += 1
+                for column_number, value in enumerate(row):
+                    value = _cell(value)
+                    if value is not None:
+                        worksheet.write(rows, column_number, value)
+    finally:
+        workbook.close()
+    os.replace(tmp_path, xlsx_path)
+    return rows
+
+
+# --- Timings ---
+
+def benchmark(paths, repeat=1):
+    """Times openpyxl vs. calamine reads and openpyxl vs. streaming writes per workbook."""
+    rows = []
+    for path in paths:
+        timings = {'Workbook': os.path.relpath(path)}
+        start = time.perf_counter()
+        for _ in range(repeat):
+            df = pd.read_excel(path, engine='openpyxl')
+        timings['Read openpyxl (s)'] = (time.perf_counter() - start) / repeat
+        if READ_ENGINE:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                read_excel(path)
+            timings['Read calamine (s)'] = (time.perf_counter() - start) / repeat
+
+        out_path = os.path.join(os.path.dirname(os.path.abspath(path)), '_excel_io_benchmark.xlsx')
+        try:
+            start = time.perf_counter()
+            df.to_excel(out_path, index=False, engine='openpyxl')
+            timings['Write openpyxl (s)'] = time.perf_counter() - start
+            if xlsxwriter is not None:
+                start = time.perf_counter()
+                write_excel(df, out_path)
+                timings['Write streaming (s)'] = time.perf_counter() - start
+        finally:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+        timings['Rows'] = len(df)
+        timings['Columns'] = len(df.columns)
+        rows.append(timings)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    workbooks = sorted(p for p in glob.glob(os.path.join(base, '**', '*.xlsx'), recursive=True)
+                       if os.path.getsize(p) > 200_000)
+    print(f"Read engine: {READ_ENGINE or 'openpyxl'}, writer: {'xlsxwriter' if xlsxwriter else 'openpyxl'}")
+    result = benchmark(workbooks)
+    pd.set_option('display.width', 200)
+    print(result.round(2).to_string(index=False))
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent, resumable paging over bibliographic search APIs.
+
+The dblp and Springer stages started from exports downloaded by hand, one
+file per query, year and result page. The API harvesters
+(dblp/dblp_api_harvest.py, springer/springer_api_harvest.py) describe a
+search API as a Source (how to request a page, how to read one) and this
+module does the paging:
+
+- All queries and their pages are fetched concurrently on an asyncio event
+  loop, under a per-host limit: at most `concurrency` requests in flight and
+  at least `interval` seconds between two request starts. 429 and 5xx
+  replies are retried with exponential backoff, honouring Retry-After.
+- Progress is persisted in a HarvestCursor: every page's records are
+  appended to <cursor>.jsonl and the page is marked done in <cursor>.json,
+  so an interrupted harvest resumes with the pages that are still missing.
+- With SLR_HARVEST_RECORD=<folder> every response body is also saved under
+  recording_key(); the benchmark stub server (benchmarks/stub_servers.py)
+  replays such a folder, so the harvesters can be tested offline against
+  recorded responses.
+
+    source = Source('dblp', DBLP_API_URL, dblp_params, parse_dblp_page, page_size=1000)
+    for query, record in harvest(source, queries, HarvestCursor('dblp_harvest')):
+        ...
+
+HTTP goes through requests like in the other scripts; its blocking calls run
+in the event loop's thread pool.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+import requests
+
+from . import telemetry
+
+# Folder in which every response is saved for replay ('' = do not record)
+RECORD_DIR = os.environ.get('SLR_HARVEST_RECORD', '')
+# Request parameters that do not identify a response (not part of the recording key)
+UNKEYED_PARAMS = ('api_key',)
+RETRIES = 5
+TIMEOUT = 30
+# Replies that are worth retrying; any other error status fails the page at once
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def recording_key(url, params):
+    """File name of the recorded response for a request (path and sorted parameters, hashed)."""
+    keyed = sorted((name, str(value)) for name, value in params.items() if name not in UNKEYED_PARAMS)
+    text = urlparse(url).path.rstrip('/') + '?' + urlencode(keyed)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:20] + '.json'
+
+
+class Source:
+    """
+    A paged search API.
+
+    name:         label for progress lines and telemetry
+    url:          endpoint
+    params:       function(query, offset, page_size) -> request parameters
+    parse:        function(JSON reply) -> (total number of hits, list of records)
+    page_size:    hits per request
+    first_offset: offset of the first hit (0 for dblp, 1 for Springer)
+    max_hits:     the API serves no hits beyond this many (None = no limit)
+    concurrency:  requests in flight at the same time
+    interval:     seconds between two request starts
+    """
+
+    def __init__(self, name, url, params, parse, page_size, first_offset=0, max_hits=None,
+                 concurrency=2, interval=1.0):
+        self.name = name
+        self.url = url
+        self.params = params
+        self.parse = parse
+        self.page_size = page_size
+        self.first_offset = first_offset
+        self.max_hits = max_hits
+        self.concurrency = concurrency
+        self.interval = interval
+
+    def offsets(self, total):
+        """Offsets of all pages of a query with `total` hits."""
+        if self.max_hits is not None:
+            total = min(total, self.max_hits)
+        return list(range(self.first_offset, self.first_offset + total, self.page_size))
+
+
+class HostLimiter:
+    """At most `concurrency` requests in flight and `interval` seconds between request starts."""
+
+    def __init__(self, concurrency, interval):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.interval = interval
+        self.next_start = 0.0
+
+    def pause(self, seconds):
+        """Holds back all requests for `seconds` (after a 429 from the host)."""
+        self.next_start = max(self.next_start, time.monotonic() + seconds)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class HarvestCursor:
+    """
+    Persisted progress of a harvest.
+
+    <path>.json   per query: total hits and the pages fetched ({offset: page id})
+    <path>.jsonl  one line per harvested record: query, offset, page id, record
+
+    A page counts as fetched once its id is in the .json file; records of a
+    page that was written but not marked (interrupted run) are ignored and
+    the page is fetched again.
+    """
+
+    def __init__(self, path):
+        self.state_file = path + '.json'
+        self.records_file = path + '.jsonl'
+        self.state = {}
+        if os.path.exists(self.state_file):
+            with open(self.state_file, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def total(self, query):
+        return self.state.get(query, {}).get('total')
+
+    def done(self, query):
+        return {int(offset) for offset in self.state.get(query, {}).get('pages', {})}
+
+    def add_page(self, query, offset, total, records):
+        page_id = uuid.uuid4().hex[:12]
+        with open(self.records_file, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({'query': query, 'offset': offset, 'page': page_id, 'record': record},
+                                   ensure_ascii=False) + '\n')
+        entry = self.state.setdefault(query, {'total': total, 'pages': {}})
+        entry['total'] = total
+        entry['pages'][str(offset)] = page_id
+        self._save()
+
+    def records(self, queries):
+        """[(query, record)] of all fetched pages, in query order and then page order."""
+        order = {query: i for i, query in enumerate(queries)}
+        rows = []
+        if not os.path.exists(self.records_file):
+            return rows
+        with open(self.records_file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut off by an interrupted run
+                pages = self.state.get(row['query'], {}).get('pages', {})
+                if row['query'] in order and pages.get(str(row['offset'])) == row['page']:
+                    rows.append(row)
+        rows.sort(key=lambda row: (order[row['query']], row['offset']))
+        return [(row['query'], row['record']) for row in rows]
+
+    def reset(self):
+        self.state = {}
+        for path in (self.state_file, self.records_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _save(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(temp_file, self.state_file)
+
+
+def _save_recording(url, params, body):
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    with open(os.path.join(RECORD_DIR, recording_key(url, params)), 'wb') as f:
+        f.write(body)
+
+
+async def fetch_page(source, limiter, session, query, offset):
+    """The JSON reply for one page, or None if the page failed (it is retried on the next run)."""
+    params = source.params(query, offset, source.page_size)
+    loop = asyncio.get_running_loop()
+    for attempt in range(RETRIES):
+        response, error = None, None
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                response = await loop.run_in_executor(
+                    None, lambda: session.get(source.url, params=params, timeout=TIMEOUT))
+            except requests.RequestException as e:
+                error = type(e).__name__
+        elapsed = time.perf_counter() - started
+
+        if response is not None and response.status_code == 200:
+            telemetry.count('bytes_fetched', len(response.content))
+            telemetry.record_call(f'{source.name}.fetch_page', elapsed)
+            if RECORD_DIR:
+                _save_recording(source.url, params, response.content)
+            return response.json()
+
+        telemetry.record_call(f'{source.name}.fetch_page', elapsed, ok=False)
+        if response is not None:
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUS:
+                break
+        delay = 2 ** attempt + random.random()
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = int(retry_after)
+        if response is not None and response.status_code == 429:
+            limiter.pause(delay)
+        telemetry.count('retries', source=source.name, error=error)
+        await asyncio.sleep(delay)
+
+    telemetry.count('failed_pages', source=source.name, error=error)
+    print(f" -> {source.name}: page {offset} of '{query}' failed ({error}), skipped until the next run.")
+    return None
+
+
+async def _harvest_query(source, limiter, session, cursor, query, pending):
+    total = cursor.total(query)
+    if total is None:
+        payload = await fetch_page(source, limiter, session, query, source.first_offset)
+        if payload is None:
+            return
+        total, records = source.parse(payload)
+        cursor.add_page(query, source.first_offset, total, records)
+        print(f" -> {source.name} '{query}': {total} hits")
+        if source.max_hits is not None and total > source.max_hits:
+            print(f"    only the first {source.max_hits} hits are served by the API; split the query further.")
+
+    done = cursor.done(query)
+    offsets = [offset for offset in source.offsets(total) if offset not in done]
+    pending[query] = len(offsets)
+
+    async def fetch_and_store(offset):
+        payload = await fetch_page(source, limiter, session, query, offset)
+        pending[query] -= 1
+        telemetry.gauge('queue_depth', sum(pending.values()))
+        if payload is not None:
+            page_total, records = source.parse(payload)
+            cursor.add_page(query, offset, page_total, records)
+
+    await asyncio.gather(*(fetch_and_store(offset) for offset in offsets))
+
+
+async def _harvest(source, queries, cursor):
+    limiter = HostLimiter(source.concurrency, source.interval)
+    pending = {}
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=source.concurrency) as executor, requests.Session() as session:
+        loop.set_default_executor(executor)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=source.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        await asyncio.gather(*(_harvest_query(source, limiter, session, cursor, query, pending)
+                               for query in queries))
+
+
+def harvest(source, queries, cursor):
+    """
+    Fetches every page of every query that `cursor` does not have yet and
+    returns [(query, record)] for all queries, in query order.
+    """
+    with telemetry.stage(f'{source.name}.harvest') as stage_info:
+        asyncio.run(_harvest(source, queries, cursor))
+        results = cursor.records(queries)
+        stage_info['records'] = len(results)
+    return results
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Stage timers, per-call timers and structured throughput telemetry.
+
+Every script reports progress with its own print lines, which does not tell
+where the time of a multi-hour run goes. This module gives all scripts the
+same instrumentation:
+
+    from slrkit import telemetry
+
+    @telemetry.timed('arxiv.fetch_query', records=len)
+    def fetch_papers_for_query(...): ...        # one 'call' event per call
+
+    with telemetry.stage('screen.inclusion', records=len(df)) as info:
+        ...                                     # one 'stage' event, optionally profiled
+        telemetry.count('retries')              # counters: retries, bytes_fetched, cache hits
+        telemetry.gauge('queue_depth', remaining)
+
+    telemetry.print_summary()
+
+When SLR_TELEMETRY names a file (slr.py --telemetry FILE sets it, and
+pipeline.py uses telemetry.jsonl next to itself), events are appended to it
+as JSON lines (one line per call, stage, sampled gauge and per-run summary),
+so runs can be compared with pandas.read_json(path, lines=True). The summary
+is also written when a script exits early.
+
+Environment variables:
+    SLR_TELEMETRY      events file (unset or '' = no file, the in-memory summary still works)
+    SLR_PROFILE        'cprofile' or 'sample' profiles every top-level stage
+    SLR_PROFILE_DIR    where the profiles go (.prof for cProfile/snakeviz,
+                       .folded stacks for flamegraph.pl/speedscope)
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+TELEMETRY_FILE = os.environ.get('SLR_TELEMETRY', '')
+PROFILE = os.environ.get('SLR_PROFILE', '').lower()
+PROFILE_DIR = os.environ.get('SLR_PROFILE_DIR', 'profiles')
+# Sampling profiler interval (seconds) and how many functions the profile printouts list
+SAMPLE_INTERVAL = 0.005
+PROFILE_TOP = 15
+# Gauges (e.g. queue depth) are written to the events file at most this often (seconds)
+GAUGE_INTERVAL = 5.0
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class _Sampler(threading.Thread):
+    """Samples the stack of one thread every `interval` seconds (pure-Python sampling profiler)."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+    def top(self, n=PROFILE_TOP):
+        """Functions with the most samples, by own time and by inclusive time."""
+        own, inclusive = Counter(), Counter()
+        for stack, samples in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += samples
+            for name in set(frames):
+                inclusive[name] += samples
+        return own.most_common(n), inclusive.most_common(n)
+
+
+class Telemetry:
+    """
+    Collects call timings, stages, counters and gauges of one run and
+    appends them as JSON lines to `path` (None = keep them in memory only).
+    """
+
+    def __init__(self, path=TELEMETRY_FILE, profile=PROFILE, profile_dir=PROFILE_DIR):
+        self.path = path or None
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.run_id = uuid.uuid4().hex[:12]
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'interactive'
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stages = []
+        self.counters = Counter()
+        self.gauges = {}
+        self.stage_depth = 0
+        self.summary_written = False
+        self.pid = os.getpid()
+
+    # --- Events ---
+
+    def event(self, kind, name, **fields):
+        """Appends one event line ({ts, run, script, event, name, ...fields})."""
+        if not self.path or os.getpid() != self.pid:
+            return  # forked workers keep their numbers to themselves
+        line = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'run': self.run_id,
+                'script': self.script, 'event': kind, 'name': name, **fields}
+        data = json.dumps(line, ensure_ascii=False, default=str) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+
+    def count(self, name, value=1, **fields):
+        """Adds to a counter (retries, bytes_fetched, cache hits...); `fields` also log an event."""
+        with self.lock:
+            self.counters[name] += value
+        if fields:
+            self.event('count', name, value=value, **fields)
+
+    def gauge(self, name, value):
+        """Records the current value of a level (e.g. queue depth); sampled into the events file."""
+        now = time.perf_counter()
+        with self.lock:
+            gauge = self.gauges.setdefault(name, {'last': value, 'max': value, 'written': None})
+            gauge['last'] = value
+            gauge['max'] = max(gauge['max'], value)
+            write = gauge['written'] is None or now - gauge['written'] >= GAUGE_INTERVAL
+            if write:
+                gauge['written'] = now
+        if write:
+            self.event('gauge', name, value=value)
+
+    # --- Timers ---
+
+    def record_call(self, name, seconds, ok=True, records=None, **fields):
+        with self.lock:
+            stats = self.calls.setdefault(name, {'durations': [], 'errors': 0, 'records': 0})
+            stats['durations'].append(seconds)
+            stats['errors'] += 0 if ok else 1
+            stats['records'] += records or 0
+        extra = {'records': records} if records is not None else {}
+        self.event('call', name, seconds=round(seconds, 4), ok=ok, **extra, **fields)
+
+    def timed(self, name=None, records=None, failed=None):
+        """
+        Decorator: times every call of the function. `records` maps the
+        return value to the number of records it produced (e.g. len);
+        `failed` tells from the return value whether the call failed (for
+        functions that return an error marker instead of raising).
+        """
+        def decorate(function):
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = function(*args, **kwargs)
+                except BaseException:
+                    self.record_call(label, time.perf_counter() - start, ok=False)
+                    raise
+                seconds = time.perf_counter() - start
+                count = None
+                if records is not None:
+                    try:
+                        count = records(result)
+                    except Exception:
+                        count = None
+                self.record_call(label, seconds, ok=not (failed and failed(result)), records=count)
+                return result
+            return wrapper
+        return decorate
+
+    @contextmanager
+    def stage(self, name, records=None):
+        """
+        Times a pipeline stage. `records` gives the records/s of the stage;
+        if it is only known at the end, set it on the yielded dict
+        (info['records'] = n). Top-level stages are profiled when profiling
+        is enabled.
+        """
+        profiler = self._start_profiler() if self.stage_depth == 0 else None
+        self.stage_depth += 1
+        counters_before = Counter(self.counters)
+        info = {'records': records}
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield info
+            ok = True
+        finally:
+            seconds = time.perf_counter() - start
+            records = info['records']
+            self.stage_depth -= 1
+            profile_path = self._stop_profiler(profiler, name)
+            counters = {key: value for key, value in (self.counters - counters_before).items()}
+            row = {'stage': name, 'seconds': round(seconds, 3), 'records': records, 'ok': ok,
+                   'records_per_s': round(records / seconds, 2) if records and seconds > 0 else None}
+            with self.lock:
+                self.stages.append(row)
+            self.event('stage', name, seconds=row['seconds'], records=records, ok=ok,
+                       records_per_s=row['records_per_s'], counters=counters,
+                       **({'profile': profile_path} if profile_path else {}))
+
+    # --- Profiling ---
+
+    def _start_profiler(self):
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profile == 'sample':
+            sampler = _Sampler(threading.get_ident())
+            sampler.start()
+            return sampler
+        return None
+
+    def _stop_profiler(self, profiler, name):
+        """Stops the profiler, saves it to PROFILE_DIR and prints the hottest functions."""
+        if profiler is None:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, f"{name.replace('/', '_')}_{self.run_id}")
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = base + '.prof'
+            profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            print(f"\n--- cProfile: {name} ({path}) ---\n{out.getvalue()}")
+            return path
+        profiler.stop()
+        path = base + '.folded'
+        profiler.write_folded(path)
+        own, inclusive = profiler.top()
+        total = sum(profiler.stacks.values()) or 1
+        print(f"\n--- Sampling profile: {name} ({total} samples, {path}) ---")
+        print(f"{'own %':>7} {'total %':>8}  function")
+        inclusive = dict(inclusive)
+        for function, samples in own:
+            print(f"{100 * samples / total:7.1f} {100 * inclusive.get(function, samples) / total:8.1f}  {function}")
+        return path
+
+    # --- Summary ---
+
+    def summary(self):
+        with self.lock:
+            calls = {}
+            for name, stats in self.calls.items():
+                durations = stats['durations']
+                total = sum(durations)
+                calls[name] = {
+                    'calls': len(durations), 'errors': stats['errors'], 'total_s': round(total, 3),
+                    'mean_s': round(total / len(durations), 4),
+                    'p50_s': round(_percentile(durations, 0.5), 4),
+                    'p95_s': round(_percentile(durations, 0.95), 4),
+                    'max_s': round(max(durations), 4),
+                    'records': stats['records'] or None,
+                    'records_per_s': round(stats['records'] / total, 2) if stats['records'] and total else None,
+                }
+            return {'run': self.run_id, 'script': self.script,
+                    'wall_s': round(time.perf_counter() - self.started, 3),
+                    'stages': list(self.stages), 'calls': calls, 'counters': dict(self.counters),
+                    'gauges': {name: {'last': g['last'], 'max': g['max']} for name, g in self.gauges.items()}}
+
+    def write_summary(self):
+        """Appends the 'summary' event (once per run)."""
+        if self.summary_written or not (self.calls or self.stages or self.counters):
+            return
+        self.summary_written = True
+        summary = self.summary()
+        self.event('summary', self.script, **{key: summary[key] for key in
+                                               ('wall_s', 'stages', 'calls', 'counters', 'gauges')})
+
+    def print_summary(self):
+        """Prints the stage and call tables and writes the summary event."""
+        summary = self.summary()
+        print(f"\n--- Telemetry ({summary['script']}, run {summary['run']}, {summary['wall_s']:.1f}s) ---")
+        for row in summary['stages']:
+            rate = f"  {row['records_per_s']} rec/s" if row['records_per_s'] else ''
+            print(f"[stage] {row['stage']}: {row['seconds']:.2f}s{rate}{'' if row['ok'] else '  (failed)'}")
+        for name, stats in sorted(summary['calls'].items(), key=lambda item: -item[1]['total_s']):
+            rate = f"  {stats['records_per_s']} rec/s" if stats['records_per_s'] else ''
+            print(f"[call] {name}: n={stats['calls']} errors={stats['errors']} total={stats['total_s']:.2f}s "
+                  f"p50={stats['p50_s']:.3f}s p95={stats['p95_s']:.3f}s max={stats['max_s']:.3f}s{rate}")
+        if summary['counters']:
+            print("[counters] " + ', '.join(f"{name}={value}" for name, value in sorted(summary['counters'].items())))
+        for name, gauge in summary['gauges'].items():
+            print(f"[gauge] {name}: last={gauge['last']} max={gauge['max']}")
+        self.write_summary()
+
+
+TELEMETRY = Telemetry()
+atexit.register(TELEMETRY.write_summary)
+
+# Module-level shortcuts for the default instance
+event = TELEMETRY.event
+count = TELEMETRY.count
+gauge = TELEMETRY.gauge
+record_call = TELEMETRY.record_call
+timed = TELEMETRY.timed
+stage = TELEMETRY.stage
+summary = TELEMETRY.summary
+print_summary = TELEMETRY.print_summary
+
+
+if __name__ == "__main__":
+    # Summarises an events file: per-run wall time and the slowest calls
+    import pandas as pd
+    path = sys.argv[1] if len(sys.argv) > 1 else (TELEMETRY_FILE or 'telemetry.jsonl')
+    events = pd.read_json(path, lines=True)
+    calls = events[events['event'] == 'call']
+    if calls.empty:
+        print(f"No call events in {path}.")
+    else:
+        table = calls.groupby(['script', 'name'])['seconds'].agg(['count', 'sum', 'mean', 'median', 'max'])
+        table['p95'] = calls.groupby(['script', 'name'])['seconds'].quantile(0.95)
+        pd.set_option('display.width', 200)
+        print(table.sort_values('sum', ascending=False).round(3).to_string())
+    stages = events[events['event'] == 'stage']
+    if not stages.empty:
+        print()
+        print(stages[['ts', 'script', 'name', 'seconds', 'records', 'records_per_s']].to_string(index=False))
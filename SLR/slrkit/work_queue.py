@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Lease-based work queue in a SQLite file, shared by worker processes and machines.
+
+A single screening process over 1.5k+ records is slow, and two copies
+writing the same OUTPUT_FILE overwrite each other's progress. With a
+WorkQueue every record is a task keyed by its record key, and any number of
+workers (processes on one machine, or machines sharing the queue file)
+take tasks from it:
+
+- claim() leases up to `batch_size` pending tasks to one worker inside a
+  write transaction, so no two workers hold the same task. A lease expires
+  after `lease_seconds`; tasks of a crashed worker then go back to whoever
+  claims next, until the task has been claimed `max_attempts` times. A task
+  whose lease keeps expiring (e.g. one that crashes every worker) is then
+  given up as 'failed' without a result instead of being claimed forever.
+- renew() extends the leases a worker still holds (call it before every
+  paid request) and tells it which tasks it has lost, so a task is only
+  worked on by one worker at a time.
+- complete() stores the result by task key. Only the worker holding the
+  lease can complete a task, so a late worker whose lease expired cannot
+  overwrite or reset it; failed tasks go back to the queue until
+  `max_attempts` is reached.
+
+    queue = WorkQueue('ec78_queue.sqlite')
+    queue.enqueue({key: payload, ...})          # idempotent, done tasks stay done
+    while batch := queue.claim(worker, 10):
+        for key, payload in batch:
+            if key in queue.renew(worker, [key]):
+                queue.complete(worker, key, work(payload))
+    results = queue.results()
+
+Payloads and results are stored as JSON. The file has to be on a disk with
+working file locks (a local disk, or NFS/SMB with locking); the default
+rollback journal is used because WAL does not work across machines.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+
+# Seconds a claimed task stays with its worker without a renew()
+LEASE_SECONDS = 300
+# Claims per task before a failing task is given up ('failed')
+MAX_ATTEMPTS = 3
+# Seconds a locked database is waited for
+BUSY_TIMEOUT = 60
+
+
+def worker_name():
+    """Default worker id: host name and process id."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Tasks (key -> payload) with status 'pending', 'leased', 'done' or 'failed'."""
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Transactions are opened explicitly (BEGIN IMMEDIATE takes the write lock up front)
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS tasks (
+            key TEXT PRIMARY KEY, payload TEXT, status TEXT DEFAULT 'pending', worker TEXT,
+            lease_until REAL, attempts INTEGER DEFAULT 0, result TEXT, finished_at REAL)""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until)")
+
+    def _transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def enqueue(self, tasks):
+        """Adds {key: payload}; keys already in the queue keep their state. Returns the number added."""
+        connection = self._transaction()
+        try:
+            before = connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+            connection.executemany("INSERT OR IGNORE INTO tasks (key, payload) VALUES (?, ?)",
+                                   [(key, json.dumps(payload, ensure_ascii=False)) for key, payload in tasks.items()])
+            added = connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] - before
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return added
+
+    def claim(self, worker, batch_size):
+        """
+        Leases up to `batch_size` pending (or expired) tasks to `worker`. Expired
+        tasks that have already been claimed `max_attempts` times are marked
+        'failed' instead. Returns [(key, payload)].
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            connection.execute("UPDATE tasks SET status = 'failed', finished_at = ? "
+                               "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                               (now, now, self.max_attempts))
+            rows = connection.execute(
+                "SELECT key, payload FROM tasks WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY rowid LIMIT ?", (now, batch_size)).fetchall()
+            connection.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE key = ?",
+                [(worker, now + self.lease_seconds, key) for key, _ in rows])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def renew(self, worker, keys):
+        """Extends the leases of `keys` held by `worker`. Returns the set of keys it still holds."""
+        keys = list(keys)
+        held = set()
+        connection = self._transaction()
+        try:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                connection.execute(
+                    f"UPDATE tasks SET lease_until = ? WHERE status = 'leased' AND worker = ? AND key IN ({placeholders})",
+                    [time.time() + self.lease_seconds, worker] + chunk)
+                held.update(key for (key,) in connection.execute(
+                    f"SELECT key FROM tasks WHERE status = 'leased' AND worker = ? AND key IN ({placeholders})",
+                    [worker] + chunk))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return held
+
+    def complete(self, worker, key, result, failed=False):
+        """
+        Stores the result of a task leased to `worker`. A failed task goes back to
+        'pending' until it has been claimed `max_attempts` times, then it is kept
+        as 'failed'. Returns False (and stores nothing) if `worker` no longer
+        holds the lease, e.g. because it expired and another worker claimed the task.
+        """
+        connection = self._transaction()
+        try:
+            row = connection.execute("SELECT status, attempts FROM tasks WHERE key = ? AND worker = ?",
+                                     (key, worker)).fetchone()
+            if row is None or row[0] != 'leased':
+                connection.execute("COMMIT")
+                return False
+            if failed and row[1] < self.max_attempts:
+                connection.execute("UPDATE tasks SET status = 'pending', worker = NULL, lease_until = NULL "
+                                   "WHERE key = ?", (key,))
+            else:
+                connection.execute("UPDATE tasks SET status = ?, worker = ?, result = ?, finished_at = ? WHERE key = ?",
+                                   ('failed' if failed else 'done', worker,
+                                    json.dumps(result, ensure_ascii=False), time.time(), key))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return True
+
+    def release(self, worker, keys):
+        """Gives back the leases of `keys` (e.g. when a worker is stopped with Ctrl+C)."""
+        keys = list(keys)
+        if not keys:
+            return
+        self.connection.execute(
+            f"UPDATE tasks SET status = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+            f"WHERE status = 'leased' AND worker = ? AND key IN ({','.join('?' * len(keys))})", [worker] + keys)
+
+    def counts(self):
+        """{status: number of tasks}."""
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def open_tasks(self):
+        """Number of tasks that are pending or leased (possibly to a crashed worker)."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def results(self):
+        """{key: result} of the finished ('done' and 'failed') tasks; tasks given up in claim() have none."""
+        return {key: json.loads(result) for key, result in self.connection.execute(
+            "SELECT key, result FROM tasks WHERE status IN ('done', 'failed') AND result IS NOT NULL")}
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized trade-off engine over the decision-model matrix.
+
+decisionmodel matrix.xlsx rates every functional design option (rows, grouped
+by functional category) against the non-functional qualities (columns) on a
+"--" ... "++" scale, with free-text rationales. This script parses it into a
+numeric NumPy matrix (options x qualities) and answers questions like
+
+    "Which combinations of one design option per category are Pareto-optimal
+     for Reliability, Security and Maintainability, given that Usability must
+     not be negative on average and UI Understanding is ruled out?"
+
+Combinations are enumerated category by category while keeping only the
+Pareto frontier of partial quality sums (plus branch-and-bound pruning on the
+quality constraints), so the work grows with the size of the frontier rather
+than with the product of all option counts. Options dominated by another
+option of the same category are dropped before the enumeration starts.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+MATRIX_FILE = 'decisionmodel matrix.xlsx'
+HEADER_ROW = 1  # the first row holds the description of the matrix
+CATEGORY_COLUMN = 'Functional Category'
+OPTION_COLUMN = 'Design Option'
+OUTPUT_FILE = 'pareto_configurations.xlsx'
+
+# Rating scale used in the matrix ("o/-" = neutral to negative)
+RATING_SCALE = {'++': 2.0, '+': 1.0, 'o/+': 0.5, 'o': 0.0, 'o/-': -0.5, '-': -1.0, '--': -2.0}
+_RATING_PATTERN = re.compile(r'^\s*(\+\+|--|o/\+|o/-|\+|-|o)(?=[\s:]|$)')
+
+
+def parse_rating(cell):
+    """
+    Converts a matrix cell such as "-- Efficiency: ... <br> ++ Accuracy: ..."
+    into a number: the mean of the ratings that start each segment.
+    Returns NaN for an empty or unrated cell.
+    """
+    if not isinstance(cell, str):
+        return np.nan
+    ratings = []
+    for segment in re.split(r'<br\s*/?>|\n', cell):
+        match = _RATING_PATTERN.match(segment)
+        if match:
+            ratings.append(RATING_SCALE[match.group(1)])
+    return float(np.mean(ratings)) if ratings else np.nan
+
+
+def pareto_mask(points, block_size=256):
+    """
+    Returns a boolean mask of the rows of `points` that are not dominated
+    (higher is better in every column) and not an exact copy of an earlier row.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return keep
+    # Identical quality profiles are interchangeable: keep the first of each
+    _, first = np.unique(points, axis=0, return_index=True)
+    # Visiting points by decreasing total means a point can only be dominated
+    # by one that was visited before it, so the frontier only ever grows
+    order = first[np.argsort(-points[first].sum(axis=1), kind='stable')]
+    frontier = np.empty((len(order), points.shape[1]))
+    size = 0
+    for start in range(0, len(order), block_size):
+        block = order[start:start + block_size]
+        candidates = points[block]
+        # Compare the whole block against the frontier found so far in one step
+        if size:
+            dominated = np.zeros(len(block), dtype=bool)
+            for chunk in range(0, size, 4096):
+                f = frontier[chunk:min(size, chunk + 4096)]
+                dominated |= np.all(f[:, None, :] >= candidates[None, :, :], axis=2).any(axis=0)
+            block, candidates = block[~dominated], candidates[~dominated]
+        # Within the block a point can only be dominated by an earlier (larger-total)
+        # point; by transitivity it does not matter whether that point was kept
+        within = np.all(candidates[:, None, :] >= candidates[None, :, :], axis=2)
+        np.fill_diagonal(within, False)
+        survivors = ~within.any(axis=0)
+        keep[block[survivors]] = True
+        frontier[size:size + survivors.sum()] = candidates[survivors]
+        size += int(survivors.sum())
+    return keep
+
+
+class DecisionModel:
+    """
+    Numeric view of the decision-model matrix.
+
+    Attributes:
+        options:    design option names (one per matrix row)
+        categories: functional category of each option
+        qualities:  non-functional quality names (matrix columns)
+        scores:     float array (options x qualities), NaN where unrated
+        rationales: DataFrame with the original cell text
+    """
+
+    def __init__(self, df):
+        df = df.dropna(subset=[OPTION_COLUMN]).copy()
+        df[CATEGORY_COLUMN] = df[CATEGORY_COLUMN].ffill()
+        self.qualities = [c for c in df.columns if c not in (CATEGORY_COLUMN, OPTION_COLUMN)]
+        self.options = [str(o).strip() for o in df[OPTION_COLUMN]]
+        self.categories = [str(c).strip() for c in df[CATEGORY_COLUMN]]
+        self.rationales = df.set_index(OPTION_COLUMN)[self.qualities]
+        self.scores = np.array([[parse_rating(cell) for cell in row]
+                                for row in df[self.qualities].itertuples(index=False)], dtype=float)
+
+    @classmethod
+    def from_excel(cls, path=MATRIX_FILE):
+        return cls(pd.read_excel(path, header=HEADER_ROW))
+
+    def matrix(self):
+        """The numeric matrix as a DataFrame (options x qualities)."""
+        return pd.DataFrame(self.scores, index=self.options, columns=self.qualities)
+
+    def option_groups(self, categories=None, groups=None):
+        """
+        Returns {group name: [option indices]}. By default one option is chosen
+        per functional category; `groups` ({name: [option names]}) overrides this,
+        e.g. to split "Memory" into memory type, format and operation.
+        """
+        if groups is not None:
+            return {name: [self.options.index(o) for o in names] for name, names in groups.items()}
+        result = {}
+        for i, category in enumerate(self.categories):
+            if categories is None or category in categories:
+                result.setdefault(category, []).append(i)
+        return result
+
+    def pareto_configurations(self, weights=None, min_quality=None, categories=None, groups=None,
+                              required=(), excluded=(), incompatible=(), top=None):
+        """
+        Enumerates compatible combinations of one design option per group and
+        returns the Pareto-optimal ones, sorted by weighted score.
+
+        weights:      {quality: weight}; qualities with weight > 0 are the objectives
+                      (all qualities if omitted)
+        min_quality:  {quality: minimum mean rating of the configuration}
+        categories:   restrict to these functional categories
+        groups:       explicit choice groups (see option_groups)
+        required:     option names that must be part of the configuration
+        excluded:     option names that must not be used
+        incompatible: pairs of option names that cannot be combined
+        top:          return only the best `top` configurations
+        """
+        weights = weights or {q: 1.0 for q in self.qualities}
+        min_quality = min_quality or {}
+        objectives = [q for q in self.qualities if weights.get(q, 0) > 0]
+        tracked = objectives + [q for q in min_quality if q not in objectives]
+        columns = [self.qualities.index(q) for q in tracked]
+        scores = np.nan_to_num(self.scores[:, columns])
+
+        required = {self.options.index(o) for o in required}
+        excluded = {self.options.index(o) for o in excluded}
+        incompatible = [(self.options.index(a), self.options.index(b)) for a, b in incompatible]
+        conflicts = {}
+        for a, b in incompatible:
+            conflicts.setdefault(a, set()).add(b)
+            conflicts.setdefault(b, set()).add(a)
+
+        group_options = []
+        for name, members in self.option_groups(categories, groups).items():
+            members = [i for i in members if i not in excluded]
+            forced = [i for i in members if i in required]
+            if forced:
+                members = forced
+            if not members:
+                raise ValueError(f"No design option left in group '{name}'")
+            # An option dominated by another option of the same group can never be
+            # part of a Pareto-optimal configuration (unless it is in a conflict pair)
+            members = np.array(members)
+            free = np.array([i not in conflicts for i in members])
+            dominated_free = free & ~pareto_mask(scores[members])
+            group_options.append((name, members[~dominated_free]))
+        n_groups = len(group_options)
+
+        # Branch-and-bound: best achievable sum per quality from the remaining groups
+        remaining_max = np.zeros((n_groups + 1, len(tracked)))
+        for g in range(n_groups - 1, -1, -1):
+            remaining_max[g] = remaining_max[g + 1] + scores[group_options[g][1]].max(axis=0)
+        minimum_sum = np.array([min_quality.get(q, -np.inf) * n_groups for q in tracked])
+
+        # Frontier: partial quality sums (F x Q) and the chosen option per group (F x g)
+        sums = np.zeros((1, len(tracked)))
+        choices = np.zeros((1, 0), dtype=int)
+        for g, (_, members) in enumerate(group_options):
+            sums = (sums[:, None, :] + scores[members][None, :, :]).reshape(-1, len(tracked))
+            choices = np.hstack([np.repeat(choices, len(members), axis=0),
+                                 np.tile(members, len(choices))[:, None]])
+
+            # Drop combinations with incompatible options
+            if conflicts:
+                ok = np.array([not any(conflicts.get(c, set()) & set(row) for c in row) for row in choices])
+                sums, choices = sums[ok], choices[ok]
+
+            # Drop branches that can no longer satisfy the quality constraints
+            ok = np.all(sums + remaining_max[g + 1] >= minimum_sum, axis=1)
+            sums, choices = sums[ok], choices[ok]
+
+            # Keep only the Pareto frontier among branches with the same conflict-relevant choices
+            keys = [tuple(c for c in row if c in conflicts) for row in choices]
+            keep = np.zeros(len(sums), dtype=bool)
+            for key in set(keys):
+                rows = np.array([i for i, k in enumerate(keys) if k == key])
+                keep[rows[pareto_mask(sums[rows])]] = True
+            sums, choices = sums[keep], choices[keep]
+
+        means = sums / max(n_groups, 1)
+        n_objectives = len(objectives)
+        final = pareto_mask(means[:, :n_objectives]) if n_objectives else np.ones(len(means), dtype=bool)
+        means, choices = means[final], choices[final]
+        weight_vector = np.array([weights[q] for q in objectives])
+        weighted = means[:, :n_objectives] @ weight_vector if n_objectives else np.zeros(len(means))
+
+        result = pd.DataFrame({name: [self.options[i] for i in choices[:, g]]
+                               for g, (name, _) in enumerate(group_options)})
+        for j, quality in enumerate(tracked):
+            result[quality] = means[:, j]
+        result['Weighted Score'] = weighted
+        result = result.sort_values('Weighted Score', ascending=False).reset_index(drop=True)
+        return result.head(top) if top else result
+
+
+if __name__ == '__main__':
+    print(f"Loading decision model: {MATRIX_FILE}")
+    model = DecisionModel.from_excel(MATRIX_FILE)
+    print(f"{len(model.options)} design options in {len(set(model.categories))} categories, "
+          f"{len(model.qualities)} qualities.")
+
+    # Example: optimise Reliability, Security and Maintainability, and require Usability to be
+    # non-negative on average. (With all nine qualities as objectives the Pareto set of the full
+    # matrix has tens of thousands of distinct profiles, so pick the objectives that matter.)
+    configurations = model.pareto_configurations(
+        weights={'Reliability': 1.0, 'Security': 1.0, 'Maintainability': 1.0},
+        min_quality={'Usability': 0.0})
+    print(f"\n{len(configurations)} Pareto-optimal configurations. Best 10:")
+    print(configurations.head(10).to_string())
+
+    configurations.to_excel(OUTPUT_FILE, index=False)
+    print(f"\nSaved all Pareto-optimal configurations to '{OUTPUT_FILE}'.")
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled bitmap index over the taxonomy mapping table.
+
+mapping-table.xlsx maps each taxonomy branch path
+(e.g. "Planning > Planning Engine > External Planner") to the primary
+studies that were classified under it, stored as text like "[21, 66]".
+
+The loader compiles the table into
+- a trie of branch paths (every prefix such as "Planning" or
+  "Planning > Planning Engine" is a node), and
+- a boolean bitmap (node x study) where each row is the set of studies under
+  that node, internal nodes being the roll-up (OR) of their subtree.
+
+On top of that it answers AND/OR/NOT queries across branches and computes the
+full branch x branch co-occurrence matrix in a single matrix product.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+MAPPING_FILE = 'mapping-table.xlsx'
+BRANCH_COLUMN = 'Taxonomy Branch'
+REFERENCE_COLUMN = 'Reference'
+PATH_SEPARATOR = '>'
+# Output files written when the script is run directly
+COOCCURRENCE_FILE = 'branch_cooccurrence.xlsx'
+ROLLUP_FILE = 'branch_rollup.xlsx'
+
+
+def parse_study_ids(text):
+    """Parses reference text like "[21, 66]" into a list of study IDs."""
+    if not isinstance(text, str):
+        return []
+    return [int(number) for number in re.findall(r'\d+', text)]
+
+
+def split_path(path):
+    """Splits "A > B > C" into ['A', 'B', 'C']."""
+    return [part.strip() for part in str(path).split(PATH_SEPARATOR) if part.strip()]
+
+
+def join_path(parts):
+    return f' {PATH_SEPARATOR} '.join(parts)
+
+
+# A double-quoted branch path, or an operator
+QUERY_TOKEN = re.compile(r'"([^"]*)"|\b(AND|OR|NOT)\b')
+
+
+def _operand_tokens(text):
+    """
+    Tokens of the text between two operators: grouping parentheses and at most
+    one branch path. Only parentheses at the start or end of the text group;
+    a trailing ')' that closes a '(' inside the path belongs to the path
+    ("Chain of Thought (CoT)").
+    """
+    text = text.strip()
+    opening = []
+    while text.startswith('('):
+        opening.append('(')
+        text = text[1:].lstrip()
+    closing = []
+    while text.endswith(')') and text.count(')') > text.count('('):
+        closing.append(')')
+        text = text[:-1].rstrip()
+    return opening + ([('branch', text)] if text else []) + closing
+
+
+def tokenize_query(expression):
+    """
+    Splits a query into operators ('AND', 'OR', 'NOT', '(', ')') and branch
+    paths (('branch', path)). A path can be double-quoted to keep operators or
+    parentheses in it literal, e.g. '"Action > Tool (external)" AND Memory'.
+    """
+    tokens, position = [], 0
+    for match in QUERY_TOKEN.finditer(expression):
+        tokens += _operand_tokens(expression[position:match.start()])
+        tokens.append(('branch', match.group(1)) if match.group(2) is None else match.group(2))
+        position = match.end()
+    return tokens + _operand_tokens(expression[position:])
+
+
+class TaxonomyIndex:
+    """
+    Branch-path trie plus per-node study bitsets.
+
+    Attributes:
+        paths:     list of node paths (leaves from the table and all their prefixes)
+        study_ids: sorted array of all study IDs; column j of the bitmap is study_ids[j]
+        bitmap:    bool array (len(paths) x len(study_ids))
+        trie:      nested dict {name: {'_node': row, 'children': {...}}}
+    """
+
+    def __init__(self, leaf_paths, leaf_studies):
+        # --- Build the trie and the node list (parents before children) ---
+        self.trie = {}
+        self.paths = []
+        self.node_of = {}
+        leaf_rows = []
+        for path in leaf_paths:
+            parts = split_path(path)
+            level = self.trie
+            for depth in range(len(parts)):
+                name = parts[depth]
+                if name not in level:
+                    prefix = join_path(parts[:depth + 1])
+                    level[name] = {'_node': len(self.paths), 'children': {}}
+                    self.node_of[prefix] = len(self.paths)
+                    self.paths.append(prefix)
+                node = level[name]
+                level = node['children']
+            leaf_rows.append(node['_node'])
+
+        # --- Leaf bitmap (leaf x study) ---
+        self.study_ids = np.array(sorted({s for studies in leaf_studies for s in studies}), dtype=int)
+        column_of = {study: j for j, study in enumerate(self.study_ids)}
+        leaf_bitmap = np.zeros((len(leaf_paths), len(self.study_ids)), dtype=bool)
+        for i, studies in enumerate(leaf_studies):
+            leaf_bitmap[i, [column_of[s] for s in studies]] = True
+
+        # --- Subtree roll-up in one pass: node x leaf membership @ leaf bitmap ---
+        membership = np.zeros((len(self.paths), len(leaf_paths)), dtype=np.int32)
+        for i, path in enumerate(leaf_paths):
+            parts = split_path(path)
+            for depth in range(1, len(parts) + 1):
+                membership[self.node_of[join_path(parts[:depth])], i] = 1
+        self.bitmap = (membership @ leaf_bitmap.astype(np.int32)) > 0
+        self.is_leaf = np.zeros(len(self.paths), dtype=bool)
+        self.is_leaf[leaf_rows] = True
+
+    @classmethod
+    def from_excel(cls, path=MAPPING_FILE):
+        df = pd.read_excel(path)
+        df = df[df[BRANCH_COLUMN].notna()]
+        return cls(df[BRANCH_COLUMN].tolist(), [parse_study_ids(text) for text in df[REFERENCE_COLUMN]])
+
+    # --- Lookups ---
+
+    def _row(self, path):
+        key = join_path(split_path(path))
+        if key not in self.node_of:
+            raise KeyError(f"Unknown taxonomy branch: '{path}'")
+        return self.node_of[key]
+
+    def bitset(self, path):
+        """Bitset of the studies under a branch (including its whole subtree)."""
+        return self.bitmap[self._row(path)]
+
+    def studies(self, bitset):
+        """Converts a bitset back into a list of study IDs."""
+        return self.study_ids[bitset].tolist()
+
+    def children(self, path=None):
+        """Direct child paths of a branch (or the top-level branches)."""
+        level = self.trie
+        for name in split_path(path or ''):
+            level = level[name]['children']
+        return [self.paths[node['_node']] for node in level.values()]
+
+    # --- Boolean queries ---
+
+    def query(self, expression):
+        """
+        Evaluates a boolean expression over branch paths, e.g.
+        "Planning > Plan Generation AND (Memory OR Reflection) AND NOT Action > Tool calling".
+        Operators: AND, OR, NOT and parentheses (NOT > AND > OR); branch paths may
+        contain parentheses of their own or be double-quoted (see tokenize_query()).
+        Returns a list of study IDs.
+        """
+        tokens = tokenize_query(expression)
+        position = 0
+
+        def peek():
+            return tokens[position] if position < len(tokens) else None
+
+        def take():
+            nonlocal position
+            position += 1
+            return tokens[position - 1] if position <= len(tokens) else None
+
+        def parse_or():
+            result = parse_and()
+            while peek() == 'OR':
+                take()
+                result = result | parse_and()
+            return result
+
+        def parse_and():
+            result = parse_not()
+            while peek() == 'AND':
+                take()
+                result = result & parse_not()
+            return result
+
+        def parse_not():
+            if peek() == 'NOT':
+                take()
+                return ~parse_not()
+            if peek() == '(':
+                take()
+                result = parse_or()
+                if take() != ')':
+                    raise ValueError(f"Missing ')' in query: {expression}")
+                return result
+            token = take()
+            if token is None:
+                raise ValueError(f"Missing taxonomy branch at the end of query: {expression}")
+            if not isinstance(token, tuple):
+                raise ValueError(f"Expected a taxonomy branch instead of '{token}' in query: {expression}")
+            return self.bitset(token[1]).copy()
+
+        result = parse_or()
+        if position != len(tokens):
+            raise ValueError(f"Unexpected token '{peek()}' in query: {expression}")
+        return self.studies(result)
+
+    # --- Aggregates ---
+
+    def rollup(self):
+        """Number of studies per node (subtree roll-up), as a DataFrame."""
+        return pd.DataFrame({
+            'Branch': self.paths,
+            'Depth': [len(split_path(p)) for p in self.paths],
+            'Leaf': self.is_leaf,
+            'Studies': self.bitmap.sum(axis=1),
+        })
+
+    def cooccurrence(self, leaves_only=True):
+        """
+        Branch x branch co-occurrence matrix (number of studies classified under
+        both branches), computed in one matrix product.
+        """
+        rows = np.flatnonzero(self.is_leaf) if leaves_only else np.arange(len(self.paths))
+        bits = self.bitmap[rows].astype(np.int32)
+        matrix = bits @ bits.T
+        labels = [self.paths[r] for r in rows]
+        return pd.DataFrame(matrix, index=labels, columns=labels)
+
+
+if __name__ == '__main__':
+    print(f"Loading mapping table: {MAPPING_FILE}")
+    index = TaxonomyIndex.from_excel(MAPPING_FILE)
+    print(f"{int(index.is_leaf.sum())} branches, {len(index.paths)} trie nodes, {len(index.study_ids)} primary studies.")
+
+    rollup = index.rollup()
+    print("\nStudies per top-level branch:")
+    print(rollup[rollup['Depth'] == 1][['Branch', 'Studies']].to_string(index=False))
+
+    rollup.to_excel(ROLLUP_FILE, index=False)
+    index.cooccurrence().to_excel(COOCCURRENCE_FILE)
+    print(f"\nSaved subtree roll-up to '{ROLLUP_FILE}' and co-occurrence matrix to '{COOCCURRENCE_FILE}'.")